@@ -0,0 +1,346 @@
+"""
+Offline load benchmark for the API and the batch scripts.
+
+✔  the app runs in-process behind httpx's ASGI transport; GPT is FakeLLM
+✔  scenarios: upload:<kind>:<size>, binder:<size>, analyze, cli:segment, cli:split
+✔  per scenario: p50 / p95 / p99 latency, requests/sec, errors, peak RSS
+✔  JSON report (--out) and a delta table against an earlier report (--baseline)
+
+    python -m bench.run upload:pdf:medium analyze --requests 50 --concurrency 8 --out bench.json
+    python -m bench.run upload:scanned:small --latency-ms 1200 --rate-limit 0.05
+    python -m bench.run --baseline last-release.json --out bench.json
+
+Peak RSS is this process only; OCR and segment-writer worker processes are
+not included, nor are the cli:* runs, which start the scripts as separate
+processes (--concurrency of them at once).  Result caching is off unless
+--cache is given, so repeated documents are really re-processed.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from bench import corpus
+from utils.fake_llm import FakeLLM
+
+DEFAULT_SCENARIOS = ["upload:txt:medium", "upload:pdf:medium", "binder:medium", "analyze"]
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+CONTENT_TYPES = {"txt": "text/plain", "pdf": "application/pdf", "docx": "application/octet-stream"}
+
+
+# ---------- measurement -----------------------------------------------------
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of *values* (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is the lifetime peak (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """Track the peak resident set size while a scenario runs."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_mb())
+
+
+def summarize(name: str, latencies: List[float], errors: int, wall: float, concurrency: int, rss: float) -> Dict[str, Any]:
+    done = len(latencies)
+    return {
+        "scenario": name,
+        "requests": done + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "rps": round(done / wall, 2) if wall else 0.0,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(rss, 1),
+    }
+
+
+async def drive(call: Callable[[int], Any], requests: int, concurrency: int):
+    """Run ``await call(i)`` for i in range(requests), *concurrency* at a time."""
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok is False:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - start
+
+
+# ---------- scenarios ---------------------------------------------------------
+def _upload_call(http, path: str, endpoint: str):
+    ext = os.path.splitext(path)[1].lstrip(".")
+    with open(path, "rb") as f:
+        payload = f.read()
+
+    async def call(i: int) -> bool:
+        files = {"file": (os.path.basename(path), payload, CONTENT_TYPES.get(ext, "application/octet-stream"))}
+        resp = await http.post(endpoint, files=files, data={"jurisdiction": "EOIR"})
+        return resp.status_code == 200
+
+    return call
+
+
+def _analyze_call(http, repeat: bool):
+    async def call(i: int) -> bool:
+        suffix = "" if repeat else f" (case {uuid.uuid4().hex[:8]})"
+        question = f"Do former gang witnesses form a particular social group?{suffix}"
+        resp = await http.post("/analyze", json={"question": question, "jurisdiction": "9th Cir."})
+        return resp.status_code == 200
+
+    return call
+
+
+async def _run_script(*argv: str) -> bool:
+    """Run ``python *argv`` from the repo root, as an operator would; False if it fails."""
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, *argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    _, err = await proc.communicate()
+    if proc.returncode:
+        tail = err.decode(errors="replace").strip().splitlines()[-1:] or ["no output"]
+        print(f"{argv[0]} exited with {proc.returncode}: {tail[0]}", file=sys.stderr)
+    return proc.returncode == 0
+
+
+def _cli_call(kind: str, corpus_dir: str, size: str, workdir: str):
+    from toc_parser_final import discover_toc
+
+    binder = os.path.abspath(corpus.ensure(corpus_dir, "binder", size))
+    if kind == "segment":
+        toc_path = os.path.join(workdir, "toc.json")
+        with open(toc_path, "w") as f:
+            json.dump(discover_toc(binder), f)
+
+        async def call(i: int) -> bool:
+            out = os.path.join(workdir, f"segments-{i}")
+            return await _run_script("segment_by_toc.py", binder, toc_path, "--output_dir", out, "--force")
+
+        return call
+
+    # cli:split classifies a folder of PDF parts (dry run: nothing is moved)
+    parts = os.path.join(workdir, "parts")
+    os.makedirs(parts, exist_ok=True)
+    for n, name in enumerate(("pdf", "binder", "scanned")):
+        shutil.copy(corpus.ensure(corpus_dir, name, size), os.path.join(parts, f"part-{n}.pdf"))
+
+    async def call(i: int) -> bool:
+        dest = os.path.join(workdir, f"sorted-{i}")
+        plan = os.path.join(workdir, f"plan-{i}.json")
+        return await _run_script("-m", "utils.simple_split", "--src", parts, "--dest", dest, "--dry-run", "--manifest", plan)
+
+    return call
+
+
+async def run_scenarios(args) -> List[Dict[str, Any]]:
+    import main
+
+    fake = FakeLLM(
+        median_ms=args.latency_ms,
+        sigma=args.latency_sigma,
+        token_ms=args.token_ms,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        low_confidence=args.low_confidence,
+        seed=args.seed,
+    )
+    from utils.cache import TieredCache
+    from utils.dedup import LSHIndex
+    from utils.evidence_index import EvidenceIndex
+
+    real = main.gateway, main.result_cache, main.evidence_index, main.dedup_index
+    main.gateway = main.gateway_from_env(client_factory=fake.client)
+    if not args.cache:
+        main.result_cache = TieredCache([])  # no tiers: every lookup misses, nothing is stored
+    # simulated summaries must not end up next to real evidence
+    with tempfile.TemporaryDirectory() as scratch:
+        main.evidence_index = EvidenceIndex(os.path.join(scratch, "evidence.sqlite"))
+        main.dedup_index = LSHIndex(os.path.join(scratch, "dedup.sqlite")) if args.cache else None
+        try:
+            return await _run_all(args, main, fake)
+        finally:
+            main.gateway, main.result_cache, main.evidence_index, main.dedup_index = real
+
+
+async def _run_all(args, main, fake: FakeLLM) -> List[Dict[str, Any]]:
+    import httpx
+    from auth import LAWQB_API_KEY
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    headers = {"x-api-key": LAWQB_API_KEY}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as http:
+        with tempfile.TemporaryDirectory(prefix="lawqb-bench-") as workdir:
+            for name in args.scenarios:
+                parts = name.split(":")
+                concurrency = args.concurrency
+                requests = args.requests
+                if parts[0] == "upload":
+                    kind, size = parts[1], parts[2] if len(parts) > 2 else "medium"
+                    call = _upload_call(http, corpus.ensure(args.corpus, kind, size), "/uploadEvidence")
+                elif parts[0] == "binder":
+                    size = parts[1] if len(parts) > 1 else "medium"
+                    call = _upload_call(http, corpus.ensure(args.corpus, "binder", size), "/binders")
+                elif parts[0] == "analyze":
+                    call = _analyze_call(http, args.repeat_questions)
+                elif parts[0] == "cli":
+                    size = parts[2] if len(parts) > 2 else "medium"
+                    call = _cli_call(parts[1], args.corpus, size, workdir)
+                    requests = max(1, args.cli_runs)
+                else:
+                    raise SystemExit(f"unknown scenario: {name}")
+
+                before = fake.stats()
+                with RssSampler() as rss:
+                    latencies, errors, wall = await drive(call, requests, concurrency)
+                row = summarize(name, latencies, errors, wall, concurrency, rss.peak)
+                after = fake.stats()
+                row["llm"] = {k: after[k] - before[k] for k in after if k != "peakInFlight"}
+                row["llm"]["peakInFlight"] = after["peakInFlight"]
+                results.append(row)
+                print(
+                    f"{name:<22} p50 {row['p50_ms']:>8.1f} ms  p95 {row['p95_ms']:>8.1f}  p99 {row['p99_ms']:>8.1f}"
+                    f"  {row['rps']:>7.2f} req/s  rss {row['peak_rss_mb']:>7.1f} MB  errors {errors}",
+                    file=sys.stderr,
+                )
+    return results
+
+
+# ---------- report ------------------------------------------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """One line per scenario present in both reports, with % change per metric."""
+    old = {row["scenario"]: row for row in baseline.get("scenarios", [])}
+    lines = []
+    for row in report["scenarios"]:
+        prev = old.get(row["scenario"])
+        if not prev:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps", "peak_rss_mb"):
+            if prev.get(key):
+                deltas.append(f"{key} {100 * (row[key] - prev[key]) / prev[key]:+.1f}%")
+        lines.append(f"{row['scenario']:<22} " + "  ".join(deltas))
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Offline load benchmark with a simulated OpenAI backend")
+    parser.add_argument("scenarios", nargs="*", default=DEFAULT_SCENARIOS, help="Scenarios to run (see module doc)")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--cli-runs", type=int, default=3, help="Runs per cli:* scenario (--concurrency at once)")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median fake GPT latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal spread of the latency")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Delay per streamed token")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with each 429")
+    parser.add_argument("--low-confidence", type=float, default=0.0, help="Share of small-model replies rated unsure")
+    parser.add_argument("--repeat-questions", action="store_true", help="Send the same /analyze question every time")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache and near-duplicate reuse on")
+    parser.add_argument("--corpus", default=os.path.join(".cache", "bench-corpus"), help="Corpus folder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")  # must be set before main is imported
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "scenarios")},
+        },
+        "scenarios": asyncio.run(run_scenarios(args)),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ Report saved to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(line, file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
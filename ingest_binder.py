@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from utils.manifest import file_sha256
+
+
+def ingest_binder(pdf_path, *, jurisdiction=None, context="Asylum"):
+    """Run the /binders pipeline on a local PDF and return the response as a dict."""
+    from main import analyze_binder  # loads the API settings from the environment
+
+    result = asyncio.run(
+        analyze_binder(
+            os.path.basename(pdf_path),
+            pdf_path,
+            total_bytes=os.path.getsize(pdf_path),
+            sha256=file_sha256(pdf_path),
+            jurisdiction=jurisdiction,
+            context=context,
+        )
+    )
+    return result.model_dump()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse, classify and analyze a binder PDF tab by tab")
+    parser.add_argument("pdf_path", help="Path to the full binder PDF")
+    parser.add_argument("--jurisdiction", default=None, help="Jurisdiction passed to the analysis")
+    parser.add_argument("--context", default="Asylum", help="Case context passed to the analysis")
+    parser.add_argument("--output", default=None, help="Write the JSON result here instead of stdout")
+    args = parser.parse_args()
+
+    result = ingest_binder(args.pdf_path, jurisdiction=args.jurisdiction, context=args.context)
+    # the JSON may go to stdout, so progress goes to stderr
+    for tab in result["tabs"]:
+        print(f"📑 Tab {tab['tab'] or '-'} ({tab['startPage']}–{tab['endPage']}): {tab['category']}", file=sys.stderr)
+    for issue in result["tocIssues"]:
+        print(f"⚠️  {issue}", file=sys.stderr)
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ Binder analysis saved to {args.output}")
+    else:
+        print(text)
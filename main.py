@@ -1,21 +1,37 @@
 from dotenv import load_dotenv
 import os
 import json
-from tempfile import SpooledTemporaryFile
-from typing import List, Optional
+import logging
+import time
+import asyncio
+import hashlib
+import threading
+import uuid
+import zipfile
+from contextlib import asynccontextmanager, nullcontext
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from typing import Callable, Dict, Iterable, List, Literal, Optional, Tuple, Type
 
-import openai
-from fastapi import FastAPI, UploadFile, File, Form, Depends
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-try:
-    import docx
-except Exception:  # pragma: no cover - optional dependency
-    docx = None
-try:
-    import fitz  # PyMuPDF
-except Exception:  # pragma: no cover - optional dependency
-    fitz = None
-from utils.simple_split import classify_text
+from utils.simple_split import StreamClassifier
+from utils.concurrency import SingleFlight, bounded_gather, bounded_map, iterate_in_thread
+from utils.cache import cache_from_env, make_key, normalize_text
+from utils.extract import Member, expand_archive, is_archive, iter_text, sniff
+from utils.chunking import Chunk, count_tokens, iter_token_chunks
+from utils.summarize import LIST_FIELDS, TEXT_FIELDS, merge_results, tree_reduce
+from utils.jobs import JobRunner, JobStore
+from utils.evidence_index import Passage, format_passages, index_from_env
+from utils.dedup import MinHasher, dedup_from_env, fact_digest, reuse_note
+from utils.llm import gateway_from_env
+from utils.routing import Route, router_from_env
+from utils.metrics import begin_request, metrics
+from utils.streaming import FORMATS, encode_stream, run_emitting
+from utils.structured import conform, extract_json, fill_missing, repair_prompt
+from utils import plugins
 
 # ------------------------------------------------------------------
 #  authentication helper
@@ -26,17 +42,97 @@ from auth import require_api_key  # -> auth.py contains require_api_key()
 #  load environment / set OpenAI
 # ------------------------------------------------------------------
 load_dotenv()
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
+)
+log = logging.getLogger("lawqb")
 openai_api_key = os.getenv("OPENAI_API_KEY")
-print("🔑 API KEY:", "FOUND" if openai_api_key else "NOT FOUND")
-client = openai.OpenAI(api_key=openai_api_key)
+log.info("OpenAI API key %s", "found" if openai_api_key else "NOT FOUND")
+gateway = gateway_from_env(openai_api_key)  # all GPT calls: pooled, rate-limited, retried
+GPT_JSON_MODE = os.getenv("GPT_JSON_MODE", "0").lower() in ("1", "true", "yes")  # needs a model that supports it
+GPT_REPAIR_ATTEMPTS = int(os.getenv("GPT_REPAIR_ATTEMPTS", "1"))  # follow-ups for fields a reply left out
+router = router_from_env()  # model per task; cheap first pass for chunks, escalation to the large model
+
+# ------------------------------------------------------------------
+#  chunk fan-out settings
+# ------------------------------------------------------------------
+GPT_MAX_IN_FLIGHT = int(os.getenv("GPT_MAX_IN_FLIGHT", "4"))
+
+# ------------------------------------------------------------------
+#  chunking (token budget per GPT call)
+# ------------------------------------------------------------------
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "2500"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "150"))
+REDUCE_FAN_IN = int(os.getenv("REDUCE_FAN_IN", "4"))
+REDUCE_MAX_TOKENS = int(os.getenv("REDUCE_MAX_TOKENS", "1500"))
+
+# ------------------------------------------------------------------
+#  result cache (bump a prompt version whenever its prompt changes)
+# ------------------------------------------------------------------
+ANALYZE_PROMPT_VERSION = "irac-v2"
+EVIDENCE_PROMPT_VERSION = "evidence-v3"
+CLASSIFIER_VERSION = "weighted-v1"  # part of document-level keys (category is cached there)
+result_cache = cache_from_env()
+
+# identical /analyze questions in flight share one GPT call; the answer is
+# also reused for repeats arriving within this many seconds
+ANALYZE_COALESCE_WINDOW = float(os.getenv("ANALYZE_COALESCE_WINDOW", "10"))
+analyze_flight = SingleFlight(window=ANALYZE_COALESCE_WINDOW)
+
+# ------------------------------------------------------------------
+#  evidence index (/analyze answers from passages of uploaded evidence)
+# ------------------------------------------------------------------
+evidence_index = index_from_env()
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+RETRIEVAL_MAX_TOKENS = int(os.getenv("RETRIEVAL_MAX_TOKENS", "1500"))
+
+# ------------------------------------------------------------------
+#  near-duplicate chunks (reuse an earlier analysis instead of a GPT call)
+# ------------------------------------------------------------------
+dedup_index = dedup_from_env()
+minhasher = MinHasher()
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "50"))  # shorter chunks are always analyzed
+
+# ------------------------------------------------------------------
+#  batch uploads (files extracted side by side; one GPT queue per batch)
+# ------------------------------------------------------------------
+BATCH_FILE_CONCURRENCY = int(os.getenv("BATCH_FILE_CONCURRENCY", "0")) or (os.cpu_count() or 4)
+BATCH_GPT_IN_FLIGHT = int(os.getenv("BATCH_GPT_IN_FLIGHT", "16"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_MAX_BYTES = int(float(os.getenv("BATCH_MAX_MB", "500")) * 1024 * 1024)
+
+# ------------------------------------------------------------------
+#  background jobs
+# ------------------------------------------------------------------
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(".cache", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# ------------------------------------------------------------------
+#  binders (tabs analyzed concurrently; each tab fans out its own chunks)
+# ------------------------------------------------------------------
+BINDER_TAB_CONCURRENCY = int(os.getenv("BINDER_TAB_CONCURRENCY", "4"))
 
 # ------------------------------------------------------------------
 #  FastAPI app
 # ------------------------------------------------------------------
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log.info("startup: app imported in %.3fs", IMPORT_SECONDS)
+    plugins.warm_up_from_env()  # heavy libraries load in the background; /ready flips when done
+    job_runner.start()  # picks up queued jobs and those of runners that died
+    yield
+    await gateway.aclose()
+
+
 app = FastAPI(
     title="LawQB Immigration Legal AI API",
     description="Upload declarations and receive legal analysis and motion drafting assistance. Powered by GPT‑4.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -45,6 +141,168 @@ def healthcheck():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness():
+    """503 until the startup warm-up has loaded the heavy libraries, then 200; both carry the startup report."""
+    report = {"importSeconds": round(IMPORT_SECONDS, 3), **plugins.report()}
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Per-request stage breakdown as Server-Timing (+ GPT tokens / cost) headers."""
+    timings = begin_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    timings.add("total", time.perf_counter() - start)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.inc("http_requests_total", route=route, status=str(response.status_code))
+    response.headers["Server-Timing"] = timings.server_timing()
+    if timings.tokens:
+        response.headers["X-LLM-Tokens"] = str(timings.tokens)
+        response.headers["X-LLM-Cost-USD"] = f"{timings.cost:.4f}"
+    return response
+
+
+def _collect():
+    """Point-in-time numbers owned by other components, read at scrape time."""
+    cache = result_cache.stats()
+    yield "cache_hits_total", "counter", "Result cache hits", {}, cache["hits"]
+    yield "cache_misses_total", "counter", "Result cache misses", {}, cache["misses"]
+    llm = gateway.stats()
+    for name in ("calls", "retries", "throttled", "failures", "rejected"):
+        yield "llm_events_total", "counter", "OpenAI gateway events", {"event": name}, llm[name]
+    yield "llm_circuit_open", "gauge", "1 while the OpenAI circuit breaker is open", {}, int(llm["circuit"] == "open")
+    flight = analyze_flight.stats()
+    yield "analyze_coalesced_total", "counter", "/analyze requests served by a shared call", {}, flight["coalesced"]
+
+
+metrics.collector(_collect)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats", dependencies=[Depends(require_api_key)])
+def cache_stats():
+    stats = {**result_cache.stats(), "analyzeCoalescing": analyze_flight.stats()}
+    if evidence_index is not None:
+        stats["evidenceIndex"] = evidence_index.stats()
+    if dedup_index is not None:
+        stats["nearDuplicates"] = dedup_index.stats()
+    return stats
+
+
+def _streaming(events, fmt: str) -> StreamingResponse:
+    return StreamingResponse(encode_stream(events, fmt), media_type=FORMATS[fmt])
+
+
+# ------------------------------------------------------------------
+#  GPT calls (through the shared gateway)
+# ------------------------------------------------------------------
+GPT_ERROR_SUMMARY = "Error during GPT analysis."
+ANALYZE_SYSTEM = "You are an immigration law expert. Reply using only IRAC format in JSON."
+EVIDENCE_SYSTEM = "You are a senior immigration attorney. Reply ONLY in flat JSON. No markdown."
+
+
+def _messages(prompt: str, system: str) -> List[dict]:
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+
+class ChunkAnalysis(BaseModel):
+    """What GPT returns for an evidence chunk (and for a condensed summary)."""
+
+    summary: str
+    keyFacts: List[str]
+    legalIssues: List[str]
+    credibilityConcerns: str = ""
+    recommendation: str
+    verificationNotes: str = ""
+    confidence: Optional[float] = None  # self-rated; a low score sends the chunk to the next model
+
+
+async def _chat_json(
+    prompt: str,
+    schema: Type[BaseModel] = ChunkAnalysis,
+    *,
+    task: str = "chunk",
+    system: str = EVIDENCE_SYSTEM,
+    fill: Iterable[str] = (),
+) -> dict:
+    """
+    One chat call on *task*'s route, validated against *schema*.
+
+    The route's first-pass models answer first; an answer that is
+    unparseable, incomplete, blank or low-confidence goes on to the next
+    model.  The final model's answer is repaired as in _structured().
+    """
+    route = router.route(task)
+    messages = _messages(prompt, system)
+    required = [n for n, f in schema.model_fields.items() if f.is_required() and n not in fill]
+    for model in route.first_pass:
+        try:
+            reply = await gateway.chat(messages, model=model, temperature=route.temperature, json_mode=GPT_JSON_MODE)
+        except Exception as e:
+            log.warning("first-pass call to %s failed, escalating: %s", model, e)
+            reason = "error"
+        else:
+            data = extract_json(reply)
+            shaped, missing = conform(data or {}, schema, fill=fill)
+            reason = router.escalation(None if data is None else shaped, missing, required=required)
+        metrics.inc("gpt_routing_total", task=task, model=model, outcome=reason or "accepted")
+        if reason is None:
+            return shaped
+    reply = await gateway.chat(messages, model=route.final, temperature=route.temperature, json_mode=GPT_JSON_MODE)
+    return await _structured(messages, reply, schema, route=route, fill=fill)
+
+
+async def _structured(
+    messages: List[dict], reply: str, schema: Type[BaseModel], *, route: Route, fill: Iterable[str] = ()
+) -> dict:
+    """
+    The reply to *messages* as a dict that validates against *schema*.
+
+    Broken JSON is repaired locally first.  Only if required fields are
+    still missing is GPT asked again, for those fields alone (or, when
+    nothing parsed, to restate its reply as JSON, without the source text);
+    whatever is still missing after GPT_REPAIR_ATTEMPTS is defaulted and
+    noted.  ValueError if no JSON object came back at all.
+    """
+    # length only: replies quote client documents, which must not reach the logs
+    log.debug("GPT reply received (%d chars)", len(reply))
+    data = extract_json(reply)
+    shaped, missing = conform(data or {}, schema, fill=fill)
+    for _ in range(GPT_REPAIR_ATTEMPTS):
+        if not missing:
+            break
+        if data is None:
+            follow_up = _messages(repair_prompt(schema, missing, reply=reply), messages[0]["content"])
+        else:
+            follow_up = [
+                *messages,
+                {"role": "assistant", "content": reply},
+                {"role": "user", "content": repair_prompt(schema, missing)},
+            ]
+        metrics.inc("gpt_repairs_total", kind="reformat" if data is None else "fields")
+        reply = await gateway.chat(
+            follow_up, model=route.final, temperature=route.temperature, json_mode=GPT_JSON_MODE
+        )
+        patch = extract_json(reply)
+        if patch is not None:
+            data = {**(data or {}), **patch}
+            shaped, missing = conform(data, schema, fill=fill)
+    if data is None:
+        raise ValueError("GPT reply held no JSON object")
+    if missing:
+        log.warning("GPT reply still missing %s after repair; defaulted", ", ".join(missing))
+    return fill_missing(shaped, missing, schema)
+
+
 # ------------------------------------------------------------------
 #  /analyze
 # ------------------------------------------------------------------
@@ -52,6 +310,7 @@ class AnalyzeRequest(BaseModel):
     question: str
     jurisdiction: Optional[str] = None
     preferredSources: Optional[List[str]] = None
+    caseId: Optional[str] = None
 
 
 class AnalyzeResponse(BaseModel):
@@ -64,18 +323,69 @@ class AnalyzeResponse(BaseModel):
     verificationNotes: str
 
 
+# fields an answer can do without: defaulted rather than asked for again
+ANALYZE_FILL = ("citations", "conflictsOrAmbiguities", "verificationNotes")
+
+
+def _loose(text: Optional[str]) -> str:
+    """Case, spacing and trailing punctuation don't make a question different."""
+    return normalize_text(text or "").casefold().rstrip(" ?.!")
+
+
 @app.post(
     "/analyze",
     response_model=AnalyzeResponse,
     dependencies=[Depends(require_api_key)],
 )
-def analyze(req: AnalyzeRequest):
-    prompt = f"""
+async def analyze(
+    req: AnalyzeRequest,
+    stream: Optional[Literal["ndjson", "sse"]] = Query(None),
+):
+    if stream:
+        return _streaming(_analyze_events(req), stream)
+    flight_key = make_key(
+        _loose(req.question),
+        _loose(req.jurisdiction),
+        req.caseId,
+        *sorted({_loose(s) for s in req.preferredSources or []} - {""}),
+    )
+    # errors leave the flight as exceptions, so only answers are shared with later callers
+    try:
+        return await analyze_flight.do(flight_key, lambda: _analyze(req))
+    except Exception as e:
+        return _analyze_error(e)
+
+
+async def _retrieve(req: AnalyzeRequest) -> List[Passage]:
+    """Best-matching passages of this case's evidence, within the retrieval budget."""
+    # uploads without a case id belong to nobody in particular: never ground an answer in them
+    if evidence_index is None or not req.caseId:
+        return []
+    with metrics.timed("retrieval"):
+        return await asyncio.to_thread(
+            evidence_index.search,
+            req.question,
+            case_id=req.caseId,
+            sources=req.preferredSources,
+            top_k=RETRIEVAL_TOP_K,
+            max_tokens=RETRIEVAL_MAX_TOKENS,
+        )
+
+
+def _analyze_prompt(req: AnalyzeRequest, passages: List[Passage]) -> str:
+    evidence = ""
+    if passages:
+        evidence = f"""
+Evidence on file for this case (cite excerpts as [1], [2], …; say so where it does not settle a point):
+{format_passages(passages)}
+"""
+    sources = f"Preferred sources: {', '.join(req.preferredSources)}\n" if req.preferredSources else ""
+    return f"""
 You are an expert U.S. immigration attorney. Use the IRAC format to answer this legal question.
 
 Question: {req.question}
 Jurisdiction: {req.jurisdiction or "General U.S. immigration law"}
-
+{sources}{evidence}
 Respond in raw JSON only (no markdown), with the following fields:
 - issue
 - rule
@@ -85,39 +395,73 @@ Respond in raw JSON only (no markdown), with the following fields:
 - conflictsOrAmbiguities
 - verificationNotes
 """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an immigration law expert. Reply using only IRAC format in JSON.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-        )
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```json"):
-            content = content.replace("```json", "").strip()
-        if content.endswith("```"):
-            content = content[:-3].strip()
 
-        print("GPT IRAC Output:", content)
-        parsed = json.loads(content)
-        return AnalyzeResponse(**parsed)
 
+def _analyze_key(req: AnalyzeRequest, passages: List[Passage]) -> str:
+    # the retrieved excerpts are part of the prompt, so new evidence means a new answer
+    return make_key(
+        ANALYZE_PROMPT_VERSION,
+        router.key("analyze"),
+        normalize_text(req.question),
+        req.jurisdiction,
+        format_passages(passages),
+        *sorted(req.preferredSources or []),
+    )
+
+
+def _analyze_error(e: Exception) -> AnalyzeResponse:
+    log.error("analyze failed: %s", e)
+    return AnalyzeResponse(
+        issue="Error generating analysis",
+        rule="",
+        application="",
+        conclusion="",
+        citations=[],
+        conflictsOrAmbiguities="",
+        verificationNotes=f"Exception: {str(e)}",
+    )
+
+
+async def _analyze(req: AnalyzeRequest) -> AnalyzeResponse:
+    passages = await _retrieve(req)
+    cache_key = _analyze_key(req, passages)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return AnalyzeResponse(**cached)
+
+    parsed = await _chat_json(
+        _analyze_prompt(req, passages), AnalyzeResponse, task="analyze", system=ANALYZE_SYSTEM, fill=ANALYZE_FILL
+    )
+    result = AnalyzeResponse(**parsed)
+    result_cache.set(cache_key, result.model_dump())
+    return result
+
+
+async def _analyze_events(req: AnalyzeRequest):
+    """Relay the model's tokens as they arrive, then the parsed answer."""
+    passages = await _retrieve(req)
+    cache_key = _analyze_key(req, passages)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        yield {"event": "result", "result": cached}
+        return
+
+    # streamed tokens can't be taken back, so streaming skips the first pass
+    route = router.route("analyze")
+    messages = _messages(_analyze_prompt(req, passages), ANALYZE_SYSTEM)
+    parts: List[str] = []
+    try:
+        async for text in gateway.chat_stream(
+            messages, model=route.final, temperature=route.temperature, json_mode=GPT_JSON_MODE
+        ):
+            parts.append(text)
+            yield {"event": "token", "text": text}
+        parsed = await _structured(messages, "".join(parts), AnalyzeResponse, route=route, fill=ANALYZE_FILL)
+        result = AnalyzeResponse(**parsed)
+        result_cache.set(cache_key, result.model_dump())
     except Exception as e:
-        print(f"❌ Analyze endpoint error: {e}")
-        return AnalyzeResponse(
-            issue="Error generating analysis",
-            rule="",
-            application="",
-            conclusion="",
-            citations=[],
-            conflictsOrAmbiguities="",
-            verificationNotes=f"Exception: {str(e)}",
-        )
+        result = _analyze_error(e)
+    yield {"event": "result", "result": result.model_dump()}
 
 
 # ------------------------------------------------------------------
@@ -130,6 +474,7 @@ class SummarizeEvidenceResponse(BaseModel):
     fileType: str
     truncated: bool
     category: str
+    categoryConfidence: Optional[float] = None
     summary: str
     keyFacts: List[str]
     legalIssues: List[str]
@@ -138,109 +483,86 @@ class SummarizeEvidenceResponse(BaseModel):
     verificationNotes: str
 
 
-@app.post(
-    "/uploadEvidence",
-    response_model=SummarizeEvidenceResponse,
-    dependencies=[Depends(require_api_key)],
-)
-async def upload_evidence(
-    file: UploadFile = File(...),
-    jurisdiction: Optional[str] = Form(None),
-    context: Optional[str] = Form("Asylum"),
-):
-    ext = file.filename.lower().split(".")[-1]
-    content = ""
-    truncated = False
-    total_bytes = 0
-    readable_size = "Unknown"
+def _readable_size(total_bytes: int) -> str:
+    return f"{round(total_bytes / 1024, 1)} KB"
 
-    try:
-        temp_file = SpooledTemporaryFile(max_size=1024 * 1024 * 100)
-        while chunk := await file.read(1024 * 1024):
-            total_bytes += len(chunk)
-            temp_file.write(chunk)
-        temp_file.seek(0)
-        readable_size = f"{round(total_bytes / 1024, 1)} KB"
-
-        page_count = 0
-
-        # ---------- DOCX ----------
-        if ext == "docx":
-            if not docx:
-                raise ValueError("docx support not available")
-            document = docx.Document(temp_file)
-            content = "\n".join(
-                [p.text for p in document.paragraphs if p.text.strip()]
-            )
 
-        # ---------- PDF (with OCR fallback) ----------
-        elif ext == "pdf":
-            if not fitz:
-                raise ValueError("pdf support not available")
-            pdf_bytes = temp_file.read()
+FILE_ERROR_SUMMARY = "Could not process file."
+TAB_ERROR_SUMMARY = "Could not process tab."
 
-            # 1) embedded text
-            pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
-            page_count = len(pdf)
-            content = "".join(page.get_text() or "" for page in pdf)
-            pdf.close()
 
-            # 2) OCR if empty
-            if not content.strip():
-                try:
-                    from pdf2image import convert_from_bytes
-                    import pytesseract
-                    import io
-
-                    images = convert_from_bytes(pdf_bytes, fmt="png")
-                    ocr_parts = []
-                    for img in images:
-                        buf = io.BytesIO()
-                        img.save(buf, format="PNG")
-                        ocr_parts.append(pytesseract.image_to_string(buf.getvalue()))
-                    content = "\n".join(ocr_parts)
-                except Exception:
-                    content = ""
-
-        # ---------- TXT ----------
-        elif ext == "txt":
-            content = temp_file.read().decode("utf-8")
+def _file_error_response(filename: str, ext: str, total_bytes: int, error: Exception):
+    return SummarizeEvidenceResponse(
+        filename=filename,
+        sizeInBytes=total_bytes,
+        readableSize=_readable_size(total_bytes) if total_bytes else "Unknown",
+        fileType=ext,
+        truncated=False,
+        category="unknown",
+        summary=FILE_ERROR_SUMMARY,
+        keyFacts=[],
+        legalIssues=[],
+        credibilityConcerns="",
+        recommendation="",
+        verificationNotes=f"File processing error: {str(error)}",
+    )
 
-        else:
-            raise ValueError("Unsupported file type")
 
-        category = classify_text(content, size_bytes=total_bytes, num_pages=page_count)
+def _result_tokens(result: dict) -> int:
+    text = " ".join(str(result.get(f) or "") for f in TEXT_FIELDS)
+    text += " ".join(" ".join(result.get(f) or []) for f in LIST_FIELDS)
+    return count_tokens(text)
 
-    except Exception as e:
-        return SummarizeEvidenceResponse(
-            filename=file.filename,
-            sizeInBytes=total_bytes,
-            readableSize=readable_size,
-            fileType=ext,
-            truncated=False,
-            category="unknown",
-            summary="Could not process file.",
-            keyFacts=[],
-            legalIssues=[],
-            credibilityConcerns="",
-            recommendation="",
-            verificationNotes=f"File processing error: {str(e)}",
-        )
 
-    # ---------- Chunking ----------
-    MAX_CHARS = 11_000
-    chunks = [content[i : i + MAX_CHARS] for i in range(0, len(content), MAX_CHARS)]
-    if len(chunks) > 1:
-        truncated = True
+async def analyze_chunk(
+    chunk: Chunk,
+    jurisdiction: Optional[str],
+    context: Optional[str],
+    *,
+    signature: Optional[List[int]] = None,
+    source: str = "",
+    case_id: Optional[str] = None,
+) -> dict:
+    """
+    GPT analysis of one chunk (cached); errors come back as an error payload.
+
+    With a MinHash *signature* and a *case_id*, a near-identical chunk of the
+    same case that names the same people, numbers and dates is reused
+    instead, marked with ``reusedAnalysis`` and a note; new analyses are
+    added to the near-duplicate index under *source*, which is never shown
+    to whoever reuses them.
+    """
+    text_chunk = chunk.text
+    chunk_key = make_key(
+        EVIDENCE_PROMPT_VERSION,
+        router.key("chunk"),
+        normalize_text(text_chunk),
+        chunk.pages,
+        jurisdiction,
+        context,
+    )
+    cached = result_cache.get(chunk_key)
+    if cached is not None:
+        return cached
 
-    # ---------- GPT helper ----------
-    def gpt_analyze(text_chunk: str):
-        prompt = f"""
+    near_duplicates = signature is not None and dedup_index is not None and bool(case_id)
+    if near_duplicates:
+        scope = make_key(case_id, EVIDENCE_PROMPT_VERSION, router.key("chunk"), jurisdiction, context)
+        facts = fact_digest(text_chunk)
+        match = dedup_index.query(signature, scope, facts)
+        if match is not None:
+            metrics.inc("dedup_reused_total")
+            notes = [match.result.get("verificationNotes") or "", reuse_note(match)]
+            # not put in result_cache: that is keyed by text alone, across cases
+            return {**match.result, "verificationNotes": "\n".join(n for n in notes if n), "reusedAnalysis": True}
+
+    page_line = f"Pages: {chunk.pages}\n" if chunk.pages else ""
+    prompt = f"""
 You are an expert immigration attorney analyzing part of a legal evidence document.
 
 Jurisdiction: {jurisdiction or "General U.S. immigration law"}
 Context: {context or "Asylum"}
-
+{page_line}
 Summarize the text, extract key facts, identify legal issues, note credibility concerns, and give a legal recommendation.
 
 Text:
@@ -253,71 +575,799 @@ Return JSON only:
 - credibilityConcerns
 - recommendation
 - verificationNotes
+- confidence (0 to 1: how sure you are that the summary is complete and accurate)
 """
+    try:
+        parsed = await _chat_json(prompt)
+        result_cache.set(chunk_key, parsed)
+        if near_duplicates:
+            dedup_index.add(signature, scope, facts, parsed, source=source, pages=chunk.pages)
+        return parsed
+
+    except Exception as e:
+        log.error("GPT error during evidence chunk analysis (pages %s): %s", chunk.pages or "-", e)
+        return {
+            "summary": GPT_ERROR_SUMMARY,
+            "keyFacts": [],
+            "legalIssues": [],
+            "credibilityConcerns": "",
+            "recommendation": "",
+            "verificationNotes": f"GPT error: {e}",
+        }
+
+
+async def _reduce_group(
+    parts: List[dict], jurisdiction: Optional[str], context: Optional[str]
+) -> dict:
+    """Merge locally; only ask GPT to condense when the merge is over budget."""
+    merged = merge_results(parts)
+    if _result_tokens(merged) <= REDUCE_MAX_TOKENS:
+        return merged
+    condense_key = make_key(
+        EVIDENCE_PROMPT_VERSION, router.key("reduce"), "reduce", json.dumps(merged, sort_keys=True)
+    )
+    cached = result_cache.get(condense_key)
+    if cached is not None:
+        return cached
+    prompt = f"""
+You are combining partial analyses of one legal evidence document.
+
+Jurisdiction: {jurisdiction or "General U.S. immigration law"}
+Context: {context or "Asylum"}
+
+Merge the partial analysis below into one. Remove repetition, keep every distinct fact and issue,
+and keep the whole answer under {REDUCE_MAX_TOKENS * 3 // 4} words.
+
+Partial analysis (JSON):
+{json.dumps(merged, ensure_ascii=False)}
+
+Return JSON only, with the same fields:
+- summary
+- keyFacts (list of strings)
+- legalIssues (list of strings)
+- credibilityConcerns
+- recommendation
+- verificationNotes
+"""
+    try:
+        condensed = merge_results([await _chat_json(prompt, task="reduce")])
+    except Exception as e:
+        log.error("GPT error while condensing evidence summary: %s", e)
+        return merged
+    result_cache.set(condense_key, condensed)
+    return condensed
+
+
+async def reduce_results(
+    parts: List[dict], jurisdiction: Optional[str], context: Optional[str]
+) -> dict:
+    """Tree-reduce chunk (or tab) results into one analysis."""
+    return await tree_reduce(
+        parts,
+        lambda group: _reduce_group(group, jurisdiction, context),
+        fan_in=REDUCE_FAN_IN,
+    )
+
+
+async def analyze_stream(
+    pieces: Iterable[Tuple[Optional[int], str]],
+    *,
+    size_bytes: int = 0,
+    jurisdiction: Optional[str] = None,
+    context: Optional[str] = "Asylum",
+    source: str = "",
+    case_id: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+    on_chunk: Optional[Callable[[int, Chunk, dict], None]] = None,
+    gpt_slots: Optional[asyncio.Semaphore] = None,
+) -> dict:
+    """
+    Classify → chunk → dedup → GPT → reduce a stream of ``(page_no, text)`` pieces.
+
+    *pieces* is consumed lazily in a worker thread and chunked as it arrives,
+    so memory is bounded by the chunk size and the number of in-flight GPT
+    calls, not by the document size.  *progress*, if given, is called with
+    keyword updates (pagesExtracted, chunksTotal, chunksAnalyzed).
+    *on_chunk*, if given, is called with ``(index, chunk, result)`` as soon
+    as each chunk's analysis finishes, in completion order.  With a *case_id*,
+    chunks that nearly repeat evidence analyzed before in that case reuse
+    that analysis; *source* names this document in the near-duplicate index.
+    *gpt_slots*, if given, is shared with other documents (a batch) and
+    caps their chunk analyses together.
+
+    Returns the reduced analysis fields plus ``category``, ``truncated`` and
+    ``failed`` (True when any chunk hit a GPT error).  Extraction errors
+    propagate to the caller.
+    """
+    report = progress or (lambda **_: None)
+    classifier = StreamClassifier()
+    pages = {"count": 0, "last": None}
+    produced = 0
+    analyzed = 0
+    reused = 0
+
+    # ---------- Extraction + chunking (runs in a worker thread) ----------
+    def classified(stream):
+        # time spent waiting on the extractor (incl. OCR) vs. in the classifier
+        spent = {"extraction": 0.0, "classification": 0.0}
+        stream = iter(stream)
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior immigration attorney. Reply ONLY in flat JSON. No markdown.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
+            while True:
+                start = time.perf_counter()
+                try:
+                    page_no, text = next(stream)
+                except StopIteration:
+                    break
+                extracted = time.perf_counter()
+                if page_no is not None and page_no != pages["last"]:
+                    pages["count"] += 1
+                    pages["last"] = page_no
+                    report(pagesExtracted=pages["count"])
+                classifier.feed(text)
+                spent["extraction"] += extracted - start
+                spent["classification"] += time.perf_counter() - extracted
+                yield page_no, text
+        finally:
+            for stage, seconds in spent.items():
+                metrics.record_stage(stage, seconds)
+
+    def produce_chunks():
+        nonlocal produced
+        for chunk in iter_token_chunks(
+            classified(pieces),
+            max_tokens=CHUNK_MAX_TOKENS,
+            overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        ):
+            produced += 1
+            report(chunksTotal=produced)
+            signature = None
+            if dedup_index is not None and case_id:
+                with metrics.timed("dedup"):
+                    signature = minhasher.signature(chunk.text, min_words=DEDUP_MIN_WORDS)
+            yield produced - 1, chunk, signature
+
+    async def analyze_and_report(item: Tuple[int, Chunk, Optional[List[int]]]):
+        nonlocal analyzed, reused
+        index, chunk, signature = item
+        async with gpt_slots or nullcontext():
+            parsed = await analyze_chunk(
+                chunk, jurisdiction, context, signature=signature, source=source, case_id=case_id
             )
-            result = response.choices[0].message.content.strip()
-            if result.startswith("```json"):
-                result = result.replace("```json", "").strip()
-            if result.endswith("```"):
-                result = result[:-3].strip()
+        reused += bool(parsed.get("reusedAnalysis"))
+        analyzed += 1
+        report(chunksAnalyzed=analyzed)
+        if on_chunk:
+            on_chunk(index, chunk, parsed)
+        return parsed
 
-            # debug print
-            print("\n--- GPT RAW RESPONSE START ---")
-            print(result)
-            print("--- GPT RAW RESPONSE END ---\n")
+    # fan out as chunks arrive, with a bounded number of in-flight calls;
+    # results keep chunk order
+    results = await bounded_map(
+        iterate_in_thread(produce_chunks),
+        analyze_and_report,
+        limit=GPT_MAX_IN_FLIGHT,
+    )
 
-            return json.loads(result)
+    # ---------- Reduce (tree of merges; GPT only condenses over-budget text) ----------
+    with metrics.timed("aggregation"):
+        final = await reduce_results(results, jurisdiction, context)
+    label = classifier.classify(size_bytes=size_bytes, num_pages=pages["count"])
+    final["category"] = label.category
+    final["categoryConfidence"] = label.confidence
+    final["truncated"] = len(results) > 1
+    if reused:
+        note = f"{reused} of {len(results)} chunks repeated evidence analyzed earlier; those analyses were reused."
+        final["verificationNotes"] = "\n".join(n for n in (final.get("verificationNotes"), note) if n)
+    final["failed"] = any(r.get("summary") == GPT_ERROR_SUMMARY for r in results)
+    return final
 
-        except Exception as e:
-            print(f"❌ GPT error during evidence chunk analysis: {e}")
-            return {
-                "summary": "Error during GPT analysis.",
-                "keyFacts": [],
-                "legalIssues": [],
-                "credibilityConcerns": "",
-                "recommendation": "",
-                "verificationNotes": f"GPT error: {e}",
-            }
-
-    # ---------- Aggregate ----------
-    summaries: List[str] = []
-    keyFacts: List[str] = []
-    legalIssues: List[str] = []
-    credibilityNotes: List[str] = []
-    recommendations: List[str] = []
-    verificationNotes: List[str] = []
-
-    for chunk in chunks:
-        parsed = gpt_analyze(chunk)
-        summaries.append(parsed.get("summary", ""))
-        keyFacts.extend(parsed.get("keyFacts", []))
-        legalIssues.extend(parsed.get("legalIssues", []))
-        credibilityNotes.append(parsed.get("credibilityConcerns") or "")
-        recommendations.append(parsed.get("recommendation") or "")
-        verificationNotes.append(parsed.get("verificationNotes") or "")
 
-    return SummarizeEvidenceResponse(
-        filename=file.filename,
+async def summarize_evidence(
+    filename: str,
+    path: str,
+    *,
+    total_bytes: int,
+    sha256: str,
+    jurisdiction: Optional[str] = None,
+    context: Optional[str] = "Asylum",
+    case_id: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+    on_chunk: Optional[Callable[[int, Chunk, dict], None]] = None,
+    gpt_slots: Optional[asyncio.Semaphore] = None,
+) -> SummarizeEvidenceResponse:
+    """
+    Extract → chunk → GPT → aggregate for the uploaded file at *path*.
+
+    Analyzed chunks also go into the evidence index, where /analyze finds
+    them for *case_id*.
+    """
+    kind = filename.lower().split(".")[-1]
+    try:
+        kind = sniff(path, filename)  # the content decides; a mislabeled file still parses
+    except (OSError, ValueError) as e:
+        return _file_error_response(filename, kind, total_bytes, e)
+
+    # identical bytes + settings ⇒ reuse the whole previous answer
+    doc_key = make_key(
+        EVIDENCE_PROMPT_VERSION, CLASSIFIER_VERSION, router.key("chunk", "reduce"), sha256, kind, jurisdiction, context
+    )
+    cached = result_cache.get(doc_key)
+    # a document analyzed before it could be indexed runs again (its chunks are cached)
+    if cached is not None and (evidence_index is None or evidence_index.has_document(sha256)):
+        if evidence_index is not None:
+            evidence_index.link(sha256, source=filename, case_id=case_id, category=cached["category"])
+        return SummarizeEvidenceResponse(**{**cached, "filename": filename})
+
+    def index_chunk(index: int, chunk: Chunk, result: dict) -> None:
+        if evidence_index is not None and result.get("summary") != GPT_ERROR_SUMMARY:
+            evidence_index.add_chunk(sha256, index, chunk, result)
+        if on_chunk:
+            on_chunk(index, chunk, result)
+
+    try:
+        final = await analyze_stream(
+            iter_text(path, kind),
+            size_bytes=total_bytes,
+            jurisdiction=jurisdiction,
+            context=context,
+            source=filename,
+            case_id=case_id,
+            progress=progress,
+            on_chunk=index_chunk,
+            gpt_slots=gpt_slots,
+        )
+    except Exception as e:
+        return _file_error_response(filename, kind, total_bytes, e)
+    if evidence_index is not None:
+        evidence_index.link(sha256, source=filename, case_id=case_id, category=final["category"])
+
+    response = SummarizeEvidenceResponse(
+        filename=filename,
         sizeInBytes=total_bytes,
-        readableSize=readable_size,
-        fileType=ext,
-        truncated=truncated,
-        category=category,
-        summary=" ".join(summaries),
-        keyFacts=list(set(keyFacts)),
-        legalIssues=list(set(legalIssues)),
-        credibilityConcerns=" ".join(c for c in credibilityNotes if c),
-        recommendation=" ".join(r for r in recommendations if r),
-        verificationNotes="\n".join(v for v in verificationNotes if v),
+        readableSize=_readable_size(total_bytes),
+        fileType=kind,
+        truncated=final["truncated"],
+        category=final["category"],
+        categoryConfidence=final["categoryConfidence"],
+        summary=final["summary"],
+        keyFacts=final["keyFacts"],
+        legalIssues=final["legalIssues"],
+        credibilityConcerns=final["credibilityConcerns"],
+        recommendation=final["recommendation"],
+        verificationNotes=final["verificationNotes"],
+    )
+    if not final["failed"]:
+        result_cache.set(doc_key, response.model_dump())
+    return response
+
+
+@app.post(
+    "/uploadEvidence",
+    response_model=SummarizeEvidenceResponse,
+    dependencies=[Depends(require_api_key)],
+)
+async def upload_evidence(
+    file: UploadFile = File(...),
+    jurisdiction: Optional[str] = Form(None),
+    context: Optional[str] = Form("Asylum"),
+    caseId: Optional[str] = Form(None),
+    stream: Optional[Literal["ndjson", "sse"]] = Query(None),
+):
+    ext = file.filename.lower().split(".")[-1]
+    total_bytes = 0
+    digest = hashlib.sha256()
+
+    # spool to disk (not memory) so extraction can stream from a real path;
+    # no suffix from the client's name: sniff() judges the content anyway
+    temp_file = None
+    try:
+        temp_file = NamedTemporaryFile()
+        with metrics.timed("upload_read"):
+            while chunk := await file.read(1024 * 1024):
+                total_bytes += len(chunk)
+                digest.update(chunk)
+                temp_file.write(chunk)
+            temp_file.flush()
+    except Exception as e:
+        if temp_file is not None:
+            temp_file.close()
+        return _file_error_response(file.filename, ext, total_bytes, e)
+
+    kwargs = dict(
+        total_bytes=total_bytes,
+        sha256=digest.hexdigest(),
+        jurisdiction=jurisdiction,
+        context=context,
+        case_id=caseId,
+    )
+    if stream:
+        return _streaming(_evidence_events(file.filename, temp_file, kwargs), stream)
+    with temp_file:
+        return await summarize_evidence(file.filename, temp_file.name, **kwargs)
+
+
+async def _evidence_events(filename: str, temp_file, kwargs: dict):
+    """Per-chunk results the moment each one finishes, then the aggregate."""
+
+    async def run(emit):
+        def on_chunk(index: int, chunk: Chunk, result: dict):
+            emit({"event": "chunk", "index": index, "pages": chunk.pages, "result": result})
+
+        response = await summarize_evidence(filename, temp_file.name, on_chunk=on_chunk, **kwargs)
+        return response.model_dump()
+
+    # the upload must outlive the handler: it is read while the body streams
+    with temp_file:
+        async for event in run_emitting(run):
+            yield event
+
+
+# ------------------------------------------------------------------
+#  /uploadEvidence/batch  (many files or zips, one shared GPT queue)
+# ------------------------------------------------------------------
+class CategoryRollup(BaseModel):
+    files: List[str]
+    summary: str
+    keyFacts: List[str]
+    legalIssues: List[str]
+    credibilityConcerns: str
+    recommendation: str
+    verificationNotes: str
+
+
+class BatchResponse(BaseModel):
+    fileCount: int
+    sizeInBytes: int
+    readableSize: str
+    failed: int
+    categories: Dict[str, int]
+    files: List[SummarizeEvidenceResponse]
+    rollup: Dict[str, CategoryRollup]
+
+
+async def _spool_batch(files: List[UploadFile], folder: str) -> List[Member]:
+    """
+    Write every upload into *folder*, expanding zips; ValueError past the
+    batch limits.  Archives and members that can't be read come back with
+    ``error`` set, to be reported as file errors.
+    """
+    members: List[Member] = []
+    total = 0
+    for upload in files:
+        digest = hashlib.sha256()
+        size = 0
+        with NamedTemporaryFile(dir=folder, delete=False) as out:
+            while chunk := await upload.read(1024 * 1024):
+                size += len(chunk)
+                total += len(chunk)
+                if total > BATCH_MAX_BYTES:
+                    raise ValueError(f"A batch is limited to {BATCH_MAX_BYTES // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+        if is_archive(out.name):
+            total -= size  # the archive gives way to its members
+            try:
+                expanded = await asyncio.to_thread(
+                    expand_archive,
+                    out.name,
+                    upload.filename,
+                    folder,
+                    max_files=BATCH_MAX_FILES - len(members),
+                    max_bytes=BATCH_MAX_BYTES - total,
+                )
+            except (zipfile.BadZipFile, OSError) as e:
+                total += size  # kept on disk, to be reported
+                members.append(Member(upload.filename, out.name, size, digest.hexdigest(), error=str(e)))
+                continue
+            os.remove(out.name)
+            total += sum(m.size for m in expanded)
+            members += expanded
+        else:
+            members.append(Member(upload.filename, out.name, size, digest.hexdigest()))
+        if len(members) > BATCH_MAX_FILES:
+            raise ValueError(f"A batch is limited to {BATCH_MAX_FILES} files")
+    return members
+
+
+async def analyze_batch(
+    members: List[Member],
+    *,
+    jurisdiction: Optional[str] = None,
+    context: Optional[str] = "Asylum",
+    case_id: Optional[str] = None,
+) -> BatchResponse:
+    """
+    Analyze the files of one packet together, then roll them up by category.
+
+    Up to BATCH_FILE_CONCURRENCY files are extracted at once (OCR goes to the
+    shared process pool), and their chunks queue for the same
+    BATCH_GPT_IN_FLIGHT slots, so GPT stays busy while later files are still
+    being read.  Identical files are analyzed once.
+    """
+    gpt_slots = asyncio.Semaphore(BATCH_GPT_IN_FLIGHT)
+    first: Dict[str, Member] = {}
+    for member in members:
+        if member.error is None:
+            first.setdefault(member.sha256, member)
+
+    analyzed = await bounded_gather(
+        [
+            lambda m=m: summarize_evidence(
+                m.name,
+                m.path,
+                total_bytes=m.size,
+                sha256=m.sha256,
+                jurisdiction=jurisdiction,
+                context=context,
+                case_id=case_id,
+                gpt_slots=gpt_slots,
+            )
+            for m in first.values()
+        ],
+        limit=BATCH_FILE_CONCURRENCY,
+    )
+    by_hash = dict(zip(first, analyzed))
+
+    results: List[SummarizeEvidenceResponse] = []
+    for member in members:
+        if member.error is not None:
+            ext = member.name.lower().split(".")[-1]
+            results.append(_file_error_response(member.name, ext, member.size, ValueError(member.error)))
+            continue
+        result = by_hash[member.sha256]
+        if result.filename != member.name:
+            notes = "\n".join(n for n in (result.verificationNotes, f"Identical to {result.filename} in this batch.") if n)
+            result = result.model_copy(update={"filename": member.name, "verificationNotes": notes})
+        results.append(result)
+
+    groups: Dict[str, List[SummarizeEvidenceResponse]] = {}
+    for result in results:
+        groups.setdefault(result.category, []).append(result)
+    failed = [r.summary in (GPT_ERROR_SUMMARY, FILE_ERROR_SUMMARY) for r in results]
+    with metrics.timed("aggregation"):
+        rollups = await asyncio.gather(
+            *(
+                reduce_results(
+                    [r.model_dump() for r in group if r.summary not in (GPT_ERROR_SUMMARY, FILE_ERROR_SUMMARY)],
+                    jurisdiction,
+                    context,
+                )
+                for group in groups.values()
+            )
+        )
+
+    total_bytes = sum(m.size for m in members)
+    return BatchResponse(
+        fileCount=len(results),
+        sizeInBytes=total_bytes,
+        readableSize=_readable_size(total_bytes),
+        failed=sum(failed),
+        categories={category: len(group) for category, group in groups.items()},
+        files=results,
+        rollup={
+            category: CategoryRollup(
+                files=[r.filename for r in group],
+                **{k: rollup[k] for k in (*TEXT_FIELDS, *LIST_FIELDS, "verificationNotes")},
+            )
+            for (category, group), rollup in zip(groups.items(), rollups)
+        },
+    )
+
+
+@app.post(
+    "/uploadEvidence/batch",
+    response_model=BatchResponse,
+    dependencies=[Depends(require_api_key)],
+)
+async def upload_evidence_batch(
+    files: List[UploadFile] = File(...),
+    jurisdiction: Optional[str] = Form(None),
+    context: Optional[str] = Form("Asylum"),
+    caseId: Optional[str] = Form(None),
+):
+    with TemporaryDirectory(prefix="lawqb-batch-") as folder:
+        try:
+            with metrics.timed("upload_read"):
+                members = await _spool_batch(files, folder)
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        return await analyze_batch(members, jurisdiction=jurisdiction, context=context, case_id=caseId)
+
+
+# ------------------------------------------------------------------
+#  /jobs/evidence  (same pipeline, run in the background)
+# ------------------------------------------------------------------
+class JobProgress(BaseModel):
+    pagesExtracted: int = 0
+    chunksTotal: int = 0
+    chunksAnalyzed: int = 0
+
+
+class EvidenceJobResponse(BaseModel):
+    jobId: str
+    status: str
+    filename: str
+    progress: JobProgress
+    result: Optional[SummarizeEvidenceResponse] = None
+    error: Optional[str] = None
+
+
+async def run_evidence_job(job: dict, progress: Callable[..., None]) -> dict:
+    params = job["params"]
+    try:
+        result = await summarize_evidence(
+            job["filename"],
+            job["path"],
+            total_bytes=params["sizeInBytes"],
+            sha256=params["sha256"],
+            jurisdiction=params.get("jurisdiction"),
+            context=params.get("context"),
+            case_id=params.get("caseId"),
+            progress=progress,
+        )
+    finally:
+        if os.path.exists(job["path"]):
+            os.remove(job["path"])
+    return result.model_dump()
+
+
+job_store = JobStore(os.getenv("JOB_DB_PATH", os.path.join(".cache", "jobs.sqlite")))
+job_runner = JobRunner(job_store, run_evidence_job, workers=JOB_WORKERS)
+
+
+def _job_response(job: dict) -> EvidenceJobResponse:
+    return EvidenceJobResponse(
+        jobId=job["id"],
+        status=job["status"],
+        filename=job["filename"],
+        progress=JobProgress(**job["progress"]),
+        result=job["result"],
+        error=job["error"],
+    )
+
+
+@app.post(
+    "/jobs/evidence",
+    response_model=EvidenceJobResponse,
+    status_code=202,
+    dependencies=[Depends(require_api_key)],
+)
+async def create_evidence_job(
+    file: UploadFile = File(...),
+    jurisdiction: Optional[str] = Form(None),
+    context: Optional[str] = Form("Asylum"),
+    caseId: Optional[str] = Form(None),
+):
+    os.makedirs(JOB_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    path = os.path.join(JOB_DIR, job_id)
+    total_bytes = 0
+    digest = hashlib.sha256()
+
+    # persist the upload so the job can be resumed after a restart
+    with open(path, "wb") as out, metrics.timed("upload_read"):
+        while chunk := await file.read(1024 * 1024):
+            total_bytes += len(chunk)
+            digest.update(chunk)
+            out.write(chunk)
+
+    job_store.create(
+        file.filename,
+        path,
+        {
+            "sizeInBytes": total_bytes,
+            "sha256": digest.hexdigest(),
+            "jurisdiction": jurisdiction,
+            "context": context,
+            "caseId": caseId,
+        },
+        job_id=job_id,
     )
+    job_runner.submit(job_id)
+    return _job_response(job_store.get(job_id))
+
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=EvidenceJobResponse,
+    dependencies=[Depends(require_api_key)],
+)
+def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+
+# ------------------------------------------------------------------
+#  /binders  (TOC → per-tab page ranges → classify + analyze, in-process)
+# ------------------------------------------------------------------
+class BinderTab(BaseModel):
+    tab: str
+    title: str
+    startPage: int
+    endPage: int
+    category: str
+    categoryConfidence: Optional[float] = None
+    truncated: bool
+    summary: str
+    keyFacts: List[str]
+    legalIssues: List[str]
+    credibilityConcerns: str
+    recommendation: str
+    verificationNotes: str
+
+
+class BinderResponse(BaseModel):
+    filename: str
+    sizeInBytes: int
+    readableSize: str
+    pageCount: int
+    tocSource: str
+    tocIssues: List[str]
+    categories: Dict[str, int]
+    tabs: List[BinderTab]
+    summary: str
+    keyFacts: List[str]
+    legalIssues: List[str]
+    credibilityConcerns: str
+    recommendation: str
+    verificationNotes: str
+
+
+async def analyze_binder(
+    filename: str,
+    path: str,
+    *,
+    total_bytes: int,
+    sha256: str,
+    jurisdiction: Optional[str] = None,
+    context: Optional[str] = "Asylum",
+) -> BinderResponse:
+    """
+    Run the whole binder pipeline on the PDF at *path* without temp files.
+
+    The PDF is opened once.  Its TOC is discovered and validated, and every
+    tab's page range is streamed straight from the open document into the
+    evidence pipeline (classify → chunk → GPT → reduce).  Up to
+    BINDER_TAB_CONCURRENCY tabs run at once.  A binder without a usable TOC
+    is analyzed as a single tab.  Raises ValueError if *path* is not a
+    readable PDF.
+    """
+    binder_key = make_key(
+        EVIDENCE_PROMPT_VERSION,
+        CLASSIFIER_VERSION,
+        router.key("chunk", "reduce"),
+        "binder",
+        sha256,
+        jurisdiction,
+        context,
+    )
+    cached = result_cache.get(binder_key)
+    if cached is not None:
+        return BinderResponse(**{**cached, "filename": filename})
+
+    try:
+        pdf_text = plugins.load("pdf")
+    except plugins.PluginUnavailable as e:
+        raise ValueError(str(e)) from None
+    # the TOC tools pull in PyMuPDF themselves, so they load with the first binder
+    from segment_by_toc import plan_segments
+    from toc_parser_final import toc_from_doc
+
+    try:
+        doc = pdf_text.fitz.open(path, filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"Could not open PDF: {e}") from e
+
+    # fitz documents are not thread-safe: tab readers share the doc behind one lock
+    doc_lock = threading.Lock()
+    try:
+        page_count = len(doc)
+        entries, toc_source = await asyncio.to_thread(toc_from_doc, doc)
+        segments, issues = plan_segments(entries, page_count)
+        if not segments:
+            segments = [{"tab": "", "title": filename, "startPage": 1, "endPage": page_count}]
+
+        async def run_tab(seg: dict) -> Tuple[BinderTab, bool]:
+            first, last = seg["startPage"], seg["endPage"]
+
+            def pieces():
+                texts = pdf_text.iter_page_texts(doc, pages=range(first - 1, last), lock=doc_lock)
+                yield from enumerate(texts, start=first)
+
+            try:
+                final = await analyze_stream(
+                    pieces(),
+                    size_bytes=total_bytes * (last - first + 1) // max(1, page_count),
+                    jurisdiction=jurisdiction,
+                    context=context,
+                    source=f"{filename}, tab {seg['tab']}" if seg["tab"] else filename,
+                )
+            except Exception as e:
+                log.error("binder tab %s failed: %s", seg["tab"], e)
+                final = {
+                    "category": "unknown",
+                    "categoryConfidence": None,
+                    "truncated": False,
+                    "failed": True,
+                    "summary": TAB_ERROR_SUMMARY,
+                    "keyFacts": [],
+                    "legalIssues": [],
+                    "credibilityConcerns": "",
+                    "recommendation": "",
+                    "verificationNotes": f"Tab processing error: {e}",
+                }
+            tab = BinderTab(
+                tab=seg["tab"],
+                title=seg["title"],
+                startPage=first,
+                endPage=last,
+                **{k: v for k, v in final.items() if k != "failed"},
+            )
+            return tab, final["failed"]
+
+        results = await bounded_gather(
+            [lambda seg=seg: run_tab(seg) for seg in segments],
+            limit=BINDER_TAB_CONCURRENCY,
+        )
+    finally:
+        doc.close()
+
+    tabs = [tab for tab, _ in results]
+    rollup = await reduce_results(
+        [tab.model_dump() for tab in tabs if tab.summary not in (GPT_ERROR_SUMMARY, TAB_ERROR_SUMMARY)],
+        jurisdiction,
+        context,
+    )
+    categories: Dict[str, int] = {}
+    for tab in tabs:
+        categories[tab.category] = categories.get(tab.category, 0) + 1
+
+    response = BinderResponse(
+        filename=filename,
+        sizeInBytes=total_bytes,
+        readableSize=_readable_size(total_bytes),
+        pageCount=page_count,
+        tocSource=toc_source,
+        tocIssues=[issue["message"] for issue in issues],
+        categories=categories,
+        tabs=tabs,
+        **{k: rollup[k] for k in (*TEXT_FIELDS, *LIST_FIELDS, "verificationNotes")},
+    )
+    if not any(failed for _, failed in results):
+        result_cache.set(binder_key, response.model_dump())
+    return response
+
+
+@app.post(
+    "/binders",
+    response_model=BinderResponse,
+    dependencies=[Depends(require_api_key)],
+)
+async def upload_binder(
+    file: UploadFile = File(...),
+    jurisdiction: Optional[str] = Form(None),
+    context: Optional[str] = Form("Asylum"),
+):
+    total_bytes = 0
+    digest = hashlib.sha256()
+
+    with NamedTemporaryFile(suffix=".pdf") as temp_file:
+        with metrics.timed("upload_read"):
+            while chunk := await file.read(1024 * 1024):
+                total_bytes += len(chunk)
+                digest.update(chunk)
+                temp_file.write(chunk)
+            temp_file.flush()
+        try:
+            return await analyze_binder(
+                file.filename,
+                temp_file.name,
+                total_bytes=total_bytes,
+                sha256=digest.hexdigest(),
+                jurisdiction=jurisdiction,
+                context=context,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
@@ -11,3 +11,23 @@ class OpenAI:
     def __init__(self, api_key=None):
         self.api_key = api_key
         self.chat = SimpleNamespace(completions=_ChatCompletions())
+
+class _AsyncChatCompletions:
+    async def create(self, **kwargs):
+        response = _ChatCompletions().create(**kwargs)
+        if kwargs.get("stream"):
+            return _stream(response.choices[0].message.content)
+        return response
+
+async def _stream(content):
+    # one chunk per word, like the token deltas of a real streamed reply
+    for word in content.split(" "):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None)
+
+class AsyncOpenAI:
+    def __init__(self, api_key=None, **kwargs):
+        self.api_key = api_key
+        self.chat = SimpleNamespace(completions=_AsyncChatCompletions())
+
+    async def close(self):
+        pass
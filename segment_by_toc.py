@@ -3,22 +3,26 @@ import json
 import os
 import fitz  # PyMuPDF
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.manifest import RunManifest, file_sha256
+
+MANIFEST_NAME = ".segments.sqlite"
 
 def sanitize_filename(title: str, max_length=150) -> str:
     safe = re.sub(r'[^\w\s-]', '', title)
     safe = re.sub(r'[\s]+', '_', safe)
     return safe[:max_length]
 
-def segment_pdf_by_toc(pdf_path, toc_path, output_dir):
-    with open(toc_path, "r", encoding="utf-8") as f:
-        toc_entries = json.load(f)
-
-    doc = fitz.open(pdf_path)
-
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+def plan_segments(toc_entries, page_count):
+    """
+    Validate TOC entries against the document and return ``(segments, issues)``.
 
-    saved_entries = []
+    Entries without tab/title/page range are skipped (section headers).  The
+    remaining ranges are sorted by start page; ranges outside the document are
+    dropped.  Each issue is a ``{"kind", "message"}`` dict where kind is
+    "range", "overlap" or "gap".
+    """
+    segments, issues = [], []
 
     for entry in toc_entries:
         start = entry.get("startPage")
@@ -28,26 +32,180 @@ def segment_pdf_by_toc(pdf_path, toc_path, output_dir):
 
         if start is None or end is None or title is None or tab is None:
             continue
+        if start > end or start < 1 or end > page_count:
+            issues.append({
+                "kind": "range",
+                "message": f"Tab {tab}: pages {start}–{end} outside document (1–{page_count}), skipped",
+            })
+            continue
+
+        segments.append({
+            "tab": tab,
+            "title": title,
+            "startPage": start,
+            "endPage": end,
+            "filename": f"{tab}_{sanitize_filename(title)}.pdf",
+        })
+
+    segments.sort(key=lambda s: (s["startPage"], s["endPage"]))
+
+    covered = 0
+    previous = None
+    for seg in segments:
+        if previous and seg["startPage"] <= previous["endPage"]:
+            issues.append({
+                "kind": "overlap",
+                "message": f"Tab {seg['tab']} ({seg['startPage']}–{seg['endPage']}) overlaps "
+                           f"tab {previous['tab']} ({previous['startPage']}–{previous['endPage']})",
+            })
+        elif seg["startPage"] > covered + 1:
+            issues.append({
+                "kind": "gap",
+                "message": f"Pages {covered + 1}–{seg['startPage'] - 1} are not in any tab",
+            })
+        covered = max(covered, seg["endPage"])
+        previous = seg
+    if segments and covered < page_count:
+        issues.append({"kind": "gap", "message": f"Pages {covered + 1}–{page_count} are not in any tab"})
+
+    return segments, issues
+
+def _batches(segments, workers):
+    """Split *segments* into at most *workers* contiguous batches of similar page counts."""
+    total = sum(s["endPage"] - s["startPage"] + 1 for s in segments)
+    target = max(1, total // max(1, workers))
+    batches, current, pages = [], [], 0
+    for seg in segments:
+        current.append(seg)
+        pages += seg["endPage"] - seg["startPage"] + 1
+        if pages >= target and len(batches) < workers - 1:
+            batches.append(current)
+            current, pages = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+def _write_batch(pdf_path, output_dir, batch, with_text):
+    """Worker: open the source once and write every segment of *batch*."""
+    results = []
+    with fitz.open(pdf_path) as doc:
+        for seg in batch:
+            filepath = os.path.join(output_dir, seg["filename"])
+            try:
+                with fitz.open() as subdoc:
+                    subdoc.insert_pdf(doc, from_page=seg["startPage"] - 1, to_page=seg["endPage"] - 1)
+                    subdoc.save(filepath, garbage=3, deflate=True)
+                if with_text:
+                    text = "".join(
+                        doc[p].get_text() for p in range(seg["startPage"] - 1, seg["endPage"])
+                    )
+                    with open(os.path.splitext(filepath)[0] + ".txt", "w", encoding="utf-8") as f:
+                        f.write(text)
+                results.append((seg, filepath, file_sha256(filepath), None))
+            except Exception as e:
+                results.append((seg, filepath, None, str(e)))
+    return results
+
+def _remove_output(filepath):
+    for path in (filepath, os.path.splitext(filepath)[0] + ".txt"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def segment_pdf_by_toc(pdf_path, toc_path, output_dir, *, workers=None, with_text=False, strict=False, force=False):
+    """
+    Write one PDF per TOC tab into *output_dir* and return their paths.
+
+    A run manifest in the output folder remembers what every segment was
+    built from, so reruns only rewrite segments whose source file, page range
+    or options changed (or whose file is gone), and an interrupted run picks
+    up where it stopped.  *force* rewrites everything.
+    """
+    with open(toc_path, "r", encoding="utf-8") as f:
+        toc_entries = json.load(f)
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+
+    segments, issues = plan_segments(toc_entries, page_count)
+    for issue in issues:
+        print(f"⚠️  {issue['message']}")
+    errors = [i for i in issues if i["kind"] != "gap"]
+    if strict and errors:
+        raise ValueError(f"TOC has {len(errors)} overlapping or out-of-range tab(s); fix it or drop --strict")
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    manifest = RunManifest(os.path.join(output_dir, MANIFEST_NAME))
+    source = os.path.abspath(pdf_path)
+    source_hash = file_sha256(pdf_path)
+    params = "text" if with_text else ""
+    paths = [os.path.join(output_dir, seg["filename"]) for seg in segments]
+
+    # outputs an earlier run made from this binder that the TOC no longer lists
+    planned = {os.path.abspath(p) for p in paths}
+    for stale in manifest.outputs(source=source):
+        if stale not in planned:
+            print(f"🗑️  Removing stale segment {os.path.basename(stale)}")
+            _remove_output(stale)
+            manifest.forget(stale)
+
+    saved = {}
+    todo = []
+    for seg, filepath in zip(segments, paths):
+        pages = f"{seg['startPage']}-{seg['endPage']}"
+        up_to_date = manifest.is_current(os.path.abspath(filepath), source_hash, pages, params) and (
+            not with_text or os.path.exists(os.path.splitext(filepath)[0] + ".txt")
+        )
+        if up_to_date and not force:
+            print(f"⏭️  Up to date {seg['filename']} ({seg['startPage']}–{seg['endPage']})")
+            saved[filepath] = True
+        else:
+            todo.append(seg)
 
-        filename = f"{tab}_{sanitize_filename(title)}.pdf"
-        filepath = os.path.join(output_dir, filename)
+    workers = workers or os.cpu_count() or 1
+    # small batches: each finished batch is recorded, so a crash loses little work
+    batches = _batches(todo, workers * 4)
 
-        try:
-            subdoc = fitz.open()
-            subdoc.insert_pdf(doc, from_page=start - 1, to_page=end - 1)
-            subdoc.save(filepath)
-            print(f"✅ Saved {filename} ({start}–{end})")
-            saved_entries.append(filepath)
-        except Exception as e:
-            print(f"❌ Failed to save {filename}: {e}")
+    if batches:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            futures = [pool.submit(_write_batch, pdf_path, output_dir, b, with_text) for b in batches]
+            for future in as_completed(futures):
+                for seg, filepath, content_hash, error in future.result():
+                    if error:
+                        print(f"❌ Failed to save {seg['filename']}: {error}")
+                        continue
+                    manifest.record(
+                        os.path.abspath(filepath),
+                        source=source,
+                        source_hash=source_hash,
+                        pages=f"{seg['startPage']}-{seg['endPage']}",
+                        params=params,
+                        content_hash=content_hash,
+                    )
+                    print(f"✅ Saved {seg['filename']} ({seg['startPage']}–{seg['endPage']})")
+                    saved[filepath] = True
+    manifest.close()
 
-    return saved_entries
+    return [p for p in paths if p in saved]
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("pdf_path", help="Path to the full PDF file")
     parser.add_argument("toc_path", help="Path to the TOC JSON file")
     parser.add_argument("--output_dir", default="output_segments", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Writer processes (default: CPU count)")
+    parser.add_argument("--text", action="store_true", help="Also write each segment's text to a .txt file")
+    parser.add_argument("--strict", action="store_true", help="Abort if TOC ranges overlap or fall outside the PDF")
+    parser.add_argument("--force", action="store_true", help="Rewrite every segment, even if up to date")
     args = parser.parse_args()
 
-    segment_pdf_by_toc(args.pdf_path, args.toc_path, args.output_dir)
+    segment_pdf_by_toc(
+        args.pdf_path,
+        args.toc_path,
+        args.output_dir,
+        workers=args.workers,
+        with_text=args.text,
+        strict=args.strict,
+        force=args.force,
+    )
@@ -0,0 +1,77 @@
+import io
+import zipfile
+from fastapi.testclient import TestClient
+import main
+from main import app
+from auth import LAWQB_API_KEY
+
+client = TestClient(app)
+headers = {"x-api-key": LAWQB_API_KEY}
+
+FACTS = b"This affidavit describes events in detail."
+COUNTRY = b"According to the U.S. Department of State Country Report, conditions remain unstable."
+
+
+def _zip(**members: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+        archive.writestr("__MACOSX/._facts.txt", b"\x00")
+    return buffer.getvalue()
+
+
+def test_batch_expands_zips_and_rolls_up_by_category():
+    files = [
+        ("files", ("facts.txt", FACTS, "text/plain")),
+        ("files", ("cc.txt", COUNTRY, "text/plain")),
+        ("files", ("packet.zip", _zip(**{"exhibits/cc-copy.txt": COUNTRY}), "application/zip")),
+    ]
+    resp = client.post("/uploadEvidence/batch", files=files, data={"jurisdiction": "EOIR"}, headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["fileCount"] == 3
+    assert [f["filename"] for f in body["files"]] == ["facts.txt", "cc.txt", "packet.zip/exhibits/cc-copy.txt"]
+    assert body["categories"] == {"case facts": 1, "country conditions": 2}
+    assert body["rollup"]["country conditions"]["files"] == ["cc.txt", "packet.zip/exhibits/cc-copy.txt"]
+    # the copy is not analyzed twice
+    assert "Identical to cc.txt" in body["files"][2]["verificationNotes"]
+
+
+def test_batch_enforces_file_limit(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_FILES", 1)
+    files = [("files", ("a.txt", FACTS, "text/plain")), ("files", ("b.txt", COUNTRY, "text/plain"))]
+    resp = client.post("/uploadEvidence/batch", files=files, headers=headers)
+    assert resp.status_code == 413
+
+
+def test_zip_counts_once_against_the_byte_limit(monkeypatch):
+    member = bytes(range(256)) * 1024  # 256 KB that barely compresses
+    packet = _zip(**{"scan.txt": member})
+    assert len(packet) > len(member)
+    # room for the expanded member, but not for it and its archive together
+    monkeypatch.setattr(main, "BATCH_MAX_BYTES", len(packet) + 1024)
+    files = [("files", ("packet.zip", packet, "application/zip"))]
+    resp = client.post("/uploadEvidence/batch", files=files, headers=headers)
+    assert resp.status_code == 200
+    assert [f["filename"] for f in resp.json()["files"]] == ["packet.zip/scan.txt"]
+
+
+def test_unreadable_zip_member_is_a_file_error():
+    archive = bytearray(_zip(**{"ok.txt": FACTS, "secret.txt": COUNTRY}))
+    # mark secret.txt as encrypted in its local and central headers (flag bit 0)
+    for signature, offset in ((b"PK\x03\x04", 6), (b"PK\x01\x02", 8)):
+        start = 0
+        while (start := archive.find(signature, start)) != -1:
+            name_at = start + (30 if signature == b"PK\x03\x04" else 46)
+            if archive[name_at : name_at + 10] == b"secret.txt":
+                archive[start + offset] |= 1
+            start += 4
+    files = [("files", ("packet.zip", bytes(archive), "application/zip"))]
+    resp = client.post("/uploadEvidence/batch", files=files, headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["fileCount"] == 2 and body["files"][0]["summary"] != main.FILE_ERROR_SUMMARY
+    failed = body["files"][1]
+    assert failed["filename"] == "packet.zip/secret.txt"
+    assert failed["summary"] == main.FILE_ERROR_SUMMARY and "encrypted" in failed["verificationNotes"]
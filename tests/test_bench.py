@@ -0,0 +1,37 @@
+import json
+
+from bench import run
+from bench.run import percentile
+
+
+def test_percentiles_use_nearest_rank():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([], 95) == 0.0
+
+
+def test_benchmark_writes_machine_readable_report(tmp_path):
+    out = tmp_path / "bench.json"
+    run.main([
+        "upload:txt:small", "analyze",
+        "--requests", "4", "--concurrency", "2",
+        "--latency-ms", "5", "--rate-limit", "0.2", "--retry-after", "0.01",
+        "--corpus", str(tmp_path / "corpus"), "--out", str(out),
+    ])
+    report = json.loads(out.read_text())
+    rows = {row["scenario"]: row for row in report["scenarios"]}
+    assert set(rows) == {"upload:txt:small", "analyze"}
+    for row in rows.values():
+        assert row["errors"] == 0 and row["requests"] == 4
+        assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+        assert row["llm"]["calls"] >= 4
+
+
+def test_cli_scenarios_run_concurrently(tmp_path):
+    report = run.main([
+        "cli:split:small", "--cli-runs", "2", "--concurrency", "2",
+        "--corpus", str(tmp_path / "corpus"), "--out", str(tmp_path / "bench.json"),
+    ])
+    [row] = report["scenarios"]
+    assert row["concurrency"] == 2 and row["requests"] == 2 and row["errors"] == 0
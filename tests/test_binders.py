@@ -0,0 +1,62 @@
+import fitz
+from fastapi.testclient import TestClient
+import main
+from main import app
+from auth import LAWQB_API_KEY
+
+client = TestClient(app)
+headers = {"x-api-key": LAWQB_API_KEY}
+
+
+def write_lines(page, lines):
+    for i, line in enumerate(lines):
+        page.insert_text((72, 60 + 14 * i), line)
+
+
+def test_binder_is_analyzed_per_tab():
+    doc = fitz.open()
+    write_lines(doc.new_page(), ["INDEX", "A.", "Declaration", "2-3", "B.", "Country report", "4-5"])
+    write_lines(doc.new_page(), ["Sworn declaration of the respondent."])
+    write_lines(doc.new_page(), ["I was detained and beaten in 2018."])
+    write_lines(doc.new_page(), ["Human Rights Watch country report."])
+    write_lines(doc.new_page(), ["Amnesty International findings."])
+    files = {"file": ("binder.pdf", doc.tobytes(), "application/pdf")}
+
+    resp = client.post("/binders", files=files, data={"jurisdiction": "EOIR"}, headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["pageCount"] == 5
+    assert body["tocSource"] == "printed"
+    assert [(t["tab"], t["startPage"], t["endPage"]) for t in body["tabs"]] == [("A", 2, 3), ("B", 4, 5)]
+    assert [t["category"] for t in body["tabs"]] == ["case facts", "country conditions"]
+    assert body["categories"] == {"case facts": 1, "country conditions": 1}
+    assert body["tocIssues"] == ["Pages 1–1 are not in any tab"]
+
+
+def test_failed_tabs_stay_out_of_the_rollup(monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    rolled = []
+    reduce_results = main.reduce_results
+
+    async def recording(parts, *args):
+        rolled.extend(parts)
+        return await reduce_results(parts, *args)
+
+    monkeypatch.setattr(main, "analyze_stream", broken)
+    monkeypatch.setattr(main, "reduce_results", recording)
+    doc = fitz.open()
+    write_lines(doc.new_page(), ["INDEX", "A.", "Declaration", "2-2", "B.", "Country report", "3-3"])
+    write_lines(doc.new_page(), ["Sworn declaration of the respondent, binder two."])
+    write_lines(doc.new_page(), ["Human Rights Watch country report, binder two."])
+    files = {"file": ("binder-2.pdf", doc.tobytes(), "application/pdf")}
+
+    body = client.post("/binders", files=files, headers=headers).json()
+    assert [t["summary"] for t in body["tabs"]] == [main.TAB_ERROR_SUMMARY] * 2
+    assert rolled == []
+
+
+def test_non_pdf_binder_is_rejected():
+    files = {"file": ("binder.pdf", b"not a pdf", "application/pdf")}
+    assert client.post("/binders", files=files, headers=headers).status_code == 400
@@ -0,0 +1,34 @@
+import time
+from utils.cache import MemoryLRU, SQLiteCache, TieredCache, make_key, normalize_text
+
+
+def test_key_ignores_whitespace_but_not_settings():
+    a = make_key("v1", "gpt-4", normalize_text("Hello   world\n"), "EOIR")
+    b = make_key("v1", "gpt-4", normalize_text(" Hello world"), "EOIR")
+    c = make_key("v1", "gpt-4", normalize_text("Hello world"), "BIA")
+    assert a == b
+    assert a != c
+
+
+def test_lru_evicts_oldest_and_expires():
+    lru = MemoryLRU(max_items=2, ttl=0.05)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    time.sleep(0.06)
+    assert lru.get("a") is None
+
+
+def test_tiered_cache_backfills_memory_from_disk(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "r.sqlite"), max_items=10)
+    disk.set("k", {"summary": "cached"})
+    cache = TieredCache([MemoryLRU(), disk])
+
+    assert cache.get("k") == {"summary": "cached"}
+    assert cache.get("missing") is None
+    assert cache.tiers[0].get("k") == {"summary": "cached"}
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
@@ -0,0 +1,40 @@
+from utils.chunking import count_tokens, iter_token_chunks
+
+
+def pages(n, sentences=20):
+    for p in range(1, n + 1):
+        yield p, "".join(f"Page {p} sentence {i} about the respondent.\n" for i in range(sentences))
+
+
+def test_chunks_fit_budget_and_track_pages():
+    chunks = list(iter_token_chunks(pages(6), max_tokens=300))
+    assert len(chunks) > 1
+    assert all(c.tokens <= 300 for c in chunks)
+    assert chunks[0].start_page == 1
+    assert chunks[-1].end_page == 6
+    # the page boundary wins over the sentence ends around it
+    assert chunks[0].text.endswith("Page 1 sentence 19 about the respondent.\n")
+    assert all(c.text.endswith("\n") for c in chunks)
+
+
+def test_overlap_repeats_tail_of_previous_chunk():
+    chunks = list(iter_token_chunks(pages(4), max_tokens=300, overlap_tokens=40))
+    last_line = chunks[0].text.strip().splitlines()[-1]
+    assert last_line in chunks[1].text
+    assert chunks[1].start_page == chunks[0].end_page
+
+
+def test_unpaged_stream_and_long_lines():
+    text = "word " * 2000  # one huge line, no sentence ends
+    chunks = list(iter_token_chunks([(None, text[:3000]), (None, text[3000:])], max_tokens=200))
+    assert all(c.start_page is None for c in chunks)
+    assert all(count_tokens(c.text) <= 200 for c in chunks)
+    assert "".join(c.text for c in chunks).split() == text.split()
+
+
+def test_unspaced_text_is_split_by_characters():
+    text = "申请人在二零一九年被警察拘留" * 400  # no spaces, no sentence ends
+    chunks = list(iter_token_chunks([(None, text)], max_tokens=1000))
+    assert len(chunks) > 1
+    assert all(count_tokens(c.text) <= 1000 for c in chunks)
+    assert "".join(c.text for c in chunks) == text
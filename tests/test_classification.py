@@ -26,3 +26,13 @@ def test_country_conditions_txt():
     body = resp.json()
     assert body["category"] == "country conditions"
 
+
+
+def test_odd_filenames_are_still_analyzed():
+    content = b"This affidavit describes events in detail."
+    headers = {"x-api-key": LAWQB_API_KEY}
+    for name in ("notes.v1/draft", "facts." + "x" * 300):
+        files = {"file": (name, content, "text/plain")}
+        resp = client.post("/uploadEvidence", files=files, headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["category"] == "case facts"
@@ -0,0 +1,76 @@
+import asyncio
+from utils.concurrency import bounded_gather
+
+
+def test_bounded_gather_keeps_order_and_limit():
+    in_flight = 0
+    peak = 0
+
+    async def work(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01 * (5 - i % 5))
+        in_flight -= 1
+        return i
+
+    results = asyncio.run(
+        bounded_gather([lambda i=i: work(i) for i in range(10)], limit=3)
+    )
+    assert results == list(range(10))
+    assert peak <= 3
+
+
+def test_streamed_items_are_mapped_in_order():
+    from utils.concurrency import bounded_map, iterate_in_thread
+
+    async def upper(piece):
+        await asyncio.sleep(0)
+        return piece.upper()
+
+    async def run():
+        return await bounded_map(
+            iterate_in_thread(lambda: iter(["ab", "cd", "ef"])), upper, limit=2
+        )
+
+    assert asyncio.run(run()) == ["AB", "CD", "EF"]
+
+
+def test_single_flight_shares_one_call():
+    from utils.concurrency import SingleFlight
+
+    flight = SingleFlight(window=60)
+    calls = {"n": 0}
+
+    async def slow():
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return calls["n"]
+
+    async def run():
+        together = await asyncio.gather(*(flight.do("q", slow) for _ in range(5)))
+        later = await flight.do("q", slow)
+        return together, later
+
+    together, later = asyncio.run(run())
+    assert together == [1] * 5 and later == 1
+    assert calls["n"] == 1
+    assert flight.stats()["coalesced"] == 5
+
+
+def test_failed_analysis_is_not_replayed(monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+    from auth import LAWQB_API_KEY
+
+    async def failing(*args, **kwargs):
+        raise RuntimeError("upstream timeout")
+
+    monkeypatch.setattr(main, "_chat_json", failing)
+    client = TestClient(main.app)
+    calls = main.analyze_flight.calls
+    for _ in range(2):
+        resp = client.post("/analyze", json={"question": "Is a failed flight replayed?"}, headers={"x-api-key": LAWQB_API_KEY})
+        assert resp.status_code == 200
+        assert resp.json()["issue"] == "Error generating analysis"
+    assert main.analyze_flight.calls == calls + 2
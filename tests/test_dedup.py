@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+import main
+from utils.cache import make_key
+from utils.chunking import Chunk
+from utils.dedup import LSHIndex, MinHasher, fact_digest, similarity
+
+BASE = " ".join(
+    f"The {n}th paragraph of the country report describes arrests by police in district {n % 7}."
+    for n in range(40)
+)
+
+
+def test_signatures_estimate_similarity():
+    hasher = MinHasher()
+    edited = BASE.replace("district 3", "district 9", 1)
+    other = " ".join(f"Declarant word {n} about the family farm near the river" for n in range(60))
+    assert hasher.signature(BASE) == MinHasher().signature(BASE)  # stable across instances
+    assert similarity(hasher.signature(BASE), hasher.signature(edited)) > 0.85
+    assert similarity(hasher.signature(BASE), hasher.signature(other)) < 0.2
+    assert hasher.signature("too short", min_words=50) is None
+
+
+def test_lsh_finds_near_duplicates_within_scope(tmp_path):
+    hasher = MinHasher()
+    index = LSHIndex(str(tmp_path / "dedup.sqlite"))
+    facts = fact_digest(BASE)
+    index.add(hasher.signature(BASE), "scope-a", facts, {"summary": "Arrests"}, source="dos.pdf", pages="4")
+
+    edited = BASE + " one more sentence at the end."
+    assert fact_digest(edited) == facts
+    match = index.query(hasher.signature(edited), "scope-a", facts)
+    assert match is not None and match.source == "dos.pdf" and match.result == {"summary": "Arrests"}
+    assert index.query(hasher.signature(BASE), "scope-b", facts) is None
+    assert index.stats() == {"chunks": 1, "reused": 1}
+
+
+def test_template_filled_for_another_client_is_not_reused(tmp_path):
+    hasher = MinHasher()
+    index = LSHIndex(str(tmp_path / "dedup.sqlite"))
+    first = BASE + " Declarant Maria Lopez was born in Tegucigalpa on 3 May 1990."
+    second = BASE + " Declarant Ana Reyes was born in Tegucigalpa on 3 May 1990."
+    index.add(hasher.signature(first), "case", fact_digest(first), {"summary": "Maria Lopez"})
+    assert similarity(hasher.signature(first), hasher.signature(second)) >= index.threshold
+    assert index.query(hasher.signature(second), "case", fact_digest(second)) is None
+
+
+def _analyze(text, case_id, source):
+    chunk = Chunk(text, None, None, 400)
+    signature = main.minhasher.signature(text)
+    return asyncio.run(main.analyze_chunk(chunk, None, "Asylum", signature=signature, source=source, case_id=case_id))
+
+
+def test_near_duplicate_chunk_reuses_earlier_analysis_of_the_same_case(tmp_path, monkeypatch):
+    index = LSHIndex(str(tmp_path / "dedup.sqlite"))
+    monkeypatch.setattr(main, "dedup_index", index)
+    earlier = {"summary": "Police arrests", "keyFacts": [], "legalIssues": [], "verificationNotes": ""}
+    case_id = f"case-{uuid.uuid4().hex}"
+    scope = make_key(case_id, main.EVIDENCE_PROMPT_VERSION, main.router.key("chunk"), None, "Asylum")
+    index.add(main.minhasher.signature(BASE), scope, fact_digest(BASE), earlier, source="packet-1.pdf", pages="2")
+
+    text = BASE + " as stated above."
+    result = _analyze(text, case_id, "packet-2.pdf")
+    assert result["summary"] == "Police arrests" and result["reusedAnalysis"] is True
+    assert "Near-duplicate" in result["verificationNotes"]
+    # the other upload's file name and pages are not shown
+    assert "packet-1" not in str(result) and "p. 2" not in str(result)
+
+    # another case, or no case, never gets it
+    assert _analyze(text, "another-case", "x.pdf")["summary"] != "Police arrests"
+    assert _analyze(text, None, "x.pdf")["summary"] != "Police arrests"
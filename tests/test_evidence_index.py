@@ -0,0 +1,56 @@
+import asyncio
+import main
+from main import AnalyzeRequest
+from utils.chunking import Chunk
+from utils.evidence_index import EvidenceIndex, match_query
+
+FACTS = "Police in San Pedro Sula detained the respondent twice in 2019 and beat her at the station."
+COUNTRY = "The State Department report documents arbitrary arrests and impunity for police abuse."
+
+
+def _index(tmp_path) -> EvidenceIndex:
+    index = EvidenceIndex(str(tmp_path / "evidence.sqlite"), passage_tokens=40)
+    index.add_chunk("doc-facts", 0, Chunk(FACTS, 2, 3, 20), {"summary": "Detention and beating", "keyFacts": []})
+    index.add_chunk("doc-country", 0, Chunk(COUNTRY, None, None, 15), {"summary": "Country report", "keyFacts": []})
+    index.link("doc-facts", source="declaration.pdf", case_id="A-123", category="case facts")
+    index.link("doc-country", source="dos-report.pdf", case_id="A-123", category="country conditions")
+    return index
+
+
+def test_match_query_drops_stopwords_and_syntax():
+    assert match_query('Was she "detained" by police?') == '"detained" OR "police"'
+    assert match_query("why is it?") == ""
+
+
+def test_search_is_scoped_ranked_and_filtered(tmp_path):
+    index = _index(tmp_path)
+    hits = index.search("When was the respondent detained by police?", case_id="A-123")
+    assert [h.source for h in hits] == ["declaration.pdf", "dos-report.pdf"]
+    assert hits[0].pages == "2–3"
+
+    assert index.search("police detained", case_id="B-999") == []
+    filtered = index.search("police", case_id="A-123", sources=["country conditions"])
+    assert [h.source for h in filtered] == ["dos-report.pdf"]
+    assert len(index.search("police", case_id="A-123", max_tokens=25)) == 1
+
+    # indexing the same chunk again adds nothing
+    assert index.add_chunk("doc-facts", 0, Chunk(FACTS, 2, 3, 20), {"summary": ""}) == 0
+    assert index.stats() == {"passages": 2, "documents": 2, "cases": 1}
+
+
+def test_analyze_prompt_carries_retrieved_passages(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "evidence_index", _index(tmp_path))
+    req = AnalyzeRequest(question="Was the respondent detained by police?", caseId="A-123")
+    passages = asyncio.run(main._retrieve(req))
+    prompt = main._analyze_prompt(req, passages)
+    assert "[1] declaration.pdf, p. 2–3" in prompt and "San Pedro Sula" in prompt
+    assert main._analyze_key(req, passages) != main._analyze_key(req, [])
+
+
+def test_no_case_id_means_no_evidence(tmp_path, monkeypatch):
+    index = _index(tmp_path)
+    index.link("doc-facts", source="someone-elses.pdf")
+    monkeypatch.setattr(main, "evidence_index", index)
+    req = AnalyzeRequest(question="Was the respondent detained by police?")
+    assert asyncio.run(main._retrieve(req)) == []
+    assert index.search("police detained") == []
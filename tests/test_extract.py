@@ -0,0 +1,80 @@
+import pytest
+from utils.extract import detect_encoding, iter_text, rtf_to_text, sniff
+
+
+def _write(tmp_path, name, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _text(path, kind) -> str:
+    return "".join(text for _, text in iter_text(path, kind))
+
+
+def test_detect_encoding():
+    assert detect_encoding("Déclaration".encode("utf-8")) == "utf-8"
+    assert detect_encoding("Déclaration".encode("cp1252")) == "cp1252"
+    assert detect_encoding("Déclaration".encode("utf-16")) == "utf-16"
+    assert detect_encoding("Declaration of facts".encode("utf-16-le")) == "utf-16-le"
+    assert detect_encoding(bytes(range(256))) is None
+
+
+def test_latin1_and_utf16_text_decode(tmp_path):
+    latin = _write(tmp_path, "a.txt", "La señora declaró que huyó.\n".encode("latin-1") * 5000)
+    assert sniff(latin, "a.txt") == "txt"
+    assert _text(latin, "txt").startswith("La señora declaró")
+
+    # UTF-8 (a multi-byte character across the first block boundary), then Latin-1 past the first block
+    ascii_head = b"x" * (64 * 1024 - 1) + "é".encode("utf-8") + b"\n"
+    mixed = _write(tmp_path, "mixed.txt", ascii_head + "Señora López, \x81.\n".encode("latin-1") + "après".encode("cp1252"))
+    assert _text(mixed, "txt") == "x" * (64 * 1024 - 1) + "é\nSeñora López, \x81.\naprès"
+
+    wide = _write(tmp_path, "b.txt", "Я свидетельствую.\n".encode("utf-16"))
+    assert _text(wide, sniff(wide, "b.txt")) == "Я свидетельствую.\n"
+
+
+def test_content_wins_over_extension(tmp_path):
+    html = _write(tmp_path, "notes.txt", b"<html><head><style>p{}</style></head><body><p>Fled in 2019&amp;after</p></body></html>")
+    assert sniff(html, "notes.txt") == "html"
+    assert _text(html, "html").strip() == "Fled in 2019&after"
+    quoted = _write(tmp_path, "email-notes.txt", b"The page source showed <html> and a <body onload> script.\n")
+    assert sniff(quoted, "email-notes.txt") == "txt"
+
+    pdf = _write(tmp_path, "scan.docx", b"%PDF-1.4\n")
+    assert sniff(pdf, "scan.docx") == "pdf"
+    png = _write(tmp_path, "photo.pdf", b"\x89PNG\r\n\x1a\n" + b"\x00" * 16)
+    assert sniff(png, "photo.pdf") == "image"
+
+    with pytest.raises(ValueError, match="Unsupported"):
+        sniff(_write(tmp_path, "blob.txt", bytes(range(256)) * 4), "blob.txt")
+
+
+def test_rtf():
+    rtf = (
+        r"{\rtf1\ansi\ansicpg1252{\fonttbl{\f0 Arial;}}{\*\generator Word;}"
+        r"\pard Se\'f1ora L\u243?pez\par She fled.\par}"
+    )
+    assert rtf_to_text(rtf) == "Señora López\nShe fled.\n"
+
+
+def test_email_and_mbox(tmp_path):
+    message = (
+        b"From: Ana <ana@example.com>\r\nTo: counsel@example.com\r\nSubject: Threats\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n\r\nThey came to the house again.\r\n"
+    )
+    eml = _write(tmp_path, "mail.bin", message)
+    assert sniff(eml, "mail.bin") == "eml"
+    text = _text(eml, "eml")
+    assert "Subject: Threats" in text and "They came to the house again." in text
+
+    box = _write(tmp_path, "export", b"From ana@example.com Mon Jan  1 00:00:00 2024\n" + message + b"\n")
+    assert sniff(box, "export") == "mbox"
+    assert "They came to the house again." in _text(box, "mbox")
+
+
+def test_prose_starting_with_from_is_text(tmp_path):
+    prose = b"From March 2017 to June 2019 I lived in Tegucigalpa.\nThe gang threatened me twice.\n"
+    path = _write(tmp_path, "declaration.txt", prose)
+    assert sniff(path, "declaration.txt") == "txt"
+    assert _text(path, "txt").startswith("From March 2017")
@@ -0,0 +1,80 @@
+import time
+from fastapi.testclient import TestClient
+from main import app
+from auth import LAWQB_API_KEY
+
+client = TestClient(app)
+headers = {"x-api-key": LAWQB_API_KEY}
+
+
+def test_evidence_job_runs_in_background():
+    files = {"file": ("facts.txt", b"This affidavit describes events in detail.", "text/plain")}
+    resp = client.post("/jobs/evidence", files=files, data={"jurisdiction": "EOIR"}, headers=headers)
+    assert resp.status_code == 202
+    job_id = resp.json()["jobId"]
+
+    for _ in range(100):
+        body = client.get(f"/jobs/{job_id}", headers=headers).json()
+        if body["status"] in ("done", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert body["status"] == "done"
+    assert body["progress"]["chunksAnalyzed"] == body["progress"]["chunksTotal"] == 1
+    assert body["result"]["category"] == "case facts"
+
+
+def test_unknown_job_is_404():
+    assert client.get("/jobs/nope", headers=headers).status_code == 404
+
+
+def test_unfinished_jobs_resume_on_start(tmp_path):
+    from utils.jobs import JobRunner, JobStore, RUNNING
+
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.create("a.txt", "unused", {})
+    store.update(job_id, status=RUNNING)  # as if the worker died mid-job
+
+    async def handler(job, progress):
+        progress(chunksAnalyzed=1)
+        return {"ok": True}
+
+    JobRunner(store, handler).start()
+    for _ in range(100):
+        if store.get(job_id)["status"] == "done":
+            break
+        time.sleep(0.02)
+    assert store.get(job_id)["result"] == {"ok": True}
+
+
+def test_a_job_is_claimed_by_one_runner(tmp_path):
+    import asyncio
+    from utils.jobs import JobRunner, JobStore, RUNNING
+
+    path = str(tmp_path / "jobs.sqlite")
+    runs = []
+
+    async def handler(job, progress):
+        runs.append(job["id"])
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    # two processes sharing one database
+    first, second = JobStore(path), JobStore(path)
+    job_id = first.create("a.txt", "unused", {})
+    busy = first.create("b.txt", "unused", {})
+    first.renew("alive", 60)
+    assert first.claim(busy, "alive") and not second.claim(busy, "other")
+
+    runners = [JobRunner(first, handler), JobRunner(second, handler)]
+    for runner in runners:
+        runner.start()
+        runner.submit(job_id)
+    for _ in range(100):
+        if first.get(job_id)["status"] == "done":
+            break
+        time.sleep(0.02)
+    time.sleep(0.1)
+    assert runs == [job_id]
+    # a running job whose owner still holds its lease is left alone
+    assert first.get(busy)["status"] == RUNNING
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.llm import CircuitBreaker, CircuitOpenError, LLMGateway, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, wait):
+        super().__init__("429")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after-ms": str(wait * 1000)})
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+def fake_client(outcomes, calls):
+    async def create(**kwargs):
+        calls.append(time.monotonic())
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        message = SimpleNamespace(content=outcome)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    return lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_retry_honours_retry_after():
+    calls = []
+    gateway = LLMGateway(fake_client([RateLimited(0.2), "ok"], calls), backoff=0)
+    reply = asyncio.run(gateway.chat([{"role": "user", "content": "hi"}]))
+    assert reply == "ok"
+    assert calls[1] - calls[0] >= 0.2
+    assert gateway.stats()["throttled"] == 1
+
+
+def test_circuit_opens_and_fails_fast():
+    calls = []
+    gateway = LLMGateway(
+        fake_client([Unavailable()] * 3, calls),
+        max_retries=2,
+        backoff=0,
+        breaker=CircuitBreaker(failures=3, reset_after=60),
+    )
+    with pytest.raises(Unavailable):
+        asyncio.run(gateway.chat([{"role": "user", "content": "hi"}]))
+    assert gateway.stats()["circuit"] == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(gateway.chat([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 3
+
+
+def test_429_burst_does_not_open_circuit():
+    calls = []
+    gateway = LLMGateway(
+        fake_client([RateLimited(0.05)] * 6 + ["ok"] * 6, calls),
+        backoff=0,
+        breaker=CircuitBreaker(failures=3, reset_after=60),
+    )
+
+    async def burst():
+        return await asyncio.gather(*(gateway.chat([{"role": "user", "content": "hi"}]) for _ in range(6)))
+
+    assert asyncio.run(burst()) == ["ok"] * 6
+    assert gateway.stats()["circuit"] == "closed"
+
+
+def test_cancelled_trial_call_releases_half_open_circuit():
+    breaker = CircuitBreaker(failures=1, reset_after=0)
+    breaker.failure()
+
+    async def hang(**kwargs):
+        await asyncio.sleep(10)
+
+    hanging = lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=hang)))
+    gateway = LLMGateway(hanging, breaker=breaker)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(gateway.chat([{"role": "user", "content": "hi"}]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_trial())
+    assert breaker.before_call() is True  # the next caller gets the trial
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # one per 0.1 s
+
+    async def take_three():
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+
+    assert asyncio.run(take_three()) >= 0.18
@@ -0,0 +1,31 @@
+import uuid
+from fastapi.testclient import TestClient
+from main import app
+from auth import LAWQB_API_KEY
+from utils.metrics import Metrics, begin_request
+
+client = TestClient(app)
+headers = {"x-api-key": LAWQB_API_KEY}
+
+
+def test_upload_reports_stage_timings_and_metrics():
+    content = f"Affidavit {uuid.uuid4().hex}.".encode()
+    files = {"file": ("facts.txt", content, "text/plain")}
+    resp = client.post("/uploadEvidence", files=files, headers=headers)
+    stages = [part.split(";")[0] for part in resp.headers["Server-Timing"].split(", ")]
+    for stage in ("upload_read", "extraction", "classification", "gpt", "aggregation", "total"):
+        assert stage in stages
+
+    text = client.get("/metrics").text
+    assert 'lawqb_stage_seconds_count{stage="extraction"}' in text
+    assert 'lawqb_http_requests_total{route="/uploadEvidence",status="200"}' in text
+    assert "lawqb_cache_misses_total" in text
+
+
+def test_usage_is_priced_per_request():
+    registry = Metrics()
+    timings = begin_request()
+    registry.record_usage("gpt-4", prompt_tokens=1000, completion_tokens=500)
+    assert timings.tokens == 1500
+    assert abs(timings.cost - 0.06) < 1e-9
+    assert 'lawqb_llm_tokens_total{kind="prompt",model="gpt-4"} 1000' in registry.render()
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+from utils import pdf_text
+
+
+def mixed_pdf() -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Typed declaration page")
+    doc.new_page()  # scanned page: no text layer
+    doc.new_page().insert_text((72, 72), "Another typed page")
+    return doc.tobytes()
+
+
+def test_only_blank_pages_are_ocrd(monkeypatch, tmp_path):
+    seen = []
+
+    def fake_ocr(width, height, samples, lang):
+        seen.append(len(samples) == width * height)
+        return "scanned text", 0.01
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(pdf_text, "ocr_available", lambda: True)
+    monkeypatch.setattr(pdf_text, "_get_pool", lambda: pool)
+    monkeypatch.setattr(pdf_text, "_ocr_samples", fake_ocr)
+
+    path = tmp_path / "mixed.pdf"
+    path.write_bytes(mixed_pdf())
+    pages = []
+    text = "".join(pdf_text.iter_pdf_text(str(path), on_page=pages.append))
+    assert pages == [1, 2, 3]
+    assert seen == [True]
+    assert text.index("Typed declaration") < text.index("scanned text") < text.index("Another typed")
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from main import app
+from utils import plugins
+from utils.plugins import LazyPlugin, PluginUnavailable
+
+
+def test_plugin_loads_once_and_remembers_failures():
+    calls = []
+    ok = LazyPlugin("ok", lambda: calls.append(1) or "module")
+    assert not ok.loaded
+    assert ok.load() == "module" and ok.load() == "module"
+    assert calls == [1] and ok.seconds is not None
+
+    def broken():
+        raise ImportError("not installed")
+
+    bad = LazyPlugin("bad", broken)
+    assert not bad.available()
+    try:
+        bad.load()
+    except PluginUnavailable as exc:
+        assert "not installed" in str(exc)
+    else:
+        raise AssertionError("expected PluginUnavailable")
+
+
+def test_ready_after_warm_up(monkeypatch):
+    monkeypatch.setenv("WARMUP_PLUGINS", "txt,pdf")
+    with TestClient(app) as client:
+        assert plugins.warmup.ready.wait(10)
+        resp = client.get("/ready")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["ready"] and body["importSeconds"] >= 0
+        assert body["plugins"]["pdf"]["state"] == "loaded"
+        assert client.get("/health").json() == {"status": "ok"}
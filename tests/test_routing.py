@@ -0,0 +1,73 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from utils.llm import LLMGateway
+from utils.routing import ModelRouter, Route, router_from_env
+
+CHUNK = {
+    "summary": "Police detained the declarant twice.",
+    "keyFacts": ["Detained in 2019"],
+    "legalIssues": ["Persecution"],
+    "recommendation": "Corroborate.",
+}
+
+
+def routed_client(replies, models):
+    async def create(**kwargs):
+        models.append(kwargs["model"])
+        message = SimpleNamespace(content=replies[kwargs["model"]])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    return lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def _use(monkeypatch, replies):
+    models = []
+    monkeypatch.setattr(main, "gateway", LLMGateway(routed_client(replies, models)))
+    monkeypatch.setattr(main, "router", ModelRouter({
+        "chunk": Route(("small", "large"), 0.3),
+        "reduce": Route(("large",), 0.3),
+        "analyze": Route(("large",), 0.3),
+    }))
+    return models
+
+
+def test_routes_from_env(monkeypatch):
+    monkeypatch.setenv("GPT_MODEL", "gpt-4o")
+    monkeypatch.setenv("GPT_ROUTE_ANALYZE", " gpt-4o-mini , gpt-4o ")
+    router = router_from_env()
+    assert router.route("chunk").models == ("gpt-4o-mini", "gpt-4o")
+    assert router.route("reduce").first_pass == ()
+    assert router.route("analyze").final == "gpt-4o"
+    assert router.key("chunk") == "gpt-4o-mini>gpt-4o@0.3"
+
+    monkeypatch.setenv("GPT_ROUTE_REDUCE", " , ")
+    with pytest.raises(ValueError):
+        router_from_env()
+
+
+def test_confident_first_pass_is_kept(monkeypatch):
+    models = _use(monkeypatch, {"small": json.dumps({**CHUNK, "confidence": 0.9}), "large": "{}"})
+    result = asyncio.run(main._chat_json("Summarize."))
+    assert models == ["small"]
+    assert result["summary"] == CHUNK["summary"]
+
+
+@pytest.mark.parametrize(
+    "first_pass",
+    [
+        json.dumps({**CHUNK, "confidence": 0.2}),  # unsure
+        json.dumps({**CHUNK, "summary": " "}),  # blank
+        json.dumps({"summary": "Only a summary."}),  # incomplete
+        "Sorry, I can't.",  # unparseable
+    ],
+)
+def test_weak_first_pass_escalates(monkeypatch, first_pass):
+    models = _use(monkeypatch, {"small": first_pass, "large": json.dumps({**CHUNK, "summary": "Large model."})})
+    result = asyncio.run(main._chat_json("Summarize."))
+    assert models == ["small", "large"]
+    assert result["summary"] == "Large model."
@@ -0,0 +1,59 @@
+import json
+import fitz
+from segment_by_toc import plan_segments, segment_pdf_by_toc
+
+
+def test_plan_sorts_and_reports_overlaps_and_gaps():
+    toc = [
+        {"tab": "TAB", "title": "PAGE IDENTITY DOCUMENTS"},
+        {"tab": "B", "title": "ID card", "startPage": 4, "endPage": 6},
+        {"tab": "A", "title": "Birth certificate", "startPage": 1, "endPage": 3},
+        {"tab": "C", "title": "Declaration", "startPage": 6, "endPage": 8},
+        {"tab": "D", "title": "Report", "startPage": 11, "endPage": 99},
+    ]
+    segments, issues = plan_segments(toc, page_count=12)
+    assert [s["tab"] for s in segments] == ["A", "B", "C"]
+    assert sorted(i["kind"] for i in issues) == ["gap", "overlap", "range"]
+
+
+def test_segments_written_in_parallel_with_text(tmp_path):
+    doc = fitz.open()
+    for i in range(6):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}")
+    pdf_path = tmp_path / "binder.pdf"
+    doc.save(str(pdf_path))
+    toc_path = tmp_path / "toc.json"
+    toc_path.write_text(json.dumps([
+        {"tab": "A", "title": "First", "startPage": 1, "endPage": 2},
+        {"tab": "B", "title": "Second", "startPage": 3, "endPage": 6},
+    ]))
+
+    saved = segment_pdf_by_toc(str(pdf_path), str(toc_path), str(tmp_path / "out"), workers=2, with_text=True)
+    assert [p.rsplit("/", 1)[-1] for p in saved] == ["A_First.pdf", "B_Second.pdf"]
+    assert len(fitz.open(saved[1])) == 4
+    assert "page 3" in (tmp_path / "out" / "B_Second.txt").read_text()
+
+
+def test_rerun_rewrites_only_changed_segments(tmp_path, capsys):
+    doc = fitz.open()
+    for i in range(6):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}")
+    pdf_path = tmp_path / "binder.pdf"
+    doc.save(str(pdf_path))
+    toc_path = tmp_path / "toc.json"
+    toc = [
+        {"tab": "A", "title": "First", "startPage": 1, "endPage": 2},
+        {"tab": "B", "title": "Second", "startPage": 3, "endPage": 6},
+    ]
+    toc_path.write_text(json.dumps(toc))
+    out = str(tmp_path / "out")
+    segment_pdf_by_toc(str(pdf_path), str(toc_path), out, workers=1)
+
+    toc[1]["endPage"] = 5  # TOC fix touches tab B only
+    toc_path.write_text(json.dumps(toc))
+    capsys.readouterr()
+    saved = segment_pdf_by_toc(str(pdf_path), str(toc_path), out, workers=1)
+    log = capsys.readouterr().out
+    assert "Up to date A_First.pdf" in log
+    assert "Saved B_Second.pdf (3–5)" in log
+    assert len(saved) == 2
@@ -0,0 +1,82 @@
+import json
+import fitz
+from utils import simple_split
+
+
+def make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+
+
+def test_batch_dry_run_writes_manifest_and_skips_known(tmp_path):
+    src, dest = tmp_path / "parts", tmp_path / "out"
+    src.mkdir()
+    make_pdf(src / "a.pdf", "Sworn declaration of the respondent")
+    make_pdf(src / "b.pdf", "Human Rights Watch annual report")
+    manifest = tmp_path / "plan.json"
+
+    simple_split.run(src, dest, workers=2, dry_run=True, manifest=manifest)
+    rows = json.loads(manifest.read_text())
+    assert {r["file"]: r["category"] for r in rows} == {
+        "a.pdf": "case facts",
+        "b.pdf": "country conditions",
+    }
+    assert sorted(p.name for p in src.iterdir()) == ["a.pdf", "b.pdf"]
+
+    make_pdf(src / "c.pdf", "Birth certificate")
+    simple_split.run(src, dest, workers=2, dry_run=True, manifest=manifest)
+    assert [r["file"] for r in json.loads(manifest.read_text())] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_real_run_after_dry_run_moves_planned_files(tmp_path):
+    src, dest = tmp_path / "parts", tmp_path / "out"
+    src.mkdir()
+    make_pdf(src / "a.pdf", "Sworn declaration of the respondent")
+    manifest = tmp_path / "plan.csv"
+
+    simple_split.run(src, dest, workers=1, dry_run=True, manifest=manifest)
+    simple_split.run(src, dest, workers=1, manifest=manifest)
+    assert (dest / "case_facts" / "a.pdf").exists()
+    assert not (src / "a.pdf").exists()
+
+
+def test_rerun_only_redoes_changed_files(tmp_path):
+    src, dest = tmp_path / "parts", tmp_path / "out"
+    src.mkdir()
+    make_pdf(src / "a.pdf", "Sworn declaration of the respondent")
+    original = (src / "a.pdf").read_bytes()
+    simple_split.run(src, dest, workers=1)
+    assert (dest / "case_facts" / "a.pdf").exists()
+
+    # same bytes dropped in again: skipped and left alone
+    (src / "a.pdf").write_bytes(original)
+    simple_split.run(src, dest, workers=1)
+    assert (src / "a.pdf").exists()
+
+    # new content under the same name: reclassified and moved to its new folder
+    make_pdf(src / "a.pdf", "Amnesty International country report")
+    simple_split.run(src, dest, workers=1)
+    assert not (dest / "case_facts" / "a.pdf").exists()
+    assert (dest / "country_conditions" / "a.pdf").exists()
+
+
+def test_weighted_scores_beat_a_stray_trigger():
+    report = "Human Rights Watch country report. " * 20 + "Her passport was seized."
+    label = simple_split.score_text(report)
+    assert label.category == "country conditions"
+    assert label.confidence > 0.85
+
+    assert simple_split.score_text("").confidence == 0.5
+
+
+def test_stream_classifier_stops_early_and_joins_split_triggers():
+    classifier = simple_split.StreamClassifier()
+    classifier.feed("Sworn affi")
+    classifier.feed("davit of the respondent.")
+    assert classifier.scores["case facts"] == 6
+    for _ in range(3):
+        classifier.feed("Declaration. ")
+    assert classifier.decided
+    classifier.feed("UNHCR " * 100)
+    assert classifier.scores["country conditions"] == 0
@@ -0,0 +1,31 @@
+import json
+import uuid
+from fastapi.testclient import TestClient
+from main import app
+from auth import LAWQB_API_KEY
+
+client = TestClient(app)
+headers = {"x-api-key": LAWQB_API_KEY}
+
+
+def test_upload_evidence_streams_chunks_then_result():
+    content = f"Sworn declaration {uuid.uuid4().hex}.".encode()
+    files = {"file": ("facts.txt", content, "text/plain")}
+    resp = client.post("/uploadEvidence?stream=ndjson", files=files, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["event"] for e in events] == ["chunk", "result"]
+    assert events[0]["index"] == 0
+    assert events[1]["result"]["category"] == "case facts"
+
+
+def test_analyze_streams_tokens_as_sse():
+    question = f"Is {uuid.uuid4().hex} a particular social group?"
+    resp = client.post("/analyze?stream=sse", json={"question": question}, headers=headers)
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in resp.text.split("\n\n") if f]
+    names = [f.split("\n")[0] for f in frames]
+    assert names[-1] == "event: result" and set(names[:-1]) == {"event: token"}
+    text = "".join(json.loads(f.split("data: ", 1)[1])["text"] for f in frames[:-1])
+    assert question in text
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import main
+from main import AnalyzeResponse, ChunkAnalysis
+from utils.llm import LLMGateway
+from utils.structured import conform, extract_json
+
+
+def scripted_client(replies, seen):
+    async def create(**kwargs):
+        seen.append(kwargs)
+        message = SimpleNamespace(content=replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    return lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_extract_json_repairs_locally():
+    assert extract_json('```json\n{"summary": "Fled", "keyFacts": ["a",],}\n```') == {"summary": "Fled", "keyFacts": ["a"]}
+    assert extract_json('Here you go: {"summary": "a {b}"} Hope it helps.') == {"summary": "a {b}"}
+    # cut off mid-value and mid-key
+    assert extract_json('{"summary": "Fled in 20') == {"summary": "Fled in 20"}
+    assert extract_json('{"summary": "Fled", "keyFacts": ["a", "b"], "legalIss') == {"summary": "Fled", "keyFacts": ["a", "b"]}
+    assert extract_json("I cannot help with that.") is None
+
+
+def test_conform_coerces_defaults_and_reports_missing():
+    shaped, missing = conform({"summary": ["One.", "Two."], "keyFacts": "Single fact", "extra": 1}, ChunkAnalysis)
+    assert shaped == {
+        "summary": "One.\nTwo.",
+        "keyFacts": ["Single fact"],
+        "credibilityConcerns": "",
+        "verificationNotes": "",
+        "confidence": None,
+    }
+    assert missing == ["legalIssues", "recommendation"]
+
+
+def test_only_missing_fields_are_asked_for(monkeypatch):
+    seen = []
+    replies = ['{"summary": "Fled", "keyFacts": ["Beaten in 2019"]}', '{"legalIssues": ["Nexus"], "recommendation": "File"}']
+    monkeypatch.setattr(main, "gateway", LLMGateway(scripted_client(replies, seen)))
+    result = asyncio.run(main._chat_json("Condense this.", task="reduce"))
+    assert result["legalIssues"] == ["Nexus"] and result["summary"] == "Fled"
+    follow_up = seen[1]["messages"]
+    assert follow_up[-2]["role"] == "assistant"
+    assert "- legalIssues (list of strings)\n- recommendation" in follow_up[-1]["content"]
+    assert "summary" not in follow_up[-1]["content"]
+
+
+def test_unparseable_reply_is_restated_then_defaulted(monkeypatch):
+    seen = []
+    replies = ["The issue is nexus.", '{"issue": "Nexus", "rule": "INA 208"}']
+    monkeypatch.setattr(main, "gateway", LLMGateway(scripted_client(replies, seen)))
+    result = asyncio.run(main._chat_json("Q?", AnalyzeResponse, task="analyze", system="IRAC", fill=main.ANALYZE_FILL))
+    # the restatement request carries the reply, not the original prompt
+    assert [m["role"] for m in seen[1]["messages"]] == ["system", "user"]
+    assert "The issue is nexus." in seen[1]["messages"][1]["content"] and "Q?" not in seen[1]["messages"][1]["content"]
+    answer = AnalyzeResponse(**result)
+    assert answer.rule == "INA 208" and answer.application == ""
+    assert "Not returned by the model: application, conclusion" in answer.verificationNotes
+
+
+def test_json_mode_sets_response_format():
+    seen = []
+    gateway = LLMGateway(scripted_client(["{}"], seen))
+    asyncio.run(gateway.chat([{"role": "user", "content": "JSON please"}], json_mode=True))
+    assert seen[0]["response_format"] == {"type": "json_object"}
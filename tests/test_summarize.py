@@ -0,0 +1,34 @@
+import asyncio
+from utils.summarize import dedupe, merge_results, tree_reduce
+
+
+def test_dedupe_is_fuzzy_and_keeps_first_seen_order():
+    items = [
+        "Respondent was detained in 2019.",
+        "The applicant fled to Honduras",
+        "respondent was detained in 2019",
+        "Respondent was detained in 2019!!",
+        "Respondent was beaten by police.",
+        "Respondent was detained in 2018.",
+    ]
+    assert dedupe(items) == [
+        "Respondent was detained in 2019.",
+        "The applicant fled to Honduras",
+        "Respondent was beaten by police.",
+        "Respondent was detained in 2018.",
+    ]
+
+
+def test_tree_reduce_uses_fan_in_levels():
+    parts = [{"summary": f"Part {i}.", "keyFacts": ["Shared fact", f"Fact {i}"]} for i in range(10)]
+    group_sizes = []
+
+    async def reduce_fn(group):
+        group_sizes.append(len(group))
+        return merge_results(group)
+
+    final = asyncio.run(tree_reduce(parts, reduce_fn, fan_in=3))
+    assert max(group_sizes) <= 3
+    assert final["keyFacts"][0] == "Shared fact"
+    assert final["keyFacts"].count("Shared fact") == 1
+    assert final["summary"].startswith("Part 0. Part 1. Part 2.")
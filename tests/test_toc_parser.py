@@ -0,0 +1,68 @@
+import fitz
+from toc_parser_final import discover_toc
+
+
+def write_lines(page, lines):
+    for i, line in enumerate(lines):
+        page.insert_text((72, 60 + 14 * i), line)
+
+
+def test_finds_multi_page_toc_anywhere_in_front_matter(tmp_path):
+    doc = fitz.open()
+    write_lines(doc.new_page(), ["Respondent's Exhibits in Support of Asylum"])
+    write_lines(doc.new_page(), ["INDEX", "A.", "Birth certificate", "1-3", "B.", "ID card", "4-6"])
+    write_lines(doc.new_page(), ["C.", "Declaration", "7-12", "D.", "Country report", "13"])
+    for _ in range(3):
+        write_lines(doc.new_page(), ["Exhibit body text that is not an index."])
+    path = tmp_path / "binder.pdf"
+    doc.save(str(path))
+
+    entries = discover_toc(str(path))
+    assert [e["tab"] for e in entries] == ["A", "B", "C", "D"]
+    assert entries[2] == {"tab": "C", "title": "Declaration", "startPage": 7, "endPage": 12}
+
+
+def test_falls_back_to_embedded_outline(tmp_path):
+    doc = fitz.open()
+    for _ in range(5):
+        write_lines(doc.new_page(), ["Plain exhibit page."])
+    doc.set_toc([[1, "Tab A - Birth certificate", 1], [1, "Tab B - Declaration", 3]])
+    path = tmp_path / "binder.pdf"
+    doc.save(str(path))
+
+    assert discover_toc(str(path)) == [
+        {"tab": "A", "title": "Birth certificate", "startPage": 1, "endPage": 2},
+        {"tab": "B", "title": "Declaration", "startPage": 3, "endPage": 5},
+    ]
+
+
+def test_single_entry_continuation_page_is_kept(tmp_path):
+    doc = fitz.open()
+    write_lines(doc.new_page(), ["INDEX", "A.", "Birth certificate", "1-3", "B.", "ID card", "4-16"])
+    write_lines(doc.new_page(), ["G.", "Medical records", "17-20"])
+    for _ in range(3):
+        write_lines(doc.new_page(), ["Exhibit body text that is not an index."])
+    path = tmp_path / "binder.pdf"
+    doc.save(str(path))
+
+    assert [e["tab"] for e in discover_toc(str(path))] == ["A", "B", "G"]
+
+
+def test_outline_form_numbers_are_not_tabs(tmp_path):
+    doc = fitz.open()
+    for _ in range(4):
+        write_lines(doc.new_page(), ["Plain exhibit page."])
+    doc.set_toc([
+        [1, "I-589 Application for Asylum", 1],
+        [1, "G-28 Notice of Appearance", 2],
+        [1, "Tab C: Declaration", 3],
+    ])
+    path = tmp_path / "binder.pdf"
+    doc.save(str(path))
+
+    entries = discover_toc(str(path))
+    assert [(e["tab"], e["title"]) for e in entries] == [
+        ("1", "I-589 Application for Asylum"),
+        ("2", "G-28 Notice of Appearance"),
+        ("C", "Declaration"),
+    ]
@@ -3,23 +3,124 @@ import fitz  # PyMuPDF
 import json
 import argparse
 
-def extract_toc_lines(pdf_path):
-    doc = fitz.open(pdf_path)
-    page = doc[3]  # TOC is on page 4 (index 3)
-    lines = page.get_text("text").splitlines()
-    cleaned = [line.strip() for line in lines if line.strip()]
-    print("🔍 Structured TOC lines:\n")
-    for i, line in enumerate(cleaned):
-        print(f"[{i}] {line}")
+FRONT_MATTER_PAGES = 15   # a binder's index is never further in than this
+MIN_SCORE = 0.2           # share of TOC-looking lines for a page to count as TOC
+
+TAB_LINE = re.compile(r"^(?:Tab\s+|TAB\s+)?([A-Z]{1,3})\.?$")
+PAGE_LINE = re.compile(r"^(\d+)\s*[–—-]?\s*(\d+)?$")
+TOC_HEADING = re.compile(r"\b(index|table\s+of\s+contents|exhibit\s+list)\b", re.I)
+# capital letters only, and without "Tab" not followed by a digit: "I-589 …" and "G-28 …" are forms, not tabs
+OUTLINE_TAB = re.compile(r"^(?:(?i:tab)\s+([A-Z]{1,3})|([A-Z]{1,3})(?![.:)\-–—\s]*\d))\s*[.:)\-–—]\s*(.*)$")
+
+def _page_lines(page):
+    return [line.strip() for line in page.get_text("text").splitlines() if line.strip()]
+
+def score_page(lines, continuation=False):
+    """
+    Cheap TOC likelihood: share of lines that are tab markers or page ranges.
+
+    A *continuation* page (right after an accepted TOC page) may hold a
+    single tab; any other page needs at least two.
+    """
+    if not lines:
+        return 0.0
+    tabs = sum(1 for line in lines if TAB_LINE.match(line))
+    pages = sum(1 for line in lines if PAGE_LINE.match(line))
+    least = 1 if continuation else 2
+    if tabs < least or pages < least:
+        return 0.0
+    score = (tabs + pages) / len(lines)
+    if any(TOC_HEADING.search(line) for line in lines[:5]):
+        score += 0.1
+    return score
+
+def find_toc_pages(doc, max_pages=FRONT_MATTER_PAGES):
+    """
+    Return ``(page_indexes, lines_by_page)`` for the TOC in the front matter.
+
+    The best-scoring page is taken and extended over neighbouring pages that
+    still look like TOC continuation, so multi-page indexes are merged.
+    """
+    lines_by_page = {}
+    scores = {}
+    for i in range(min(max_pages, len(doc))):
+        lines_by_page[i] = _page_lines(doc[i])
+        scores[i] = score_page(lines_by_page[i])
+
+    if not scores or max(scores.values()) < MIN_SCORE:
+        return [], lines_by_page
+
+    best = max(scores, key=scores.get)
+    first = last = best
+    while first - 1 in scores and scores[first - 1] >= MIN_SCORE / 2:
+        first -= 1
+    while last + 1 in scores and score_page(lines_by_page[last + 1], continuation=True) >= MIN_SCORE / 2:
+        last += 1
+    return list(range(first, last + 1)), lines_by_page
+
+def extract_toc_lines(pdf_path, max_pages=FRONT_MATTER_PAGES, verbose=False):
+    with fitz.open(pdf_path) as doc:
+        toc_pages, lines_by_page = find_toc_pages(doc, max_pages)
+    cleaned = [line for i in toc_pages for line in lines_by_page[i]]
+    if verbose:
+        print(f"🔍 TOC found on page(s) {[i + 1 for i in toc_pages]}:\n")
+        for i, line in enumerate(cleaned):
+            print(f"[{i}] {line}")
     return cleaned
 
+def outline_entries(doc):
+    """Build TOC entries from the PDF's embedded outline (top-level bookmarks)."""
+    top = [(title.strip(), page) for level, title, page in doc.get_toc(simple=True) if level == 1 and page > 0]
+    entries = []
+    for n, (title, page) in enumerate(top):
+        end = top[n + 1][1] - 1 if n + 1 < len(top) else len(doc)
+        match = OUTLINE_TAB.match(title)
+        entries.append({
+            "tab": (match.group(1) or match.group(2)) if match else str(n + 1),
+            "title": match.group(3).strip() if match and match.group(3).strip() else title,
+            "startPage": page,
+            "endPage": max(page, end),
+        })
+    return entries
+
+def toc_from_doc(doc, max_pages=FRONT_MATTER_PAGES, verbose=False):
+    """
+    Find and parse the TOC of an open *doc*; returns ``(entries, source)``.
+
+    *source* is "printed" when the index pages yielded page ranges, "outline"
+    when the embedded bookmarks were used instead, and "none" when neither
+    produced any entries.
+    """
+    toc_pages, lines_by_page = find_toc_pages(doc, max_pages)
+    lines = [line for i in toc_pages for line in lines_by_page[i]]
+    entries = parse_toc(lines) if lines else []
+    if verbose and toc_pages:
+        print(f"🔍 TOC found on page(s) {[i + 1 for i in toc_pages]}")
+    if any("startPage" in e for e in entries):
+        return entries, "printed"
+    entries = outline_entries(doc)
+    if verbose:
+        print(f"🔖 No printed TOC found; using {len(entries)} outline entries")
+    return entries, "outline" if entries else "none"
+
+def discover_toc(pdf_path, max_pages=FRONT_MATTER_PAGES, verbose=False):
+    """
+    Find and parse the binder's TOC without being told where it is.
+
+    Only the first *max_pages* pages are read.  When no printed index is
+    found there (or it yields no page ranges), the embedded outline is used.
+    """
+    with fitz.open(pdf_path) as doc:
+        entries, _ = toc_from_doc(doc, max_pages, verbose)
+    return entries
+
 def parse_toc(lines):
     toc_entries = []
     current = {}
     i = 0
 
-    tab_pattern = re.compile(r"^([A-Z]{1,3})\.?$")
-    page_pattern = re.compile(r"^(\d+)\s*[–—-]?\s*(\d+)?$")
+    tab_pattern = TAB_LINE
+    page_pattern = PAGE_LINE
 
     while i < len(lines):
         line = lines[i]
@@ -58,10 +159,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parse TOC PDF with labeled tabs")
     parser.add_argument("pdf_path", help="Path to the TOC PDF file")
     parser.add_argument("--output", default="toc_output.json", help="Path to save JSON")
+    parser.add_argument("--max-pages", type=int, default=FRONT_MATTER_PAGES, help="Front-matter pages to scan for the TOC")
+    parser.add_argument("--verbose", action="store_true", help="Print the detected TOC pages")
     args = parser.parse_args()
 
-    lines = extract_toc_lines(args.pdf_path)
-    toc_data = parse_toc(lines)
+    toc_data = discover_toc(args.pdf_path, args.max_pages, verbose=args.verbose)
 
     with open(args.output, "w") as f:
         json.dump(toc_data, f, indent=2)
@@ -0,0 +1,211 @@
+"""
+Content-addressed result cache for GPT analysis.
+
+✔  keys are a SHA-256 over normalised text + the settings that shape the answer
+✔  MemoryLRU    – in-process tier, size-bounded, optional TTL
+✔  SQLiteCache  – on-disk tier, survives restarts, TTL + row-count eviction
+✔  TieredCache  – reads through the tiers in order and back-fills faster ones
+
+Values must be JSON-serialisable (the dicts we get back from GPT are).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+
+
+# ---------- keys ------------------------------------------------------------
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of the same text hash alike."""
+    return _WS.sub(" ", text or "").strip()
+
+
+def make_key(*parts: Optional[str]) -> str:
+    """Hash *parts* into one stable cache key."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x1f")  # unit separator keeps ("ab","c") != ("a","bc")
+    return h.hexdigest()
+
+
+# ---------- tiers -----------------------------------------------------------
+class MemoryLRU:
+    """Thread-safe LRU dict with optional per-entry TTL."""
+
+    def __init__(self, max_items: int = 1024, ttl: Optional[float] = None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Single-table on-disk cache; oldest-accessed rows go first when full."""
+
+    def __init__(self, path: str, max_items: int = 100_000, ttl: Optional[float] = None):
+        self.path = path
+        self.max_items = max_items
+        self.ttl = ttl
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_items:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_items,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class TieredCache:
+    """Look keys up tier by tier; a hit in a slow tier is copied into the faster ones."""
+
+    def __init__(self, tiers: List[Any]):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits = [0] * len(tiers)
+
+    def get(self, key: str) -> Optional[Any]:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                self.hits += 1
+                self.tier_hits[i] += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+            "tiers": [
+                {"name": type(t).__name__, "entries": len(t), "hits": h}
+                for t, h in zip(self.tiers, self.tier_hits)
+            ],
+        }
+
+
+# ---------- factory ---------------------------------------------------------
+def cache_from_env() -> TieredCache:
+    """
+    Build the default two-tier cache from environment variables:
+
+        RESULT_CACHE_MAX_ITEMS       in-memory entries        (default 2048)
+        RESULT_CACHE_PATH            SQLite file, "" disables (default .cache/results.sqlite)
+        RESULT_CACHE_MAX_DISK_ITEMS  on-disk rows             (default 100000)
+        RESULT_CACHE_TTL             seconds, 0 = no expiry   (default 7 days)
+    """
+    ttl = float(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600))) or None
+    tiers: List[Any] = [MemoryLRU(int(os.getenv("RESULT_CACHE_MAX_ITEMS", "2048")), ttl)]
+    path = os.getenv("RESULT_CACHE_PATH", os.path.join(".cache", "results.sqlite"))
+    if path:
+        try:
+            tiers.append(
+                SQLiteCache(path, int(os.getenv("RESULT_CACHE_MAX_DISK_ITEMS", "100000")), ttl)
+            )
+        except sqlite3.Error as exc:
+            log.warning("result cache disk tier disabled: %s", exc)
+    return TieredCache(tiers)
@@ -0,0 +1,252 @@
+"""
+Token-aware, boundary-respecting chunking of streamed text.
+
+✔  chunks are packed by token count (tiktoken when installed, a local estimate otherwise)
+✔  cuts prefer page > paragraph > sentence > line boundaries, words only as a last resort
+✔  configurable overlap carries the tail of one chunk into the next
+✔  every chunk records the page range it came from
+
+Input is a stream of ``(page_no, text)`` pieces; pieces that share a page
+number are treated as one continuous text, so a decoded block may end
+mid-sentence.  Chunks are yielded as soon as they are full.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# boundary strength *after* a segment
+WORD, LINE, SENTENCE, PARAGRAPH, PAGE = range(5)
+
+MIN_FILL = 0.5  # never cut a chunk below this share of the budget to hit a nicer boundary
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s*$")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_TOKENISH = re.compile(r"[A-Za-z0-9]+|[^\sA-Za-z0-9]")
+
+
+# ---------- tokens ----------------------------------------------------------
+_encodings: dict = {}
+_tiktoken = None  # imported on first use; False once the import has failed
+
+
+def _load_tiktoken():
+    global _tiktoken
+    if _tiktoken is None:
+        try:
+            import tiktoken
+        except Exception:  # pragma: no cover - optional dependency
+            tiktoken = False
+        _tiktoken = tiktoken
+    return _tiktoken or None
+
+
+def _encoding(model: str):
+    tiktoken = _load_tiktoken()
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model]
+
+
+def warm_tokenizer(model: str = "gpt-4"):
+    """Import tiktoken and load *model*'s encoding tables; raises if tiktoken is missing."""
+    enc = _encoding(model)
+    if enc is None:
+        raise ImportError("tiktoken is not installed")
+    return enc
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Token count for *text*; falls back to an estimate when tiktoken is missing."""
+    enc = _encoding(model)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # ASCII words cost ~1 token per 4 chars; every other symbol (incl. non-Latin
+    # letters) is counted as its own token, which errs on the safe side
+    return sum(max(1, len(t) // 4) if t.isascii() else 1 for t in _TOKENISH.findall(text))
+
+
+def _split_by_tokens(text: str, max_tokens: int, model: str) -> List[str]:
+    enc = _encoding(model)
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return [enc.decode(ids[i : i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+    parts, current, used = [], [], 0
+    for word in re.findall(r"\S+\s*", text):
+        cost = count_tokens(word, model)
+        # unspaced runs (CJK, long IDs) are cut by characters; no character costs more than a token
+        pieces = [word] if cost <= max_tokens else [word[i : i + max_tokens] for i in range(0, len(word), max_tokens)]
+        for piece in pieces:
+            cost = count_tokens(piece, model) if len(pieces) > 1 else cost
+            if current and used + cost > max_tokens:
+                parts.append("".join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += cost
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+# ---------- chunks ----------------------------------------------------------
+@dataclass
+class Chunk:
+    text: str
+    start_page: Optional[int]
+    end_page: Optional[int]
+    tokens: int
+
+    @property
+    def pages(self) -> str:
+        """Human-readable page range, e.g. "3–5" ("" for unpaged formats)."""
+        if self.start_page is None:
+            return ""
+        if self.start_page == self.end_page:
+            return str(self.start_page)
+        return f"{self.start_page}–{self.end_page}"
+
+
+@dataclass
+class _Segment:
+    text: str
+    page: Optional[int]
+    strength: int
+    tokens: int
+
+
+def _segments(
+    pieces: Iterable[Tuple[Optional[int], str]], max_tokens: int, model: str
+) -> Iterator[_Segment]:
+    """Turn the piece stream into line-sized segments tagged with the boundary after them."""
+
+    def emit(line: str, page: Optional[int], strength: int) -> Iterator[_Segment]:
+        tokens = count_tokens(line, model)
+        if tokens <= max_tokens:
+            yield _Segment(line, page, strength, tokens)
+            return
+        sentences = _SENTENCE_SPLIT.split(line)
+        for i, sentence in enumerate(sentences):
+            last = i == len(sentences) - 1
+            s_strength = strength if last else SENTENCE
+            s_tokens = count_tokens(sentence, model)
+            if s_tokens <= max_tokens:
+                yield _Segment(sentence if last else sentence + " ", page, s_strength, s_tokens)
+                continue
+            parts = _split_by_tokens(sentence if last else sentence + " ", max_tokens, model)
+            for j, part in enumerate(parts):
+                yield _Segment(
+                    part, page, s_strength if j == len(parts) - 1 else WORD, count_tokens(part, model)
+                )
+
+    def line_strength(line: str, next_blank: bool) -> int:
+        if next_blank:
+            return PARAGRAPH
+        return SENTENCE if _SENTENCE_END.search(line) else LINE
+
+    buffered = ""
+    page: Optional[int] = None
+    pending: Optional[str] = None  # last complete line, waiting to see if a blank line follows
+
+    def flush_pending(next_blank: bool) -> Iterator[_Segment]:
+        nonlocal pending
+        if pending is not None:
+            yield from emit(pending, page, line_strength(pending, next_blank))
+            pending = None
+
+    for piece_page, text in pieces:
+        if piece_page != page:
+            # close out the previous page: its last line ends on a page boundary
+            if buffered.strip():
+                yield from flush_pending(False)
+                pending = buffered
+            if pending is not None:
+                yield from emit(pending, page, PAGE)
+                pending = None
+            buffered = ""
+        page = piece_page
+        buffered += text
+        *lines, buffered = buffered.split("\n")
+        for line in lines:
+            if not line.strip():
+                yield from flush_pending(True)
+                continue
+            yield from flush_pending(False)
+            pending = line + "\n"
+
+    if buffered.strip():
+        yield from flush_pending(False)
+        pending = buffered
+    if pending is not None:
+        yield from emit(pending, page, PAGE)
+
+
+def iter_token_chunks(
+    pieces: Iterable[Tuple[Optional[int], str]],
+    *,
+    max_tokens: int = 2_500,
+    overlap_tokens: int = 0,
+    model: str = "gpt-4",
+) -> Iterator[Chunk]:
+    """
+    Pack ``(page_no, text)`` pieces into chunks of at most *max_tokens*.
+
+    When a chunk is full it is cut at the strongest boundary that still
+    leaves it at least half full; the segments after the cut start the next
+    chunk, preceded by up to *overlap_tokens* of the previous chunk's tail.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    current: List[_Segment] = []
+    used = 0
+    carried = 0  # leading overlap segments in *current* that must not be cut off alone
+
+    def make(segs: List[_Segment]) -> Chunk:
+        pages = [s.page for s in segs if s.page is not None]
+        return Chunk(
+            "".join(s.text for s in segs),
+            min(pages) if pages else None,
+            max(pages) if pages else None,
+            sum(s.tokens for s in segs),
+        )
+
+    def cut_index() -> int:
+        """Index after which to cut *current* (always leaves at least one new segment)."""
+        best, best_strength, running = len(current) - 1, -1, 0
+        for i, seg in enumerate(current):
+            running += seg.tokens
+            if i < carried or running < max_tokens * MIN_FILL:
+                continue
+            if seg.strength >= best_strength:
+                best, best_strength = i, seg.strength
+        return max(best, carried)
+
+    def tail_overlap(segs: List[_Segment]) -> List[_Segment]:
+        tail, total = [], 0
+        for seg in reversed(segs):
+            if total + seg.tokens > overlap_tokens:
+                break
+            tail.insert(0, seg)
+            total += seg.tokens
+        return tail
+
+    for seg in _segments(pieces, max_tokens, model):
+        while current and used + seg.tokens > max_tokens and len(current) > carried:
+            i = cut_index()
+            emitted, rest = current[: i + 1], current[i + 1 :]
+            yield make(emitted)
+            overlap = tail_overlap(emitted[carried:]) if overlap_tokens else []
+            current = overlap + rest
+            carried = len(overlap)
+            used = sum(s.tokens for s in current)
+            if used + seg.tokens > max_tokens:  # overlap would block progress; drop it
+                current, carried = rest, 0
+                used = sum(s.tokens for s in current)
+        current.append(seg)
+        used += seg.tokens
+
+    if len(current) > carried:
+        yield make(current)
@@ -0,0 +1,188 @@
+"""
+Small asyncio helpers for fanning work out to a blocking backend.
+
+✔  bounded_gather    – run many coroutines with a max-in-flight limit,
+                       results come back in submission order
+✔  bounded_map       – same, but pulls items lazily from an async iterator
+✔  iterate_in_thread – drive a blocking generator from a thread with backpressure
+✔  SingleFlight      – concurrent calls with the same key share one execution
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# ---------- bounded fan-out -------------------------------------------------
+async def bounded_gather(
+    factories: Iterable[Callable[[], Awaitable[T]]],
+    *,
+    limit: int = 4,
+) -> List[T]:
+    """
+    Run every ``factory()`` with at most *limit* awaiting at once.
+
+    Factories (not coroutines) are passed so nothing starts before a slot
+    is free.  The returned list is in the same order as *factories*.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def _run(factory: Callable[[], Awaitable[T]]) -> T:
+        async with sem:
+            return await factory()
+
+    return list(await asyncio.gather(*(_run(f) for f in factories)))
+
+
+async def bounded_map(
+    items: AsyncIterator[T],
+    worker: Callable[[T], Awaitable[R]],
+    *,
+    limit: int = 4,
+) -> List[R]:
+    """
+    Apply *worker* to every item of *items* with at most *limit* in flight.
+
+    The next item is only pulled once a slot is free, so a lazy producer is
+    never read further ahead than the work in progress.  Results keep the
+    order of *items*.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+    tasks: List[asyncio.Task] = []
+    try:
+        async for item in items:
+            await sem.acquire()
+            task = asyncio.ensure_future(worker(item))
+            task.add_done_callback(lambda _: sem.release())
+            tasks.append(task)
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+# ---------- blocking generator → async iterator -----------------------------
+class _Raised:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(
+    factory: Callable[[], Iterator[T]],
+    *,
+    maxsize: int = 2,
+) -> AsyncIterator[T]:
+    """
+    Run ``factory()`` in a worker thread and yield its items on the event loop.
+
+    At most *maxsize* items wait in the hand-off queue; the producer blocks
+    until the consumer catches up.  Exceptions from the generator are
+    re-raised in the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce() -> None:
+        try:
+            for item in factory():
+                if stop.is_set():
+                    return
+                put(item)
+        except BaseException as exc:
+            if not stop.is_set():
+                put(_Raised(exc))
+            return
+        if not stop.is_set():
+            put(_DONE)
+
+    # the producer sees the caller's context vars (e.g. per-request timings)
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Raised):
+                raise item.exc
+            yield item
+    finally:
+        # unblock a producer that is waiting on a full queue, then let it exit
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
+
+
+# ---------- single-flight ---------------------------------------------------
+class SingleFlight:
+    """
+    Coalesce concurrent ``do(key, fn)`` calls: the first caller runs ``fn()``,
+    everyone arriving while it runs awaits the same result (or exception).
+
+    With *window* > 0 a finished result is also handed to callers arriving
+    within *window* seconds.  The shared call is shielded, so one caller
+    going away does not cancel it for the others.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._recent: Dict[str, Tuple[float, Any]] = {}
+
+    def _lookup_recent(self, key: str, now: float):
+        for k in [k for k, (expires, _) in self._recent.items() if expires <= now]:
+            del self._recent[k]
+        return self._recent.get(key)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        recent = self._lookup_recent(key, time.monotonic())
+        if recent is not None:
+            self.coalesced += 1
+            return recent[1]
+
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def finished(t: asyncio.Task) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if self.window > 0 and not t.cancelled() and t.exception() is None:
+                self._recent[key] = (time.monotonic() + self.window, t.result())
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "inFlight": len(self._inflight)}
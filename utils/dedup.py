@@ -0,0 +1,202 @@
+"""
+Near-duplicate detection for evidence chunks (shingling + MinHash + LSH).
+
+✔  a chunk is reduced to word 5-gram shingles and a 128-value MinHash
+   signature; matching values estimate the Jaccard similarity of two chunks
+✔  LSH banding (16 bands × 8 rows) turns "find similar chunks" into 16
+   exact bucket lookups, so queries stay cheap at millions of chunks
+✔  the index lives in SQLite (WITHOUT ROWID band table, WAL): persistent,
+   shared by every worker on the node, no server
+✔  every analyzed chunk is stored with its result, so a later near-identical
+   chunk of the same case (another file, another upload) reuses it
+
+Candidates from the buckets are confirmed against their stored signatures,
+and must mention exactly the same names, numbers and dates (fact_digest), so
+two declarations filled in from one template are never mixed up.  Buckets
+are scoped by the caller (case, prompt version, jurisdiction, context), so a
+chunk is only ever matched with analyses of the same case made the same way.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_DIGIT = re.compile(r"\d")
+_MERSENNE = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+
+Signature = Sequence[int]
+
+
+# ---------- signatures ------------------------------------------------------
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """CRC-32 hashes of the casefolded word *k*-grams of *text*."""
+    words = _WORD.findall(text.casefold())
+    if len(words) < k:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i : i + k]).encode("utf-8")) for i in range(len(words) - k + 1)}
+
+
+class MinHasher:
+    """Fixed random permutations ``(a·x + b) mod p``; the seed makes signatures comparable across runs."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, text: str, *, min_words: int = 0) -> Optional[List[int]]:
+        """MinHash of *text*, or None when it has fewer than *min_words* words."""
+        if min_words and len(_WORD.findall(text)) < min_words:
+            return None
+        hashes = list(shingles(text))
+        if not hashes:
+            return None
+        return [min([(a * x + b) % _MERSENNE for x in hashes]) & _MASK32 for a, b in self._perms]
+
+
+def fact_digest(text: str) -> str:
+    """Digest of the capitalised words and numbers in *text*: names, places, dates, amounts."""
+    facts = sorted({w for w in _WORD.findall(text) if w[0].isupper() or _DIGIT.search(w)})
+    return hashlib.blake2b("\x1f".join(facts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity: the share of equal MinHash values."""
+    return sum(x == y for x, y in zip(a, b)) / max(1, len(a))
+
+
+def _pack(signature: Signature) -> bytes:
+    return struct.pack(f"<{len(signature)}I", *signature)
+
+
+def _unpack(blob: bytes) -> List[int]:
+    return list(struct.unpack(f"<{len(blob) // 4}I", blob))
+
+
+# ---------- LSH index -------------------------------------------------------
+class Match(NamedTuple):
+    similarity: float
+    source: str
+    pages: str
+    result: Dict[str, Any]
+
+
+class LSHIndex:
+    def __init__(self, path: str, *, num_perm: int = 128, bands: int = 16, threshold: float = 0.85):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.reused = 0
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY, signature BLOB NOT NULL, source TEXT NOT NULL,
+                pages TEXT NOT NULL, result TEXT NOT NULL, created REAL NOT NULL,
+                facts TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                bucket INTEGER NOT NULL, chunk INTEGER NOT NULL,
+                PRIMARY KEY (bucket, chunk)
+            ) WITHOUT ROWID;
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "facts" not in columns:  # indexes made before fact checks: old rows never match
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN facts TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def _buckets(self, signature: Signature, scope: str) -> List[int]:
+        # one 63-bit id per band; the band number and scope are hashed in, so one column suffices
+        out = []
+        for band in range(self.bands):
+            h = hashlib.blake2b(digest_size=8, person=b"lawqb-lsh")
+            h.update(scope.encode("utf-8"))
+            h.update(struct.pack("<I", band))
+            h.update(_pack(signature[band * self.rows : (band + 1) * self.rows]))
+            out.append(int.from_bytes(h.digest(), "little") >> 1)
+        return out
+
+    def query(self, signature: Signature, scope: str, facts: str) -> Optional[Match]:
+        """The most similar stored chunk with the same *facts*, at or above the threshold, if any."""
+        buckets = self._buckets(signature, scope)
+        marks = ",".join("?" * len(buckets))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, signature, source, pages, result FROM chunks WHERE facts = ? AND id IN"
+                f" (SELECT DISTINCT chunk FROM bands WHERE bucket IN ({marks}) LIMIT 256)",
+                [facts, *buckets],
+            ).fetchall()
+        best: Optional[Match] = None
+        for _, blob, source, pages, result in rows:
+            score = similarity(signature, _unpack(blob))
+            if score >= self.threshold and (best is None or score > best.similarity):
+                best = Match(score, source, pages, json.loads(result))
+        if best is not None:
+            with self._lock:
+                self.reused += 1
+        return best
+
+    def add(
+        self,
+        signature: Signature,
+        scope: str,
+        facts: str,
+        result: Dict[str, Any],
+        *,
+        source: str = "",
+        pages: str = "",
+    ) -> None:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO chunks (signature, source, pages, result, created, facts) VALUES (?, ?, ?, ?, ?, ?)",
+                (_pack(signature), source, pages, json.dumps(result), time.time(), facts),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bands (bucket, chunk) VALUES (?, ?)",
+                [(bucket, cur.lastrowid) for bucket in self._buckets(signature, scope)],
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (chunks,) = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        return {"chunks": chunks, "reused": self.reused}
+
+
+def reuse_note(match: Match) -> str:
+    # the earlier chunk's file name stays in the index: it is not this upload's to show
+    return f"Near-duplicate ({match.similarity:.0%} similar) of evidence analyzed earlier in this case; its analysis was reused."
+
+
+# ---------- factory ---------------------------------------------------------
+def dedup_from_env() -> Optional[LSHIndex]:
+    """
+    Build the near-duplicate index from environment variables, or None if disabled:
+
+        DEDUP_INDEX_PATH   SQLite file, "" disables      (default .cache/dedup.sqlite)
+        DEDUP_THRESHOLD    estimated Jaccard to reuse    (default 0.85)
+    """
+    path = os.getenv("DEDUP_INDEX_PATH", os.path.join(".cache", "dedup.sqlite"))
+    if not path:
+        return None
+    return LSHIndex(path, threshold=float(os.getenv("DEDUP_THRESHOLD", "0.85")))
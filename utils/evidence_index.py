@@ -0,0 +1,199 @@
+"""
+Local retrieval index over processed evidence.
+
+✔  every analyzed chunk is split into short passages and indexed, together
+   with the chunk's GPT summary and key facts, as soon as the chunk finishes
+✔  SQLite FTS5 with BM25 ranking (Porter stemming, diacritics folded):
+   on disk, memory-mapped, CPU-only, updated incrementally
+✔  a document is indexed once per content hash and linked to any number of
+   cases / filenames, so re-uploading it costs one row
+✔  search() filters by case and preferred sources and packs the best
+   passages into a fixed token budget
+
+Passages of one case are never returned for another; documents uploaded
+without a case id are indexed but never searched.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from utils.chunking import Chunk, iter_token_chunks
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "has", "have", "he", "her", "his", "how", "i", "in", "is", "it", "its", "my", "of",
+    "on", "or", "she", "that", "the", "their", "there", "they", "this", "to", "was",
+    "we", "were", "what", "when", "where", "which", "who", "why", "will", "with", "would",
+}
+
+
+class Passage(NamedTuple):
+    source: str
+    pages: str
+    text: str
+    tokens: int
+    score: float  # BM25, lower is better
+
+
+def match_query(question: str, max_terms: int = 32) -> str:
+    """FTS5 query for *question*: its content words, OR-ed and quoted (no FTS syntax leaks in)."""
+    terms: List[str] = []
+    for word in _WORD.findall(question.casefold()):
+        if word not in _STOPWORDS and (len(word) > 2 or word.isdigit()) and word not in terms:
+            terms.append(word)
+    return " OR ".join(f'"{t}"' for t in terms[:max_terms])
+
+
+class EvidenceIndex:
+    def __init__(self, path: str, *, passage_tokens: int = 300, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.passage_tokens = passage_tokens
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY, doc TEXT NOT NULL, chunk INTEGER NOT NULL,
+                part INTEGER NOT NULL, pages TEXT NOT NULL, text TEXT NOT NULL,
+                digest TEXT NOT NULL, tokens INTEGER NOT NULL,
+                UNIQUE (doc, chunk, part)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                text, digest, content='passages', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                doc TEXT NOT NULL, case_id TEXT NOT NULL, source TEXT NOT NULL,
+                category TEXT, added REAL NOT NULL,
+                PRIMARY KEY (doc, case_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    # ---------- writing -----------------------------------------------------
+    def add_chunk(self, doc: str, index: int, chunk: Chunk, result: Dict[str, Any]) -> int:
+        """Index one analyzed chunk of *doc* (a content hash); returns the passages added."""
+        digest = " ".join([str(result.get("summary") or "")] + [str(f) for f in result.get("keyFacts") or []])
+        parts = iter_token_chunks([(None, chunk.text)], max_tokens=self.passage_tokens)
+        rows = [(doc, index, n, chunk.pages, p.text, digest, p.tokens) for n, p in enumerate(parts)]
+        added = 0
+        with self._lock:
+            for row in rows:
+                cur = self._conn.execute(
+                    "INSERT INTO passages (doc, chunk, part, pages, text, digest, tokens)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+                    row,
+                )
+                if cur.rowcount:
+                    self._conn.execute(
+                        "INSERT INTO passages_fts (rowid, text, digest) VALUES (?, ?, ?)",
+                        (cur.lastrowid, row[4], digest),
+                    )
+                    added += 1
+            self._conn.commit()
+        return added
+
+    def link(self, doc: str, *, source: str, case_id: Optional[str] = None, category: Optional[str] = None) -> None:
+        """Make *doc*'s passages searchable in *case_id* under the name *source*."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc, case_id, source, category, added) VALUES (?, ?, ?, ?, ?)",
+                (doc, case_id or "", source, category, time.time()),
+            )
+            self._conn.commit()
+
+    def has_document(self, doc: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM passages WHERE doc = ? LIMIT 1", (doc,)).fetchone() is not None
+
+    # ---------- reading -----------------------------------------------------
+    def search(
+        self,
+        question: str,
+        *,
+        case_id: Optional[str] = None,
+        sources: Optional[Iterable[str]] = None,
+        top_k: int = 6,
+        max_tokens: int = 1500,
+    ) -> List[Passage]:
+        """
+        The best passages for *question* in *case_id*, at most *top_k* of them
+        and *max_tokens* in total.
+
+        *sources* keeps only documents whose category equals, or whose file
+        name contains, one of the given strings (case-insensitive).
+        """
+        query = match_query(question)
+        if not query or not case_id or top_k <= 0:
+            return []
+        sql = (
+            "SELECT d.source, p.pages, p.text, p.tokens, bm25(passages_fts, 1.0, 2.0) AS score"
+            " FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid"
+            " JOIN documents d ON d.doc = p.doc"
+            " WHERE passages_fts MATCH ? AND d.case_id = ?"
+        )
+        params: List[Any] = [query, case_id or ""]
+        wanted = [s.strip().casefold() for s in sources or [] if s and s.strip()]
+        if wanted:
+            clauses = []
+            for s in wanted:
+                clauses.append("lower(d.category) = ? OR instr(lower(d.source), ?) > 0")
+                params += [s, s]
+            sql += " AND (" + " OR ".join(clauses) + ")"
+        # (doc, case_id) is unique, so within one case every passage appears once
+        sql += " ORDER BY score LIMIT ?"
+        params.append(top_k * 4)  # spare candidates for budget packing
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        picked: List[Passage] = []
+        budget = max_tokens
+        for source, pages, text, tokens, score in rows:
+            if tokens <= budget:
+                picked.append(Passage(source, pages, text, tokens, score))
+                budget -= tokens
+                if len(picked) == top_k:
+                    break
+        return picked
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (passages,) = self._conn.execute("SELECT COUNT(*) FROM passages").fetchone()
+            (documents,) = self._conn.execute("SELECT COUNT(DISTINCT doc) FROM documents").fetchone()
+            (cases,) = self._conn.execute("SELECT COUNT(DISTINCT case_id) FROM documents").fetchone()
+        return {"passages": passages, "documents": documents, "cases": cases}
+
+
+def format_passages(passages: List[Passage]) -> str:
+    """Numbered excerpts for a prompt: ``[1] file.pdf, p. 3–4`` followed by the text."""
+    blocks = []
+    for n, p in enumerate(passages, start=1):
+        where = f"{p.source}, p. {p.pages}" if p.pages else p.source
+        blocks.append(f"[{n}] {where}\n{p.text.strip()}")
+    return "\n\n".join(blocks)
+
+
+# ---------- factory ---------------------------------------------------------
+def index_from_env() -> Optional[EvidenceIndex]:
+    """
+    Build the evidence index from environment variables, or None if disabled:
+
+        EVIDENCE_INDEX_PATH    SQLite file, "" disables  (default .cache/evidence.sqlite)
+        PASSAGE_TOKENS         tokens per indexed passage (default 300)
+    """
+    path = os.getenv("EVIDENCE_INDEX_PATH", os.path.join(".cache", "evidence.sqlite"))
+    if not path:
+        return None
+    return EvidenceIndex(path, passage_tokens=int(os.getenv("PASSAGE_TOKENS", "300")))
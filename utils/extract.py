@@ -0,0 +1,591 @@
+"""
+Streaming text extraction for uploaded evidence.
+
+Every extractor yields ``(page_no, text)`` pieces (decoded blocks, paragraphs,
+PDF pages, image frames, messages) straight from a file on disk, so the
+caller never holds the whole document.  page_no is 1-based for paged formats
+and None otherwise.
+
+✔  the type is sniffed from the file's first bytes; the extension only breaks ties
+✔  text is decoded incrementally in the charset it turns out to be in
+   (BOM, UTF-8, BOM-less UTF-16, else Windows-1252); text that stops being
+   UTF-8 part-way through is read as Windows-1252 from there on
+✔  PDF, DOCX, plain text, HTML, RTF, e-mail (.eml / mbox) and images
+   (JPEG / PNG / TIFF, straight to OCR)
+✔  each extractor declares whether it streams; the ones that parse the whole
+   file first are capped at EXTRACT_MAX_BUFFERED_MB
+✔  zip archives (batch uploads) are expanded to files, within size limits
+
+The libraries behind each format are plugins (utils.plugins): they are
+imported the first time that format is seen, or earlier by the warm-up.
+"""
+
+import codecs
+import email
+import hashlib
+import mailbox
+import os
+import re
+import tempfile
+import zipfile
+import zlib
+from email import policy
+from email.parser import BytesFeedParser
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils import plugins
+
+READ_BLOCK = 64 * 1024
+SNIFF_BYTES = 8 * 1024
+MAX_BUFFERED_BYTES = int(float(os.getenv("EXTRACT_MAX_BUFFERED_MB", "50")) * 1024 * 1024)
+
+Piece = Tuple[Optional[int], str]
+OnPage = Optional[Callable[[int], None]]
+
+
+# ---------- registry --------------------------------------------------------
+class Extractor(NamedTuple):
+    kind: str  # reported back as the file type
+    extensions: Tuple[str, ...]
+    plugin: str  # utils.plugins entry loaded (and handed over) before extraction
+    streams: bool  # False: the whole file is parsed before the first piece
+    run: Callable[[object, str, OnPage], Iterator[Piece]]
+
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register(kind: str, *, extensions: Tuple[str, ...], plugin: str = "txt", streams: bool = True):
+    """Decorator: register ``fn(module, path, on_page)`` as the extractor for *kind*."""
+
+    def wrap(fn):
+        EXTRACTORS[kind] = Extractor(kind, extensions, plugin, streams, fn)
+        return fn
+
+    return wrap
+
+
+def _by_extension(ext: str) -> Optional[Extractor]:
+    for extractor in EXTRACTORS.values():
+        if ext in extractor.extensions:
+            return extractor
+    return None
+
+
+# ---------- charset ---------------------------------------------------------
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),  # before UTF-16 LE, which shares its first two bytes
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_CONTROL = bytes(range(0, 9)) + bytes(range(14, 32))
+# the five bytes Windows-1252 leaves undefined are kept as their Latin-1 code points
+codecs.register_error("cp1252-latin1", lambda e: (e.object[e.start : e.end].decode("latin-1"), e.end))
+
+
+def detect_encoding(sample: bytes) -> Optional[str]:
+    """
+    Best-guess text encoding of *sample* (the start of a file), or None if it
+    looks binary.  The sample may end mid-character.
+    """
+    for bom, name in _BOMS:
+        if sample.startswith(bom):
+            return name
+    if not sample:
+        return "utf-8"
+    if b"\x00" in sample:
+        # UTF-16 without a BOM: mostly-ASCII text leaves every other byte zero
+        even, odd = sample[0::2], sample[1::2]
+        if odd.count(0) > 0.4 * len(odd) and even.count(0) < 0.1 * len(even):
+            return "utf-16-le"
+        if even.count(0) > 0.4 * len(even) and odd.count(0) < 0.1 * len(odd):
+            return "utf-16-be"
+        return None
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    if sum(sample.count(c) for c in _CONTROL) > 0.1 * len(sample):
+        return None
+    return "cp1252"  # what Word on Windows writes; covers Latin-1's printable range
+
+
+def _decoder(name: str) -> codecs.IncrementalDecoder:
+    if name == "cp1252":
+        return codecs.getincrementaldecoder(name)(errors="cp1252-latin1")
+    if name.startswith("utf-8"):
+        return codecs.getincrementaldecoder(name)()  # strict: an error means it isn't UTF-8 after all
+    return codecs.getincrementaldecoder(name)(errors="replace")  # UTF-16/32: a stray byte, not a charset
+
+
+def _decoded_blocks(path: str, encoding: Callable[[bytes], Optional[str]] = detect_encoding) -> Iterator[str]:
+    """
+    Decode the file at *path* block by block, in the charset *encoding* picks
+    from its first block.  UTF-8 that turns out to be invalid further on
+    (a Latin-1 section after the first block) is decoded as Windows-1252 from
+    the first bad byte to the end of the file.
+    """
+    with open(path, "rb") as fh:
+        block = fh.read(READ_BLOCK)
+        decoder = _decoder(encoding(block) or "cp1252")
+        final = False
+        while not final:
+            final = not block
+            try:
+                text = decoder.decode(block, final=final)
+            except UnicodeDecodeError as e:
+                # e.object is what the decoder had buffered plus this block, valid up to e.start
+                text = e.object[: e.start].decode("utf-8") + e.object[e.start :].decode("cp1252", "cp1252-latin1")
+                decoder = _decoder("cp1252")
+            if text:
+                yield text
+            block = fh.read(READ_BLOCK) if block else b""
+
+
+# ---------- sniffing --------------------------------------------------------
+_IMAGE_MAGIC = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"II*\x00", b"MM\x00*")
+# "From ana@example.com Mon Jan  1 00:00:00 2024": sender, then an asctime date (time zone optional)
+_MBOX_FROM = re.compile(
+    r"From \S+ +(?:[A-Z][a-z]{2} ){2} ?\d{1,2} \d{2}:\d{2}(?::\d{2})?(?: [A-Z]{3,4}| [+-]\d{4})? \d{4}[ \t]*$"
+)
+_HTML_STARTS = ("<!doctype html", "<html", "<head", "<body")
+_HEADER_LINE = re.compile(r"([A-Za-z][A-Za-z0-9-]*):[ \t]")
+_MAIL_HEADERS = {
+    "from", "to", "cc", "subject", "date", "received", "message-id",
+    "mime-version", "return-path", "delivered-to", "reply-to", "content-type",
+}
+
+
+def _looks_like_email(text: str) -> bool:
+    """At least two well-known headers before the first blank line, and nothing but headers."""
+    known = 0
+    for line in text.splitlines():
+        if not line.strip():
+            break
+        if line[0] in " \t":  # folded header continuation
+            continue
+        match = _HEADER_LINE.match(line)
+        if not match:
+            return False
+        known += match.group(1).lower() in _MAIL_HEADERS
+    return known >= 2
+
+
+def sniff(path: str, filename: str = "") -> str:
+    """
+    The extractor kind for the file at *path*, judged by its content.
+
+    The extension of *filename* is only consulted when the content is plain
+    text (e.g. an ``.html`` fragment without an ``<html>`` tag).  Raises
+    ValueError for content no extractor handles.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(SNIFF_BYTES)
+    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(_IMAGE_MAGIC):
+        return "image"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise ValueError("Unsupported file type")
+
+    encoding = detect_encoding(head)
+    if encoding is None:
+        raise ValueError("Unsupported file type")
+    text = head.decode(encoding, errors="replace").lstrip("\ufeff \t\r\n")
+    lowered = text[:1024].lower()
+    if lowered.startswith("{\\rtf"):
+        return "rtf"
+    # a page starts with its markup; a tag quoted in the middle of prose doesn't make one
+    if lowered.startswith(_HTML_STARTS) or (lowered.startswith("<?xml") and "<html" in lowered):
+        return "html"
+    first, _, rest = text.partition("\n")
+    if _MBOX_FROM.match(first.rstrip("\r")) and _looks_like_email(rest):
+        return "mbox"
+    if _looks_like_email(text):
+        return "eml"
+
+    by_ext = _by_extension(ext)
+    if by_ext is not None and by_ext.plugin == "txt":
+        return by_ext.kind
+    return "txt"
+
+
+# ---------- plain text ------------------------------------------------------
+@register("txt", extensions=("txt", "text", "csv", "md", "log"))
+def _iter_txt(_, path: str, on_page: OnPage) -> Iterator[Piece]:
+    for text in _decoded_blocks(path):
+        yield None, text
+
+
+# ---------- DOCX ------------------------------------------------------------
+@register("docx", extensions=("docx",), plugin="docx", streams=False)
+def _iter_docx(docx, path: str, on_page: OnPage) -> Iterator[Piece]:
+    # python-docx parses the whole XML part up front; we can still stream paragraphs
+    document = docx.Document(path)
+    for p in document.paragraphs:
+        if p.text.strip():
+            yield None, p.text + "\n\n"
+
+
+# ---------- PDF and images --------------------------------------------------
+@register("pdf", extensions=("pdf",), plugin="pdf")
+def _iter_pdf(pdf_text, path: str, on_page: OnPage) -> Iterator[Piece]:
+    for n, text in enumerate(pdf_text.iter_pdf_text(path, on_page=on_page), start=1):
+        yield n, text
+
+
+@register("image", extensions=("jpg", "jpeg", "png", "tif", "tiff"), plugin="ocr")
+def _iter_image(pdf_text, path: str, on_page: OnPage) -> Iterator[Piece]:
+    # every frame is a page (multi-page TIFFs are common for scanned exhibits)
+    for n, text in enumerate(pdf_text.iter_image_texts(path), start=1):
+        if on_page:
+            on_page(n)
+        yield n, text
+
+
+# ---------- HTML ------------------------------------------------------------
+_HTML_BLOCK = {
+    "p", "div", "br", "li", "tr", "table", "section", "article", "blockquote", "pre",
+    "hr", "title", "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd",
+}
+_HTML_SKIP = {"script", "style", "noscript", "template"}
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+
+
+class _HTMLText(HTMLParser):
+    """Incremental HTML → text: feed() markup, take() the text seen so far."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP:
+            self._skip += 1
+        elif tag in _HTML_BLOCK:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _HTML_BLOCK:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def take(self) -> str:
+        text = _BLANK_LINES.sub("\n\n", _SPACES.sub(" ", "".join(self._parts)))
+        self._parts.clear()
+        return text
+
+
+def html_to_text(markup: str) -> str:
+    parser = _HTMLText()
+    parser.feed(markup)
+    parser.close()
+    return parser.take()
+
+
+def _html_encoding(sample: bytes) -> Optional[str]:
+    # a BOM wins, then <meta charset>, then the usual guess
+    encoding = detect_encoding(sample)
+    if encoding in ("utf-8-sig", "utf-16", "utf-32"):
+        return encoding
+    match = _META_CHARSET.search(sample)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return encoding
+
+
+@register("html", extensions=("html", "htm", "xhtml"))
+def _iter_html(_, path: str, on_page: OnPage) -> Iterator[Piece]:
+    parser = _HTMLText()
+    for block in _decoded_blocks(path, _html_encoding):
+        parser.feed(block)
+        text = parser.take()
+        if text.strip():
+            yield None, text
+    parser.close()
+    text = parser.take()
+    if text.strip():
+        yield None, text
+
+
+# ---------- RTF -------------------------------------------------------------
+_RTF_TOKEN = re.compile(
+    r"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\(.)|([{}])|[\r\n]+|([^\\{}\r\n]+)",
+    re.S,
+)
+_RTF_DESTINATIONS = {
+    "fonttbl", "colortbl", "stylesheet", "info", "pict", "object", "themedata",
+    "colorschememapping", "datastore", "xmlnstbl", "listtable", "listoverridetable",
+    "rsidtbl", "generator", "latentstyles", "filetbl", "revtbl", "header", "headerl",
+    "headerr", "headerf", "footer", "footerl", "footerr", "footerf",
+}
+_RTF_WORDS = {
+    "par": "\n", "line": "\n", "sect": "\n\n", "page": "\n\n", "row": "\n", "cell": "\t",
+    "tab": "\t", "emdash": "\u2014", "endash": "\u2013", "bullet": "\u2022",
+    "lquote": "\u2018", "rquote": "\u2019", "ldblquote": "\u201c", "rdblquote": "\u201d",
+}
+_RTF_SYMBOLS = {"\\": "\\", "{": "{", "}": "}", "~": "\u00a0", "_": "\u2011", "-": "", "\n": "\n", "\r": "\n"}
+
+
+class _RTFText:
+    """Incremental RTF → text; feed() must be given whole tokens (see _rtf_cut)."""
+
+    def __init__(self) -> None:
+        self._stack = []
+        self._skip = False  # inside an ignorable destination (font table, pictures, …)
+        self._uc = 1  # fallback characters that follow every \uN
+        self._drop = 0  # fallback characters still to drop
+        self._group_start = False
+        self._codepage = "cp1252"
+        self._bytes = bytearray()  # \'hh escapes, decoded together (DBCS code pages)
+        self._out = []
+
+    def _flush(self) -> None:
+        if self._bytes:
+            if not self._skip:
+                self._out.append(self._bytes.decode(self._codepage, errors="replace"))
+            self._bytes.clear()
+
+    def _text(self, text: str) -> None:
+        self._flush()
+        if self._drop:
+            text, self._drop = text[self._drop:], max(0, self._drop - len(text))
+        if text and not self._skip:
+            self._out.append(text)
+
+    def _word(self, word: str, arg: Optional[str]) -> None:
+        if word == "ansicpg" and arg:
+            try:
+                self._codepage = codecs.lookup(f"cp{arg}").name
+            except LookupError:
+                pass
+        elif word == "uc" and arg:
+            self._uc = int(arg)
+        elif word == "u" and arg:
+            self._text(chr(int(arg) % 65536))
+            self._drop = self._uc
+        elif word in _RTF_WORDS:
+            self._text(_RTF_WORDS[word])
+
+    def feed(self, data: str) -> str:
+        for m in _RTF_TOKEN.finditer(data):
+            word, arg, hexbyte, symbol, brace, text = m.groups()
+            first, self._group_start = self._group_start, False
+            if hexbyte is not None:
+                if self._drop:
+                    self._drop -= 1
+                else:
+                    self._bytes.append(int(hexbyte, 16))
+            elif brace == "{":
+                self._flush()
+                self._stack.append((self._skip, self._uc))
+                self._group_start, self._drop = True, 0
+            elif brace == "}":
+                self._flush()
+                if self._stack:
+                    self._skip, self._uc = self._stack.pop()
+                self._drop = 0
+            elif word is not None:
+                if first and word in _RTF_DESTINATIONS:
+                    self._skip = True
+                self._word(word, arg)
+            elif symbol is not None:
+                if first and symbol == "*":
+                    self._skip = True
+                elif symbol in _RTF_SYMBOLS:
+                    self._text(_RTF_SYMBOLS[symbol])
+            elif text is not None:
+                self._text(text)
+        self._flush()
+        text = "".join(self._out)
+        self._out.clear()
+        return text
+
+
+def _rtf_cut(data: str) -> int:
+    """Where to stop feeding *data* so no control word is split: before its last backslash run."""
+    cut = data.rfind("\\", max(0, len(data) - 64))
+    if cut == -1:
+        return len(data)
+    while cut > 0 and data[cut - 1] == "\\":
+        cut -= 1
+    return cut
+
+
+def rtf_to_text(markup: str) -> str:
+    return _RTFText().feed(markup)
+
+
+@register("rtf", extensions=("rtf",))
+def _iter_rtf(_, path: str, on_page: OnPage) -> Iterator[Piece]:
+    parser = _RTFText()
+    carry = ""
+    with open(path, "rb") as fh:
+        while block := fh.read(READ_BLOCK):
+            data = carry + block.decode("latin-1")  # RTF itself is 7-bit; \'hh carries the rest
+            cut = _rtf_cut(data)
+            carry = data[cut:]
+            text = parser.feed(data[:cut])
+            if text:
+                yield None, text
+    text = parser.feed(carry)
+    if text:
+        yield None, text
+
+
+# ---------- e-mail ----------------------------------------------------------
+_SHOWN_HEADERS = ("From", "To", "Cc", "Date", "Subject")
+
+
+def _part_text(part) -> str:
+    try:
+        text = part.get_content()
+    except (LookupError, UnicodeError):  # unknown or wrong declared charset
+        text = (part.get_payload(decode=True) or b"").decode("cp1252", errors="replace")
+    return html_to_text(text) if part.get_content_type() == "text/html" else text
+
+
+def _message_text(message) -> str:
+    """Headers, the body (plain text preferred) and any text attachments of one message."""
+    lines = [f"{name}: {message[name]}" for name in _SHOWN_HEADERS if message[name]]
+    parts = ["\n".join(lines)]
+    body = message.get_body(preferencelist=("plain", "html"))
+    if body is not None:
+        parts.append(_part_text(body))
+    for attachment in message.iter_attachments():
+        name = attachment.get_filename() or attachment.get_content_type()
+        if attachment.get_content_maintype() == "text":
+            parts.append(f"[Attachment: {name}]\n{_part_text(attachment)}")
+        else:
+            parts.append(f"[Attachment: {name}, not extracted]")
+    return "\n\n".join(p.strip() for p in parts if p.strip()) + "\n\n"
+
+
+@register("eml", extensions=("eml",), streams=False)
+def _iter_eml(_, path: str, on_page: OnPage) -> Iterator[Piece]:
+    parser = BytesFeedParser(policy=policy.default)
+    with open(path, "rb") as fh:
+        while block := fh.read(READ_BLOCK):
+            parser.feed(block)
+    yield None, _message_text(parser.close())
+
+
+@register("mbox", extensions=("mbox", "mbx"))
+def _iter_mbox(_, path: str, on_page: OnPage) -> Iterator[Piece]:
+    # mailbox indexes the From_ lines once, then reads one message at a time
+    box = mailbox.mbox(
+        path, factory=lambda fh: email.message_from_binary_file(fh, policy=policy.default), create=False
+    )
+    try:
+        for message in box:
+            yield None, _message_text(message)
+    finally:
+        box.close()
+
+
+# ---------- archives --------------------------------------------------------
+class Member(NamedTuple):
+    name: str  # "packet.zip/Tab A/declaration.pdf"
+    path: str
+    size: int
+    sha256: str
+    error: Optional[str] = None  # set when the member could not be read (encrypted, corrupt, …)
+
+
+def is_archive(path: str) -> bool:
+    """A zip file that is not itself a DOCX."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return "word/document.xml" not in archive.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def expand_archive(path: str, label: str, dest: str, *, max_files: int, max_bytes: int) -> List[Member]:
+    """
+    Copy every file in the zip at *path* into the folder *dest* (under
+    generated names), hashing as it goes; *label* prefixes member names.
+    Nested archives are copied as files, not expanded.  Raises ValueError
+    when the archive holds more than *max_files* files or *max_bytes*
+    uncompressed, checked while copying, so a forged size header doesn't
+    get past the limit.  A member that cannot be read is returned with its
+    ``error`` set; the rest of the archive is still expanded.
+    """
+    members: List[Member] = []
+    total = 0
+    with zipfile.ZipFile(path) as archive:
+        infos = [i for i in archive.infolist() if not i.is_dir() and not i.filename.startswith("__MACOSX/")]
+        if len(infos) > max_files:
+            raise ValueError(f"{label} holds {len(infos)} files; the limit is {max_files}")
+        for info in infos:
+            name = f"{label}/{info.filename}"
+            fd, target = tempfile.mkstemp(dir=dest)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with os.fdopen(fd, "wb") as out, archive.open(info) as src:
+                    while block := src.read(READ_BLOCK):
+                        size += len(block)
+                        total += len(block)
+                        if total > max_bytes:
+                            raise ValueError(f"{label} expands past the {max_bytes // (1024 * 1024)} MB limit")
+                        digest.update(block)
+                        out.write(block)
+            except (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error, EOFError) as e:
+                # encrypted, unsupported compression, bad CRC, truncated
+                members.append(Member(name, target, size, "", error=str(e) or type(e).__name__))
+                continue
+            members.append(Member(name, target, size, digest.hexdigest()))
+    return members
+
+
+# ---------- dispatch --------------------------------------------------------
+SUPPORTED_TYPES = tuple(EXTRACTORS)
+
+
+def iter_text(
+    path: str,
+    kind: str,
+    *,
+    on_page: OnPage = None,
+) -> Iterator[Piece]:
+    """
+    Return a generator of ``(page_no, text)`` pieces for the file at *path*.
+
+    *kind* is what sniff() returned (a file extension also works).
+    Unsupported or unavailable types raise ValueError here, before any
+    reading starts.  *on_page* is only called for paged formats (PDF, images).
+    """
+    extractor = EXTRACTORS.get(kind) or _by_extension(kind)
+    if extractor is None:
+        raise ValueError("Unsupported file type")
+    if not extractor.streams and os.path.getsize(path) > MAX_BUFFERED_BYTES:
+        raise ValueError(f"{extractor.kind} files over {MAX_BUFFERED_BYTES // (1024 * 1024)} MB are not supported")
+    try:
+        module = plugins.load(extractor.plugin)
+    except plugins.PluginUnavailable:
+        raise ValueError(f"{extractor.kind} support not available") from None
+    return extractor.run(module, path, on_page)
@@ -0,0 +1,150 @@
+"""
+Latency-simulating stand-in for the async OpenAI client, used by the
+benchmarks and by the app itself under GPT_BACKEND=fake.
+
+✔  log-normal latency around a median, plus a per-token streaming delay
+✔  429 injection with a Retry-After header, like the real rate limiter
+✔  prompt / completion token accounting, reported as ``usage`` per reply
+✔  well-formed IRAC or evidence JSON, so the pipeline runs end to end
+✔  small ("mini") models answer faster and can be set to doubt themselves,
+   so model routing and escalation show up in the numbers
+
+    fake = FakeLLM(median_ms=800, sigma=0.4, rate_limit=0.02)
+    gateway = gateway_from_env(client_factory=fake.client)
+"""
+
+import asyncio
+import json
+import math
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from utils.chunking import count_tokens
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests (simulated)")
+        headers = {"retry-after-ms": str(int(retry_after * 1000))}
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+class FakeLLM:
+    def __init__(
+        self,
+        *,
+        median_ms: float = 800.0,
+        sigma: float = 0.4,
+        token_ms: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: float = 1.0,
+        small_speedup: float = 3.0,
+        low_confidence: float = 0.0,
+        seed: int = 0,
+    ):
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.token_delay = token_ms / 1000
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.small_speedup = small_speedup
+        self.low_confidence = low_confidence
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "rateLimited": 0, "promptTokens": 0, "completionTokens": 0, "peakInFlight": 0}
+        self._in_flight = 0
+
+    # ---------- behaviour -------------------------------------------------
+    def _draw(self, model: str):
+        with self._lock:
+            latency = self.median * math.exp(self._random.gauss(0, self.sigma))
+            limited = self._random.random() < self.rate_limit
+            unsure = "mini" in model and self._random.random() < self.low_confidence
+        if "mini" in model:
+            latency /= self.small_speedup
+        return latency, limited, unsure
+
+    def _reply(self, messages: List[Dict[str, str]], unsure: bool = False) -> str:
+        system = messages[0].get("content", "") if messages else ""
+        prompt = messages[-1].get("content", "") if messages else ""
+        words = " ".join(prompt.split()[-12:])
+        if "IRAC" in system:
+            return json.dumps({
+                "issue": f"Whether {words}",
+                "rule": "8 U.S.C. § 1158(b)(1)(B)(i).",
+                "application": "The facts presented are applied to the rule.",
+                "conclusion": "Likely eligible, subject to credibility.",
+                "citations": ["Matter of Acosta, 19 I&N Dec. 211 (BIA 1985)"],
+                "conflictsOrAmbiguities": "",
+                "verificationNotes": "Simulated reply.",
+            })
+        return json.dumps({
+            "summary": f"The document discusses {words}.",
+            "keyFacts": [f"Fact drawn from: {words}"],
+            "legalIssues": ["Persecution on account of a protected ground."],
+            "credibilityConcerns": "",
+            "recommendation": "Corroborate with country conditions evidence.",
+            "verificationNotes": "Simulated reply.",
+            "confidence": 0.3 if unsure else 0.9,
+        })
+
+    def _usage(self, messages, reply: str):
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = count_tokens(reply)
+        with self._lock:
+            self.counts["promptTokens"] += prompt_tokens
+            self.counts["completionTokens"] += completion_tokens
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+
+    async def create(self, **kwargs: Any):
+        with self._lock:
+            self.counts["calls"] += 1
+            self._in_flight += 1
+            self.counts["peakInFlight"] = max(self.counts["peakInFlight"], self._in_flight)
+        try:
+            latency, limited, unsure = self._draw(kwargs.get("model", ""))
+            if limited:
+                await asyncio.sleep(0.01)
+                with self._lock:
+                    self.counts["rateLimited"] += 1
+                raise FakeRateLimitError(self.retry_after)
+            await asyncio.sleep(latency)
+            messages = kwargs.get("messages", [])
+            reply = self._reply(messages, unsure)
+            if kwargs.get("stream"):
+                return self._stream(reply, self._usage(messages, reply))
+            message = SimpleNamespace(content=reply)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self._usage(messages, reply))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def _stream(self, reply: str, usage):
+        for word in reply.split(" "):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            delta = SimpleNamespace(content=word + " ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    # ---------- client ----------------------------------------------------
+    def client(self):
+        """A new client object shaped like ``openai.AsyncOpenAI``."""
+
+        async def close():
+            pass
+
+        completions = SimpleNamespace(create=self.create)
+        return SimpleNamespace(chat=SimpleNamespace(completions=completions), close=close)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
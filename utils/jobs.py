@@ -0,0 +1,248 @@
+"""
+Background job queue for long-running evidence analysis.
+
+✔  JobStore   – SQLite table of jobs (status, progress, result); survives restarts
+✔  JobRunner  – pool of asyncio workers on its own thread/event loop
+
+The runner is generic: it is handed an async ``handler(job, progress)`` that
+does the actual work and returns a JSON-serialisable result.
+
+Several processes may share one jobs database.  A job is claimed atomically
+(queued → running, with the runner as its owner) before it runs, so exactly
+one runner works on it.  Runners renew a lease while they are alive; jobs
+left running by a runner whose lease ran out (the process died) are queued
+again and picked up on start() or by any live runner.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+Handler = Callable[[Dict[str, Any], Callable[..., None]], Awaitable[Any]]
+
+
+# ---------- store -----------------------------------------------------------
+class JobStore:
+    """Thread-safe persistence for job rows."""
+
+    def __init__(self, path: str):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL,
+                path TEXT NOT NULL, params TEXT NOT NULL, progress TEXT NOT NULL,
+                result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL,
+                owner TEXT
+            );
+            CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, expires REAL NOT NULL);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:  # databases from before jobs were claimed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.commit()
+
+    def create(self, filename: str, path: str, params: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, path, params, progress, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, '{}', ?, ?)",
+                (job_id, QUEUED, filename, path, json.dumps(params), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, filename, path, params, progress, result, error, created, updated"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "filename": row[2],
+            "path": row[3],
+            "params": json.loads(row[4]),
+            "progress": json.loads(row[5]),
+            "result": json.loads(row[6]) if row[6] else None,
+            "error": row[7],
+            "created": row[8],
+            "updated": row[9],
+        }
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Set any of status/progress/result/error (dicts are stored as JSON)."""
+        cols, values = [], []
+        for name, value in fields.items():
+            cols.append(f"{name} = ?")
+            values.append(json.dumps(value) if name in ("progress", "result") else value)
+        cols.append("updated = ?")
+        values.append(time.time())
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(cols)} WHERE id = ?", (*values, job_id))
+            self._conn.commit()
+
+    def queued(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created", (QUEUED,)).fetchall()
+        return [r[0] for r in rows]
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Move a queued job to running under *owner*; False if another runner got it first."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated = ? WHERE id = ? AND status = ?",
+                (RUNNING, owner, time.time(), job_id, QUEUED),
+            )
+            self._conn.commit()
+        return cur.rowcount == 1
+
+    def renew(self, owner: str, lease: float) -> None:
+        """Keep *owner*'s running jobs its own for another *lease* seconds."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO owners (owner, expires) VALUES (?, ?)"
+                " ON CONFLICT(owner) DO UPDATE SET expires = excluded.expires",
+                (owner, time.time() + lease),
+            )
+            self._conn.commit()
+
+    def release(self, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+            self._conn.commit()
+
+    def requeue_orphans(self) -> int:
+        """Queue again the running jobs whose owner's lease has run out; returns how many."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated = ? WHERE status = ?"
+                " AND (owner IS NULL OR owner NOT IN (SELECT owner FROM owners WHERE expires > ?))",
+                (QUEUED, now, RUNNING, now),
+            )
+            self._conn.execute("DELETE FROM owners WHERE expires <= ?", (now,))
+            self._conn.commit()
+        return cur.rowcount
+
+
+# ---------- runner ----------------------------------------------------------
+class JobRunner:
+    """
+    Run jobs from *store* through *handler* with *workers* concurrent slots.
+
+    The runner holds a lease of *lease* seconds on the jobs it claims,
+    renewed a few times per lease; it also requeues other runners' orphans.
+    """
+
+    def __init__(self, store: JobStore, handler: Handler, workers: int = 2, *, lease: float = LEASE_SECONDS):
+        self.store = store
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+        self._enqueued: set = set()
+
+    def start(self) -> None:
+        """Spin up the worker thread (idempotent) and pick up queued and orphaned jobs."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self.store.renew(self.owner, self.lease)
+            threading.Thread(target=self._run_loop, name="job-runner", daemon=True).start()
+            self._started.wait()
+        self._recover()
+
+    def _recover(self) -> None:
+        orphans = self.store.requeue_orphans()
+        if orphans:
+            log.warning("requeued %d job(s) left running by a runner that is gone", orphans)
+        for job_id in self.store.queued():
+            self._enqueue(job_id)
+
+    def submit(self, job_id: str) -> None:
+        self.start()
+        self._enqueue(job_id)
+
+    def _enqueue(self, job_id: str) -> None:
+        with self._start_lock:
+            if job_id in self._enqueued:
+                return
+            self._enqueued.add(job_id)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue()
+        for _ in range(self.workers):
+            loop.create_task(self._worker())
+        loop.create_task(self._keep_lease())
+        self._loop = loop
+        self._started.set()
+        loop.run_forever()
+
+    async def _keep_lease(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, self.owner, self.lease)
+                await asyncio.to_thread(self._recover)
+            except sqlite3.Error as exc:
+                log.warning("job lease renewal failed: %s", exc)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_one(job_id)
+            finally:
+                with self._start_lock:
+                    self._enqueued.discard(job_id)
+                self._queue.task_done()
+
+    async def _run_one(self, job_id: str) -> None:
+        if not self.store.claim(job_id, self.owner):
+            return  # finished, or another runner has it
+        job = self.store.get(job_id)
+        progress = dict(job["progress"])
+
+        def report(**fields: Any) -> None:
+            progress.update(fields)
+            self.store.update(job_id, progress=progress)
+
+        try:
+            result = await self.handler(job, report)
+        except Exception as exc:
+            log.error("job %s failed: %s", job_id, exc)
+            self.store.update(job_id, status=FAILED, error=str(exc))
+        else:
+            self.store.update(job_id, status=DONE, result=result)
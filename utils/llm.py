@@ -0,0 +1,400 @@
+"""
+Shared gateway for every OpenAI chat call.
+
+✔  async client over a pooled keep-alive HTTP connection (one per event loop)
+✔  token buckets for requests-per-minute and tokens-per-minute
+✔  jittered exponential backoff that honours Retry-After on 429/5xx
+✔  a 429 pauses every caller, not just the one that got it
+✔  circuit breaker: after repeated failures calls fail fast for a while
+✔  chat() for whole replies, chat_stream() for token-by-token deltas
+
+Token use is estimated before a call (prompt + expected completion) and
+corrected from the response's ``usage`` afterwards, so the buckets track
+the real quota.  Bucket and breaker state is thread-safe, because the
+background job runner drives its own event loop next to the server's.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from utils.chunking import count_tokens
+from utils.metrics import metrics
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _transient() -> tuple:
+    # the SDK is imported by the client factory, not here; before that no SDK error can occur
+    openai = sys.modules.get("openai")
+    return (asyncio.TimeoutError, ConnectionError) + tuple(
+        getattr(openai, name) for name in ("APIConnectionError", "APITimeoutError") if hasattr(openai, name)
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the breaker is open."""
+
+
+# ---------- rate limiting ---------------------------------------------------
+class TokenBucket:
+    """
+    Refills *rate_per_minute* units per minute up to *capacity*.
+
+    acquire(n) waits until the bucket holds n units (or is full, for requests
+    bigger than the bucket) and then takes them; the level may go negative,
+    which simply delays the next caller.  A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _try_take(self, amount: float) -> float:
+        """Take *amount* and return 0, or return how long to wait first."""
+        with self._lock:
+            self._refill(time.monotonic())
+            needed = min(amount, self.capacity)
+            if self._level >= needed:
+                self._level -= amount
+                return 0.0
+            return (needed - self._level) / self.rate
+
+    async def acquire(self, amount: float = 1) -> None:
+        if self.rate <= 0:
+            return
+        while (wait := self._try_take(amount)) > 0:
+            await asyncio.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """Give back (positive) or take extra (negative) units after the fact."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level + delta)
+
+
+# ---------- circuit breaker -------------------------------------------------
+class CircuitBreaker:
+    """
+    Opens after *failures* consecutive failed attempts; after *reset_after*
+    seconds one trial call is let through (half-open) and its outcome
+    closes or re-opens the circuit.  A trial that ends without an outcome
+    (cancelled, throttled) is handed back with release().
+    """
+
+    def __init__(self, failures: int = 5, reset_after: float = 30.0):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._count = 0
+        self._opened: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened is None:
+                return "closed"
+            if time.monotonic() - self._opened >= self.reset_after:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError when calls must fail fast; True if this call is the half-open trial."""
+        with self._lock:
+            if self._opened is None:
+                return False
+            if time.monotonic() - self._opened < self.reset_after or self._trial:
+                raise CircuitOpenError("OpenAI circuit open after repeated failures; try again shortly")
+            self._trial = True
+            return True
+
+    def release(self, trial: bool) -> None:
+        """Let another caller make the trial call (this one gave no verdict)."""
+        if trial:
+            with self._lock:
+                self._trial = False
+
+    def success(self) -> None:
+        with self._lock:
+            self._count = 0
+            self._opened = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            if self._trial or self._count >= self.failures:
+                self._opened = time.monotonic()
+            self._trial = False
+
+
+# ---------- gateway ---------------------------------------------------------
+def _status(exc: BaseException) -> Optional[int]:
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, _transient()) or _status(exc) in RETRY_STATUS
+
+
+class LLMGateway:
+    """
+    Rate-limited, retried, circuit-broken chat completions.
+
+    *client_factory* builds an async OpenAI-style client; one is made per
+    event loop, because pooled connections cannot be shared between loops.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        *,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_retries: int = 2,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        completion_tokens: int = 1_000,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._factory = client_factory
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.completion_tokens = completion_tokens
+        self.breaker = breaker or CircuitBreaker()
+        self._paused_until = 0.0
+        self._counts = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = self._factory()
+        return client
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "circuit": self.breaker.state}
+
+    def _request(self, messages, model, temperature, max_tokens, json_mode):
+        estimate = sum(count_tokens(m.get("content") or "", model) for m in messages)
+        estimate += max_tokens or self.completion_tokens
+        kwargs: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs, estimate
+
+    def _settle(self, model: str, estimate: int, usage) -> None:
+        used = getattr(usage, "total_tokens", None)
+        if used:
+            self.tokens.adjust(estimate - used)
+            metrics.record_usage(
+                model, getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+            )
+
+    async def _create(self, kwargs: Dict[str, Any], estimate: int):
+        """
+        Rate-limited, retried ``chat.completions.create(**kwargs)``.
+
+        Only the first attempt is checked against the circuit breaker, so a
+        call already backing off finishes its retries.  429s pause every
+        caller but are not breaker failures: the API is up, just busy.
+        """
+        attempt = 0
+        while True:
+            trial = False
+            if attempt == 0:
+                try:
+                    trial = self.breaker.before_call()
+                except CircuitOpenError:
+                    self._count("rejected")
+                    raise
+            try:
+                response = await self._attempt(kwargs, estimate)
+            except Exception as exc:
+                self.tokens.adjust(estimate)  # a failed call costs (almost) nothing
+                if not is_retryable(exc):
+                    self.breaker.success()  # the API answered; the request was at fault
+                    raise
+                if _status(exc) == 429:
+                    self.breaker.release(trial)
+                else:
+                    self.breaker.failure()
+                self._count("failures")
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                server_delay = retry_after(exc)
+                if server_delay is not None:
+                    delay = max(delay, server_delay)
+                if _status(exc) == 429:
+                    # the whole org is over quota: hold every caller back, not just this one
+                    self._count("throttled")
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self._count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release(trial)  # cancelled: no verdict either way
+                raise
+            self.breaker.success()
+            return response
+
+    async def _attempt(self, kwargs: Dict[str, Any], estimate: int):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimate)
+        self._count("calls")
+        with metrics.timed("gpt"):
+            return await self._client().chat.completions.create(**kwargs)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: str = "gpt-4",
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> str:
+        """
+        Send one chat completion and return the reply text.
+
+        *json_mode* asks the API for a syntactically valid JSON object
+        (``response_format``); the model must support it.
+        """
+        kwargs, estimate = self._request(messages, model, temperature, max_tokens, json_mode)
+        response = await self._create(kwargs, estimate)
+        self._settle(model, estimate, getattr(response, "usage", None))
+        return response.choices[0].message.content or ""
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: str = "gpt-4",
+        temperature: float = 0.3,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """
+        Stream one chat completion, yielding text deltas as they arrive.
+
+        Opening the stream is retried like chat(); an error after the first
+        delta propagates, since the caller has already seen partial output.
+        """
+        kwargs, estimate = self._request(messages, model, temperature, max_tokens, json_mode)
+        kwargs.update(stream=True, stream_options={"include_usage": True})
+        stream = await self._create(kwargs, estimate)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                self._settle(model, estimate, chunk.usage)
+            for choice in getattr(chunk, "choices", None) or []:
+                text = getattr(choice.delta, "content", None)
+                if text:
+                    yield text
+
+    async def aclose(self) -> None:
+        """Close the current loop's client (if the client supports it)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = self._clients.pop(loop, None)
+        close = getattr(client, "close", None)
+        if close is not None:
+            await close()
+
+
+def gateway_from_env(
+    api_key: Optional[str] = None, client_factory: Optional[Callable[[], Any]] = None
+) -> LLMGateway:
+    """
+    Build the gateway from env vars:
+
+    GPT_RPM_LIMIT / GPT_TPM_LIMIT (0 = unlimited), GPT_TIMEOUT (seconds),
+    GPT_MAX_CONNECTIONS, GPT_MAX_RETRIES, GPT_RETRY_BACKOFF,
+    GPT_BREAKER_FAILURES, GPT_BREAKER_RESET (seconds).
+
+    *client_factory* replaces the OpenAI client (e.g. utils.fake_llm).
+    GPT_BACKEND=fake picks that local stand-in without code changes: no
+    network, no key, well-formed replies after FAKE_LLM_MEDIAN_MS (default 0).
+    """
+    if client_factory is None and os.getenv("GPT_BACKEND", "openai") == "fake":
+        from utils.fake_llm import FakeLLM
+
+        client_factory = FakeLLM(median_ms=float(os.getenv("FAKE_LLM_MEDIAN_MS", "0"))).client
+    timeout = float(os.getenv("GPT_TIMEOUT", "120"))
+    connections = int(os.getenv("GPT_MAX_CONNECTIONS", "20"))
+
+    def factory():
+        import openai
+
+        try:
+            import httpx
+        except Exception:  # pragma: no cover - optional dependency
+            httpx = None
+
+        kwargs: Dict[str, Any] = {"api_key": api_key, "timeout": timeout, "max_retries": 0}
+        if httpx is not None:
+            kwargs["http_client"] = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            )
+        return openai.AsyncOpenAI(**kwargs)
+
+    return LLMGateway(
+        client_factory or factory,
+        rpm=float(os.getenv("GPT_RPM_LIMIT", "0")),
+        tpm=float(os.getenv("GPT_TPM_LIMIT", "0")),
+        max_retries=int(os.getenv("GPT_MAX_RETRIES", "2")),
+        backoff=float(os.getenv("GPT_RETRY_BACKOFF", "1.0")),
+        breaker=CircuitBreaker(
+            failures=int(os.getenv("GPT_BREAKER_FAILURES", "5")),
+            reset_after=float(os.getenv("GPT_BREAKER_RESET", "30")),
+        ),
+    )
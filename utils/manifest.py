@@ -0,0 +1,112 @@
+"""
+Persistent run manifest for the batch scripts.
+
+One SQLite row per output file records what it was built from (source hash,
+page range, parameters) and what was written (content hash, size).  A rerun
+asks is_current() per output and only redoes the ones whose inputs changed
+or whose file is missing; rows are committed as each output finishes, so an
+interrupted run resumes where it stopped.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+BLOCK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in 1 MB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(BLOCK):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RunManifest:
+    def __init__(self, path: str):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " output TEXT PRIMARY KEY, source TEXT NOT NULL, source_hash TEXT NOT NULL,"
+            " pages TEXT NOT NULL, params TEXT NOT NULL, content_hash TEXT NOT NULL,"
+            " size INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, output: str) -> Optional[Dict[str, object]]:
+        row = self._conn.execute(
+            "SELECT output, source, source_hash, pages, params, content_hash, size, updated"
+            " FROM outputs WHERE output = ?",
+            (output,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("output", "source", "source_hash", "pages", "params", "content_hash", "size", "updated")
+        return dict(zip(keys, row))
+
+    def is_current(self, output: str, source_hash: str, pages: str = "", params: str = "") -> bool:
+        """True when *output* exists and was built from exactly these inputs."""
+        entry = self.get(output)
+        return (
+            entry is not None
+            and entry["source_hash"] == source_hash
+            and entry["pages"] == pages
+            and entry["params"] == params
+            and os.path.exists(output)
+            and os.path.getsize(output) == entry["size"]
+        )
+
+    def record(
+        self,
+        output: str,
+        *,
+        source: str,
+        source_hash: str,
+        pages: str = "",
+        params: str = "",
+        content_hash: Optional[str] = None,
+    ) -> None:
+        """Remember that *output* was just written (content hash is computed if not given)."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO outputs"
+            " (output, source, source_hash, pages, params, content_hash, size, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                output,
+                source,
+                source_hash,
+                pages,
+                params,
+                content_hash or file_sha256(output),
+                os.path.getsize(output),
+                time.time(),
+            ),
+        )
+        self._conn.commit()
+
+    def outputs(self, source: Optional[str] = None) -> List[str]:
+        if source is None:
+            rows = self._conn.execute("SELECT output FROM outputs").fetchall()
+        else:
+            rows = self._conn.execute("SELECT output FROM outputs WHERE source = ?", (source,)).fetchall()
+        return [r[0] for r in rows]
+
+    def find(self, source_hash: str) -> List[Dict[str, object]]:
+        """Every entry built from a source with this hash."""
+        rows = self._conn.execute("SELECT output FROM outputs WHERE source_hash = ?", (source_hash,)).fetchall()
+        return [self.get(r[0]) for r in rows]
+
+    def forget(self, output: str) -> None:
+        self._conn.execute("DELETE FROM outputs WHERE output = ?", (output,))
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,202 @@
+"""
+In-process metrics and per-request stage timing.
+
+✔  counters and histograms with labels, rendered in Prometheus text format
+✔  timed(stage) records a stage into the global histogram and, inside a
+   request, into that request's breakdown (for Server-Timing headers)
+✔  token usage and estimated cost per model, globally and per request
+✔  collectors pull point-in-time numbers (cache, gateway) at scrape time
+
+The current request's breakdown lives in a context variable, so it follows
+the request into tasks and into worker threads started with a copied
+context.  No external dependency; one lock guards all state.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# USD per 1K tokens (prompt, completion); override with GPT_PRICE_PROMPT / GPT_PRICE_COMPLETION
+PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def price(model: str) -> Tuple[float, float]:
+    prompt, completion = PRICES.get(model, PRICES["gpt-4"])
+    return (
+        float(os.getenv("GPT_PRICE_PROMPT", prompt)),
+        float(os.getenv("GPT_PRICE_COMPLETION", completion)),
+    )
+
+
+# ---------- per-request breakdown ------------------------------------------
+class RequestTimings:
+    """Stage durations, tokens and cost accumulated for one request."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.tokens = 0
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_usage(self, tokens: int, cost: float) -> None:
+        with self._lock:
+            self.tokens += tokens
+            self.cost += cost
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def begin_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_request() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+# ---------- registry --------------------------------------------------------
+class Metrics:
+    def __init__(self, prefix: str = "lawqb") -> None:
+        self.prefix = prefix
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, List[float]]] = {}
+        self._collectors: List[Callable[[], Iterator[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._hists.setdefault(name, {}).get(key)
+            if counts is None:
+                # one slot per bucket, then +Inf, sum and count
+                counts = self._hists[name][key] = [0.0] * (len(BUCKETS) + 3)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[len(BUCKETS)] += 1
+            counts[-2] += seconds
+            counts[-1] += 1
+
+    def collector(self, fn: Callable[[], Iterator[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """Register *fn*, yielding ``(name, kind, help, labels, value)`` at scrape time."""
+        self._collectors.append(fn)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Time the block as *stage* (global histogram + current request)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - start)
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.observe("stage_seconds", seconds, stage=stage)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, seconds)
+
+    def record_usage(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        prompt_price, completion_price = price(model)
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+        self.inc("llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+        self.inc("llm_tokens_total", completion_tokens, model=model, kind="completion")
+        self.inc("llm_cost_usd_total", cost, model=model)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_usage(prompt_tokens + completion_tokens, cost)
+
+    # ---------- exposition --------------------------------------------------
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str, text: str) -> None:
+            lines.append(f"# HELP {self.prefix}_{name} {text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            hists = {n: {k: list(v) for k, v in s.items()} for n, s in self._hists.items()}
+
+        for name, series in sorted(counters.items()):
+            header(name, "counter", self._help.get(name, ("", name))[1])
+            for labels, value in sorted(series.items()):
+                lines.append(f"{self.prefix}_{name}{_labels(labels)} {_num(value)}")
+
+        for name, series in sorted(hists.items()):
+            header(name, "histogram", self._help.get(name, ("", name))[1])
+            for labels, counts in sorted(series.items()):
+                for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                    le = labels + (("le", str(bound)),)
+                    lines.append(f"{self.prefix}_{name}_bucket{_labels(le)} {_num(count)}")
+                lines.append(f"{self.prefix}_{name}_sum{_labels(labels)} {_num(counts[-2])}")
+                lines.append(f"{self.prefix}_{name}_count{_labels(labels)} {_num(counts[-1])}")
+
+        seen = set()
+        for collect in self._collectors:
+            for name, kind, text, labels, value in collect():
+                if name not in seen:
+                    header(name, kind, text)
+                    seen.add(name)
+                key = tuple(sorted(labels.items()))
+                lines.append(f"{self.prefix}_{name}{_labels(key)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = Metrics()
+metrics.describe("stage_seconds", "histogram", "Time spent per pipeline stage")
+metrics.describe("llm_tokens_total", "counter", "Tokens used by model and kind")
+metrics.describe("llm_cost_usd_total", "counter", "Estimated OpenAI cost in USD")
+metrics.describe("http_requests_total", "counter", "HTTP requests by route and status")
+metrics.describe("dedup_reused_total", "counter", "Chunk analyses reused from a near-duplicate")
+metrics.describe("gpt_repairs_total", "counter", "Follow-up GPT calls for incomplete or unparseable replies, by kind")
+metrics.describe("gpt_routing_total", "counter", "First-pass model answers, kept (accepted) or escalated, by task, model and outcome")
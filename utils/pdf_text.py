@@ -0,0 +1,194 @@
+"""
+Page-level PDF text extraction with per-page OCR fallback.
+
+✔  embedded text layer is used wherever a page has one
+✔  only pages with an empty text layer are OCR'd
+✔  pages are rasterised lazily from PyMuPDF pixmaps (no PNG round-trip)
+✔  tesseract runs in a shared process pool sized to the available cores
+✔  image files (JPEG / PNG / multi-page TIFF) go frame by frame to the same pool
+
+Pages are yielded in order as a generator, so callers can consume a document
+without holding all of it; at most ``2 × workers`` rasters are in flight.
+"""
+
+import logging
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except Exception:  # pragma: no cover - optional dependency
+    fitz = None
+
+from utils.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not on Linux
+        return os.cpu_count() or 1
+
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or _available_cores()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_ocr_ok: Optional[bool] = None
+
+
+# ---------- OCR backend -----------------------------------------------------
+def ocr_available() -> bool:
+    """True when pytesseract and the tesseract binary are both present."""
+    global _ocr_ok
+    if _ocr_ok is None:
+        try:
+            import pytesseract  # noqa: F401
+            from PIL import Image  # noqa: F401
+            _ocr_ok = shutil.which("tesseract") is not None
+        except Exception:
+            _ocr_ok = False
+    return _ocr_ok
+
+
+def _warm_worker() -> None:
+    """Pool initializer: import the OCR stack once per worker, not on its first page."""
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_warm_worker)
+    return _pool
+
+
+def start_ocr_pool() -> None:
+    """Spawn every OCR worker now (used by the warm-up) so the first scanned page doesn't pay for it."""
+    pool = _get_pool()
+    for future in [pool.submit(time.sleep, 0) for _ in range(OCR_WORKERS)]:
+        future.result()
+
+
+def _ocr_samples(width: int, height: int, samples: bytes, lang: str) -> Tuple[str, float]:
+    """Worker: run tesseract over a raw 8-bit grayscale raster; returns (text, seconds)."""
+    import pytesseract
+    from PIL import Image
+
+    start = time.perf_counter()
+    image = Image.frombytes("L", (width, height), samples)
+    text = pytesseract.image_to_string(image, lang=lang)
+    return text, time.perf_counter() - start
+
+
+def _resolve(item) -> str:
+    if not isinstance(item, Future):
+        return item
+    try:
+        text, seconds = item.result()
+    except Exception as exc:
+        log.warning("OCR failed for page: %s", exc)
+        return ""
+    metrics.record_stage("ocr", seconds)
+    return text if text.endswith("\n") else text + "\n"
+
+
+# ---------- public ----------------------------------------------------------
+def iter_page_texts(
+    doc,
+    *,
+    ocr: bool = True,
+    dpi: int = OCR_DPI,
+    pages: Optional[Iterable[int]] = None,
+    lock=None,
+) -> Iterator[str]:
+    """
+    Yield the text of every page of the open fitz *doc*, in page order.
+
+    Pages with an embedded text layer are yielded as-is; blank pages are
+    rasterised and OCR'd in the process pool when *ocr* is on and tesseract
+    is installed, otherwise they yield "".
+
+    *pages* restricts the walk to these 0-based page indexes.  PyMuPDF
+    documents are not thread-safe, so threads sharing one *doc* pass the same
+    *lock*; it is held only while a page is read, not while it is OCR'd.
+    """
+    pool = _get_pool() if ocr and ocr_available() else None
+    window = 2 * OCR_WORKERS
+    pending: deque = deque()
+    in_flight = 0
+    guard = lock or nullcontext()
+
+    for index in (range(len(doc)) if pages is None else pages):
+        with guard:
+            page = doc[index]
+            text = page.get_text() or ""
+            pix = None
+            if not text.strip() and pool is not None:
+                pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        if pix is None:
+            pending.append(text)
+        else:
+            pending.append(pool.submit(_ocr_samples, pix.width, pix.height, pix.samples, OCR_LANG))
+            in_flight += 1
+            del pix
+
+        # hand back everything that is already known, and keep the raster window bounded
+        while pending and (
+            not isinstance(pending[0], Future) or pending[0].done() or in_flight >= window
+        ):
+            item = pending.popleft()
+            if isinstance(item, Future):
+                in_flight -= 1
+            yield _resolve(item)
+
+    while pending:
+        yield _resolve(pending.popleft())
+
+
+def iter_image_texts(path: str) -> Iterator[str]:
+    """OCR every frame of the image at *path* in the process pool, yielding texts in order."""
+    from PIL import Image, ImageSequence
+
+    pool = _get_pool()
+    window = 2 * OCR_WORKERS
+    pending: deque = deque()
+    with Image.open(path) as image:
+        for frame in ImageSequence.Iterator(image):
+            gray = frame.convert("L")
+            pending.append(pool.submit(_ocr_samples, gray.width, gray.height, gray.tobytes(), OCR_LANG))
+            del gray
+            while pending and (pending[0].done() or len(pending) >= window):
+                yield _resolve(pending.popleft())
+    while pending:
+        yield _resolve(pending.popleft())
+
+
+def iter_pdf_text(
+    path: str,
+    *,
+    ocr: bool = True,
+    on_page: Optional[Callable[[int], None]] = None,
+) -> Iterator[str]:
+    """
+    Open the PDF at *path* (read lazily from disk) and yield its text page by page.
+
+    *on_page* is called with the running page count after each page.
+    """
+    if not fitz:
+        raise ValueError("pdf support not available")
+    with fitz.open(path, filetype="pdf") as pdf:
+        for n, text in enumerate(iter_page_texts(pdf, ocr=ocr), start=1):
+            if on_page:
+                on_page(n)
+            yield text
@@ -0,0 +1,173 @@
+"""
+Lazily loaded heavy dependencies ("plugins") and background warm-up.
+
+✔  nothing heavy is imported with the app: each plugin loads on first use
+✔  warm_up() loads a chosen set in a background thread after startup
+✔  every load is timed; report() feeds the startup log and /ready
+
+Plugins:
+
+    txt       built-in decoder (nothing to import)
+    docx      python-docx
+    pdf       PyMuPDF, via utils.pdf_text
+    ocr       pytesseract + tesseract binary, and a pre-started OCR worker pool
+    openai    the OpenAI SDK (the gateway imports it on its first call)
+    tokenizer tiktoken and its encoding tables
+
+A plugin that fails to load is remembered as unavailable (with the reason);
+load() then raises PluginUnavailable, which callers map to their own errors.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WARMUP = "txt,pdf,openai,tokenizer"  # docx and ocr load on first use
+
+
+class PluginUnavailable(RuntimeError):
+    pass
+
+
+class LazyPlugin:
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value: Any = None
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> Any:
+        """Import on first call (thread-safe) and return what the loader returned."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    try:
+                        self._value = self._loader()
+                    except Exception as exc:
+                        self.error = str(exc) or type(exc).__name__
+                    self.seconds = time.perf_counter() - start
+                    self._loaded = True
+                    log.info(
+                        "plugin %s %s in %.3fs",
+                        self.name,
+                        "unavailable" if self.error else "loaded",
+                        self.seconds,
+                    )
+        if self.error:
+            raise PluginUnavailable(f"{self.name} support not available: {self.error}")
+        return self._value
+
+    def available(self) -> bool:
+        try:
+            self.load()
+        except PluginUnavailable:
+            return False
+        return True
+
+
+# ---------- loaders ---------------------------------------------------------
+def _load_pdf():
+    from utils import pdf_text
+
+    if pdf_text.fitz is None:
+        raise ImportError("PyMuPDF is not installed")
+    return pdf_text
+
+
+def _load_ocr():
+    from utils import pdf_text
+
+    if not pdf_text.ocr_available():
+        raise RuntimeError("pytesseract or the tesseract binary is missing")
+    pdf_text.start_ocr_pool()
+    return pdf_text
+
+
+def _load_tokenizer():
+    from utils import chunking
+
+    return chunking.warm_tokenizer()
+
+
+PLUGINS: Dict[str, LazyPlugin] = {
+    "txt": LazyPlugin("txt", lambda: None),
+    "docx": LazyPlugin("docx", lambda: importlib.import_module("docx")),
+    "pdf": LazyPlugin("pdf", _load_pdf),
+    "ocr": LazyPlugin("ocr", _load_ocr),
+    "openai": LazyPlugin("openai", lambda: importlib.import_module("openai")),
+    "tokenizer": LazyPlugin("tokenizer", _load_tokenizer),
+}
+
+
+def load(name: str) -> Any:
+    return PLUGINS[name].load()
+
+
+# ---------- warm-up ---------------------------------------------------------
+class WarmUp:
+    """Loads plugins in a daemon thread; ``ready`` is set once all have been tried."""
+
+    def __init__(self) -> None:
+        self.ready = threading.Event()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.names: Iterable[str] = ()
+
+    def start(self, names: Iterable[str]) -> None:
+        if self.started is not None:  # once per process (a test may run the lifespan twice)
+            return
+        self.names = [n for n in names if n in PLUGINS]
+        self.started = time.perf_counter()
+        threading.Thread(target=self._run, name="plugin-warmup", daemon=True).start()
+
+    def _run(self) -> None:
+        try:
+            for name in self.names:
+                PLUGINS[name].available()
+        finally:
+            self.finished = time.perf_counter()
+            self.ready.set()
+            log.info("warm-up finished in %.3fs", self.finished - self.started)
+
+
+warmup = WarmUp()
+
+
+def warm_up_from_env() -> WarmUp:
+    """Start warming the plugins named in WARMUP_PLUGINS (comma-separated)."""
+    names = [n.strip() for n in os.getenv("WARMUP_PLUGINS", DEFAULT_WARMUP).split(",") if n.strip()]
+    warmup.start(names)
+    return warmup
+
+
+def report() -> Dict[str, Any]:
+    """Per-plugin load state and timing, plus warm-up progress."""
+    plugins = {}
+    for name, plugin in PLUGINS.items():
+        if not plugin.loaded:
+            state = "not loaded"
+        else:
+            state = "unavailable" if plugin.error else "loaded"
+        entry: Dict[str, Any] = {"state": state}
+        if plugin.seconds is not None:
+            entry["seconds"] = round(plugin.seconds, 3)
+        if plugin.error:
+            entry["error"] = plugin.error
+        plugins[name] = entry
+    duration = None
+    if warmup.started is not None and warmup.finished is not None:
+        duration = round(warmup.finished - warmup.started, 3)
+    return {"ready": warmup.ready.is_set(), "warmup": list(warmup.names), "warmupSeconds": duration, "plugins": plugins}
@@ -0,0 +1,109 @@
+"""
+Model routing: which model answers which task, and when to escalate.
+
+✔  one route per task (chunk summary, final reduce, IRAC analysis), each a
+   list of models tried in order plus a temperature, all from config
+✔  the first models are a cheap first pass: their answer is kept unless it
+   is unparseable, incomplete, blank or self-rated low confidence
+✔  the last model is final; its answers get the full repair treatment
+✔  route keys go into cache keys, so changing a route never serves answers
+   made under the old one
+
+    router = router_from_env()
+    route = router.route("chunk")        # Route(models=("gpt-4o-mini", "gpt-4"), ...)
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+TASKS = ("chunk", "reduce", "analyze")
+
+
+class Route(NamedTuple):
+    models: Tuple[str, ...]
+    temperature: float
+
+    @property
+    def first_pass(self) -> Tuple[str, ...]:
+        return self.models[:-1]
+
+    @property
+    def final(self) -> str:
+        return self.models[-1]
+
+    @property
+    def key(self) -> str:
+        return ">".join(self.models) + f"@{self.temperature:g}"
+
+
+def parse_models(spec: str) -> Tuple[str, ...]:
+    """``"gpt-4o-mini, gpt-4"`` → ``("gpt-4o-mini", "gpt-4")``; ValueError if empty."""
+    models = tuple(m.strip() for m in spec.split(",") if m.strip())
+    if not models:
+        raise ValueError(f"no models in route {spec!r}")
+    return models
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, Route], *, escalate_below: float = 0.6):
+        missing = [task for task in TASKS if task not in routes]
+        if missing:
+            raise ValueError(f"no route for {', '.join(missing)}")
+        self.routes = dict(routes)
+        self.escalate_below = escalate_below
+
+    def route(self, task: str) -> Route:
+        return self.routes[task]
+
+    def key(self, *tasks: str) -> str:
+        """Cache-key part for results made by *tasks* (all tasks if none given)."""
+        return "|".join(self.routes[task].key for task in tasks or TASKS)
+
+    def escalation(
+        self,
+        shaped: Optional[Dict[str, Any]],
+        missing: List[str],
+        *,
+        required: Iterable[str] = (),
+    ) -> Optional[str]:
+        """
+        Why a first-pass answer should go to the next model, or None to keep it.
+
+        *shaped* is the answer shaped to its schema (None if nothing parsed),
+        *missing* the required fields it lacks, and *required* the text
+        fields that must not come back blank.
+        """
+        if shaped is None:
+            return "unparseable"
+        if missing:
+            return "incomplete"
+        if any(isinstance(shaped.get(f), str) and not shaped[f].strip() for f in required):
+            return "blank"
+        confidence = shaped.get("confidence")
+        if isinstance(confidence, (int, float)) and confidence < self.escalate_below:
+            return "low_confidence"
+        return None
+
+
+# ---------- factory ---------------------------------------------------------
+def router_from_env() -> ModelRouter:
+    """
+    Build the router from environment variables:
+
+        GPT_MODEL            large model, the default for every task  (default gpt-4)
+        GPT_TEMPERATURE      sampling temperature                     (default 0.3)
+        GPT_ROUTE_CHUNK      models tried in order for chunk summaries
+                                                                      (default gpt-4o-mini,GPT_MODEL)
+        GPT_ROUTE_REDUCE     models for condensing a document summary (default GPT_MODEL)
+        GPT_ROUTE_ANALYZE    models for /analyze                      (default GPT_MODEL)
+        GPT_ESCALATE_BELOW   first-pass confidence under which the next model is asked
+                                                                      (default 0.6)
+    """
+    large = os.getenv("GPT_MODEL", "gpt-4")
+    temperature = float(os.getenv("GPT_TEMPERATURE", "0.3"))
+    defaults = {"chunk": f"gpt-4o-mini,{large}", "reduce": large, "analyze": large}
+    routes = {
+        task: Route(parse_models(os.getenv(f"GPT_ROUTE_{task.upper()}", default)), temperature)
+        for task, default in defaults.items()
+    }
+    return ModelRouter(routes, escalate_below=float(os.getenv("GPT_ESCALATE_BELOW", "0.6")))
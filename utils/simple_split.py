@@ -3,89 +3,302 @@
 Split the 30-page chunks in ~/lawqb-work/parts into
 ~/lawqb-work/out/{case_facts|country_conditions}.
 
-✔  case-facts triggers checked first
-✔  country-conditions triggers second
-✔  fallback: big or long ⇒ country-conditions
+✔  one pass over the text with all triggers combined, weighted per category
+✔  stops reading as soon as one category clearly leads
+✔  fallback: no triggers and big or long ⇒ country-conditions
+✔  batch mode: PDFs are sampled with PyMuPDF in a process pool
+✔  --dry-run writes a JSON/CSV manifest of file → category instead of moving
+✔  files already classified by a previous run are skipped, unless their
+   content changed (tracked by hash in <dest>/.simple_split.sqlite)
+
+    python utils/simple_split.py --src parts --dest out --workers 8
+    python utils/simple_split.py --dry-run --manifest plan.csv
 """
 
-import re, sys, shutil, pathlib
-from PyPDF2 import PdfReader
+import argparse, csv, json, os, re, sys, shutil, pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from utils.manifest import RunManifest, file_sha256
+except ImportError:  # run as a script from inside utils/
+    from manifest import RunManifest, file_sha256
 
 SRC  = pathlib.Path.home() / "lawqb-work" / "parts"
 DEST = pathlib.Path.home() / "lawqb-work" / "out"
-CF   = DEST / "case_facts"
-CC   = DEST / "country_conditions"
-for p in (CF, CC):
-    p.mkdir(parents=True, exist_ok=True)
-
-# ---------- keyword patterns -----------------------------------------------
-CASE_FACTS_PAT = re.compile(
-    r"""
-    \btab\s+[A-H]\b                              # Tab A-H coversheets
-  | \b(affidavit|declaration|sworn|statement)\b
-  | \bphotos?(?:graphs?)?|picture\b
-  | \b(medical|clinic|hospital|diagnosis|lab\s+result)\b
-  | \b(school|transcript|grades|certificate)\b
-  | \b(birth|marriage|death|id(?:entification)?|passport|visa)\b
-    """,
-    re.I | re.X,
-)
+SAMPLE_PAGES = 3           # leading pages always read
+SAMPLE_SPREAD = 3          # further pages spread over the rest of the file
+FOLDERS = {"case facts": "case_facts", "country conditions": "country_conditions"}
+LEDGER_NAME = ".simple_split.sqlite"
 
-COUNTRY_COND_PAT = re.compile(
-    r"""
-    (?:human\s*rights|country\s*(?:report|profile|conditions?))
-  | (?:U\.?S\.?\s*(?:Department|DOS|State\s+Dept|Gov(?:ernment)?))
-  | UNHCR|OHCHR|IACHR|OAS|IOM
-  | CRS\s+Report
-  | UK\s+Home\s+Office
-  | Amnesty(?:\s+International)?
-  | Human\s+Rights\s+Watch
-  | Freedom\s+House
-  | Crisis\s+Group
-  | WOLA
-  | Canadian\s+IRB
-  | World\s+Bank
-    """,
-    re.I | re.X,
+# ---------- keyword triggers ------------------------------------------------
+# (category, weight, pattern): strong, document-defining cues weigh more than
+# words that also turn up in passing (a passport number in a country report)
+TRIGGERS = [
+    ("case facts", 3, r"\btab\s+[A-H]\b"),                        # Tab A-H coversheets
+    ("case facts", 3, r"\b(?:affidavit|declaration|sworn)\b"),
+    ("case facts", 1, r"\bstatement\b"),
+    ("case facts", 1, r"\bphotos?(?:graphs?)?|picture\b"),
+    ("case facts", 2, r"\b(?:medical|clinic|hospital|diagnosis|lab\s+result)\b"),
+    ("case facts", 1, r"\b(?:school|transcript|grades|certificate)\b"),
+    ("case facts", 1, r"\b(?:birth|marriage|death|id(?:entification)?|passport|visa)\b"),
+    ("country conditions", 3, r"country\s*(?:report|profile|conditions?)"),
+    ("country conditions", 2, r"human\s*rights"),
+    ("country conditions", 2, r"U\.?S\.?\s*(?:Department|DOS|State\s+Dept|Gov(?:ernment)?)"),
+    ("country conditions", 3, r"\b(?:UNHCR|OHCHR|IACHR|OAS|IOM)\b"),
+    ("country conditions", 3, r"CRS\s+Report|UK\s+Home\s+Office|Amnesty(?:\s+International)?"),
+    ("country conditions", 3, r"Freedom\s+House|Crisis\s+Group|\bWOLA\b|Canadian\s+IRB|World\s+Bank"),
+]
+CATEGORIES = ("case facts", "country conditions")  # tie ⇒ the first one wins
+
+# every trigger in one alternation, so the text is scanned once
+TRIGGER_PAT = re.compile(
+    "|".join(f"(?P<t{i}>{pattern})" for i, (_, _, pattern) in enumerate(TRIGGERS)),
+    re.I,
 )
 
+DECIDE_MIN_SCORE = 12       # weighted hits needed before stopping early
+DECIDE_CONFIDENCE = 0.85    # ... and the leader's share of them
+CLASSIFY_MAX_CHARS = 200_000  # never scan more than this much text
+_CARRY = 64                 # chars kept between feed() calls for split triggers
+
 # ---------- classify --------------------------------------------------------
-def classify_text(text: str, *, size_bytes: int = 0, num_pages: int = 0) -> str:
-    """Return 'case facts' or 'country conditions' for *text*."""
-    if CASE_FACTS_PAT.search(text):
-        return "case facts"
-    if COUNTRY_COND_PAT.search(text):
-        return "country conditions"
+class Classification(NamedTuple):
+    category: str
+    confidence: float       # 0.5 = no evidence either way, → 1.0 = one-sided
+    scores: Dict[str, int]
+
 
+def _fallback(size_bytes: int, num_pages: int, chars: int) -> str:
     too_big = size_bytes > 2_000_000
-    too_long = num_pages > 40 or len(text) > 20_000
+    too_long = num_pages > 40 or chars > 20_000
     return "country conditions" if (too_big or too_long) else "case facts"
 
+
+class StreamClassifier:
+    """
+    Weighted single-pass classifier: feed() text pieces as they arrive, then result().
+
+    Each piece is scanned once for all triggers; scanning stops for good once
+    the leader has DECIDE_CONFIDENCE of at least DECIDE_MIN_SCORE points, or
+    after *max_chars*.  Triggers split across two pieces are still found.
+    """
+
+    def __init__(self, max_chars: int = CLASSIFY_MAX_CHARS) -> None:
+        self.scores = {category: 0 for category in CATEGORIES}
+        self.chars = 0
+        self.max_chars = max_chars
+        self._carry = ""
+
+    @property
+    def decided(self) -> bool:
+        total = sum(self.scores.values())
+        return total >= DECIDE_MIN_SCORE and self._confidence() >= DECIDE_CONFIDENCE
+
+    def _confidence(self) -> float:
+        # add-one smoothing: a single hit is suggestive, not certain
+        total = sum(self.scores.values())
+        return (max(self.scores.values()) + 1) / (total + 2)
+
+    def feed(self, text: str) -> None:
+        scanned = self.chars
+        self.chars += len(text)
+        if scanned >= self.max_chars or self.decided:
+            return
+        text = text[: self.max_chars - scanned]
+        buffer = self._carry + text
+        for match in TRIGGER_PAT.finditer(buffer):
+            if match.end() <= len(self._carry):
+                continue  # counted by the previous feed()
+            category, weight, _ = TRIGGERS[int(match.lastgroup[1:])]
+            self.scores[category] += weight
+            if self.decided:
+                break
+        self._carry = buffer[-_CARRY:]
+
+    def classify(self, *, size_bytes: int = 0, num_pages: int = 0) -> Classification:
+        if not any(self.scores.values()):
+            category = _fallback(size_bytes, num_pages, self.chars)
+        else:
+            category = max(CATEGORIES, key=lambda c: self.scores[c])
+        return Classification(category, round(self._confidence(), 3), dict(self.scores))
+
+    def result(self, *, size_bytes: int = 0, num_pages: int = 0) -> str:
+        return self.classify(size_bytes=size_bytes, num_pages=num_pages).category
+
+
+def score_text(
+    text: str, *, size_bytes: int = 0, num_pages: int = 0, max_chars: int = CLASSIFY_MAX_CHARS
+) -> Classification:
+    """Label, confidence and per-category scores for *text* (at most *max_chars* scanned)."""
+    classifier = StreamClassifier(max_chars)
+    classifier.feed(text)
+    return classifier.classify(size_bytes=size_bytes, num_pages=num_pages)
+
+
+def classify_text(text: str, *, size_bytes: int = 0, num_pages: int = 0) -> str:
+    """Return 'case facts' or 'country conditions' for *text*."""
+    return score_text(text, size_bytes=size_bytes, num_pages=num_pages).category
+
 # ---------- helper ----------------------------------------------------------
-def bucket(pdf: pathlib.Path) -> pathlib.Path:
-    """Return CF or CC for *pdf*."""
+def sample_pages(page_count: int) -> List[int]:
+    """The first SAMPLE_PAGES pages plus SAMPLE_SPREAD more spread over the rest."""
+    first = list(range(min(SAMPLE_PAGES, page_count)))
+    rest = page_count - len(first)
+    spread = [len(first) + (rest * (k + 1)) // (SAMPLE_SPREAD + 1) for k in range(SAMPLE_SPREAD)] if rest else []
+    return sorted(set(first + [p for p in spread if p < page_count]))
+
+
+def classify_pdf(path: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Return ``(path, category, error)`` for one PDF (runs in a worker process).
+
+    Only the pages from sample_pages() are read, and reading stops as soon as
+    the classifier is confident; unreadable files fall back to case facts.
+    """
     try:
-        reader = PdfReader(str(pdf))
-        sample = "".join(
-            (reader.pages[i].extract_text() or "") for i in range(min(3, len(reader.pages)))
-        )
-        category = classify_text(sample, size_bytes=pdf.stat().st_size, num_pages=len(reader.pages))
-        return CF if category == "case facts" else CC
+        import fitz  # PyMuPDF; imported here so the classifier itself stays light
 
+        with fitz.open(path) as doc:
+            classifier = StreamClassifier()
+            for i in sample_pages(len(doc)):
+                classifier.feed(doc[i].get_text())
+                if classifier.decided:
+                    break
+            category = classifier.result(size_bytes=os.path.getsize(path), num_pages=len(doc))
+        return path, category, None
     except Exception as exc:
-        print(f"!! cannot read {pdf}: {exc}", file=sys.stderr)
-        return CF
+        return path, "case facts", str(exc)
+
+
+def already_classified(
+    dest: pathlib.Path,
+    manifest: Optional[pathlib.Path],
+    ledger: Optional[RunManifest] = None,
+    hashes: Optional[Dict[str, str]] = None,
+    *,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """
+    File name → category for everything a previous run has sorted (or, for
+    a *dry_run*, planned).
+
+    A file counts as sorted only if it is in *dest* and the ledger has it
+    with the incoming file's hash (*hashes*, by name); anything else is
+    redone.  Manifest rows are only plans: they spare a later dry run the
+    classification, but a real run still moves those files.
+    """
+    done: Dict[str, str] = {}
+    for category, folder in FOLDERS.items():
+        if not (dest / folder).is_dir():
+            continue
+        for p in (dest / folder).glob("*.pdf"):
+            entry = ledger.get(str(p)) if ledger else None
+            incoming = (hashes or {}).get(p.name)
+            if entry and incoming and entry["source_hash"] == incoming:
+                done[p.name] = category
+    if dry_run and manifest and manifest.exists():
+        planned = {row["file"]: row["category"] for row in read_manifest(manifest)}
+        done = {**planned, **done}
+    return done
+
+
+def read_manifest(path: pathlib.Path) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        if path.suffix.lower() == ".csv":
+            return list(csv.DictReader(fh))
+        return json.load(fh)
+
+
+def write_manifest(rows: List[Dict[str, str]], path: Optional[pathlib.Path]) -> None:
+    """Write *rows* as CSV or JSON (by extension); no path ⇒ JSON on stdout."""
+    if path is None:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        if path.suffix.lower() == ".csv":
+            writer = csv.DictWriter(fh, fieldnames=["file", "category"])
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, fh, indent=2)
+
 
 # ---------- main ------------------------------------------------------------
+def run(
+    src: pathlib.Path = SRC,
+    dest: pathlib.Path = DEST,
+    *,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    manifest: Optional[pathlib.Path] = None,
+) -> List[Dict[str, str]]:
+    """Classify every PDF in *src*; move it under *dest* unless *dry_run*."""
+    try:
+        import fitz  # noqa: F401  PyMuPDF
+    except Exception:
+        raise SystemExit("PyMuPDF is required: pip install pymupdf")
+
+    # the manifest itself goes to stdout on a bare dry run, so progress goes to stderr
+    log = sys.stderr if dry_run and manifest is None else sys.stdout
+    if not dry_run:
+        for folder in FOLDERS.values():
+            (dest / folder).mkdir(parents=True, exist_ok=True)
+    ledger_path = dest / LEDGER_NAME
+    ledger = RunManifest(str(ledger_path)) if not dry_run or ledger_path.exists() else None
+
+    found = sorted(src.glob("*.pdf"))
+    counts = {category: 0 for category in FOLDERS}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = dict(zip((p.name for p in found), pool.map(file_sha256, map(str, found), chunksize=16)))
+        done = already_classified(dest, manifest, ledger, hashes, dry_run=dry_run)
+        todo = [str(p) for p in found if p.name not in done]
+        skipped = len(found) - len(todo)
+        rows = [{"file": name, "category": category} for name, category in done.items()]
+
+        for path, category, error in pool.map(classify_pdf, todo, chunksize=8):
+            name = os.path.basename(path)
+            if error:
+                print(f"!! cannot read {path}: {error}", file=sys.stderr)
+            if not dry_run:
+                target = dest / FOLDERS[category] / name
+                # a changed file may now belong in the other folder
+                for folder in FOLDERS.values():
+                    old = dest / folder / name
+                    if old != target and old.exists():
+                        old.unlink()
+                        ledger.forget(str(old))
+                shutil.move(path, target)
+                ledger.record(str(target), source=name, source_hash=hashes[name], content_hash=hashes[name])
+            rows.append({"file": name, "category": category})
+            counts[category] += 1
+            print(f"{name:<30} → {FOLDERS[category]}", file=log)
+
+    if ledger:
+        ledger.close()
+
+    if dry_run or manifest:
+        write_manifest(rows, manifest)
+
+    print(
+        f"\nSummary: {counts['case facts']} case-facts   |   "
+        f"{counts['country conditions']} country-conditions   |   {skipped} skipped",
+        file=log,
+    )
+    return rows
+
+
 def main() -> None:
-    moved = {CF: 0, CC: 0}
-    for pdf in sorted(SRC.glob("*.pdf")):
-        dest = bucket(pdf)
-        shutil.move(str(pdf), dest / pdf.name)
-        moved[dest] += 1
-        print(f"{pdf.name:<30} → {'case_facts' if dest is CF else 'country_conditions'}")
-
-    print(f"\nSummary: {moved[CF]} case-facts   |   {moved[CC]} country-conditions")
+    parser = argparse.ArgumentParser(description="Sort split PDF parts into case facts / country conditions")
+    parser.add_argument("--src", type=pathlib.Path, default=SRC, help="Folder of PDF parts")
+    parser.add_argument("--dest", type=pathlib.Path, default=DEST, help="Output root folder")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Classify only; do not move files")
+    parser.add_argument("--manifest", type=pathlib.Path, default=None, help="Manifest file (.json or .csv)")
+    args = parser.parse_args()
+
+    run(args.src, args.dest, workers=args.workers, dry_run=args.dry_run, manifest=args.manifest)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,62 @@
+"""
+Progressive responses as NDJSON or server-sent events.
+
+✔  encode_event  – one event dict → one NDJSON line or one SSE frame
+✔  run_emitting  – run a coroutine that emits events, yield them as they come,
+                   then its return value as the final "result" event
+
+Every event is a JSON object with an ``event`` field ("token", "chunk",
+"result", …).  Clients pick the format with ``?stream=ndjson`` or
+``?stream=sse``.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+Event = Dict[str, Any]
+
+
+def encode_event(event: Event, fmt: str) -> str:
+    data = json.dumps(event, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {event.get('event', 'message')}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+async def encode_stream(events: AsyncIterator[Event], fmt: str) -> AsyncIterator[str]:
+    async for event in events:
+        yield encode_event(event, fmt)
+
+
+async def run_emitting(
+    start: Callable[[Callable[[Event], None]], Awaitable[Any]],
+) -> AsyncIterator[Event]:
+    """
+    Call ``start(emit)`` and yield every event it emits while running,
+    followed by ``{"event": "result", "result": <return value>}`` (or an
+    ``{"event": "error"}`` if it raised).
+
+    If the consumer stops early (client went away) the run is cancelled.
+    """
+    queue: "asyncio.Queue[Event]" = asyncio.Queue()
+    task = asyncio.ensure_future(start(queue.put_nowait))
+    getter = None
+    try:
+        while not (task.done() and queue.empty()):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        if task.exception() is not None:
+            yield {"event": "error", "message": str(task.exception())}
+        else:
+            yield {"event": "result", "result": task.result()}
+    finally:
+        for pending in (getter, task):
+            if pending is not None and not pending.done():
+                pending.cancel()
@@ -0,0 +1,205 @@
+"""
+Validation and local repair of the model's JSON replies.
+
+✔  extract_json  – the first JSON object in a reply; markdown fences and
+                   surrounding prose are skipped, trailing commas dropped and
+                   a reply cut off mid-object closed again
+✔  conform       – shape an object to a Pydantic model: str ↔ list coerced,
+                   optional fields defaulted, what is still missing reported
+✔  repair_prompt – a follow-up asking only for the missing fields, or, when
+                   nothing could be parsed, for the reply restated as JSON
+
+Nothing here talks to the API: the caller decides whether a repair request
+is worth it, and most broken replies never need one.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+# a reply cut off after a comma, inside a key, or before a value
+_DANGLING = re.compile(r'(?:,|(?<=\{))\s*(?:"(?:[^"\\]|\\.)*"\s*:?\s*)?$')
+MAX_STARTS = 8  # '{' positions tried before giving up on a reply
+
+
+# ---------- parsing ---------------------------------------------------------
+def _balanced(text: str, start: int) -> Optional[Tuple[str, str]]:
+    """
+    The object opening at *start*, up to its matching brace, and the closers
+    a truncated reply still needs ("" when it is complete).  None when the
+    brackets don't match.
+    """
+    stack: List[str] = []
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack.pop() != ch:
+                return None
+            if not stack:
+                return text[start : i + 1], ""
+    body = text[start:]
+    if escape:
+        body = body[:-1]
+    if in_string:
+        body += '"'
+    return body, "".join(reversed(stack))
+
+
+def _candidates(text: str, start: int) -> Iterator[str]:
+    found = _balanced(text, start)
+    if found is None:
+        return
+    body, closers = found
+    yield body + closers
+    body = _TRAILING_COMMA.sub(r"\1", body)
+    yield body + closers
+    if closers:
+        yield _TRAILING_COMMA.sub(r"\1", _DANGLING.sub("", body) + closers)
+
+
+def extract_json(reply: str) -> Optional[Dict[str, Any]]:
+    """The first JSON object in *reply*, repaired where needed; None if there is none."""
+    text = _FENCE.sub("", reply.strip())
+    try:
+        value = json.loads(text)
+        return value if isinstance(value, dict) else None
+    except ValueError:
+        pass
+    start = text.find("{")
+    for _ in range(MAX_STARTS):
+        if start == -1:
+            break
+        for candidate in _candidates(text, start):
+            try:
+                value = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                return value
+        start = text.find("{", start + 1)
+    return None
+
+
+# ---------- validation ------------------------------------------------------
+def _kind(annotation: Any) -> Any:
+    """``str``, ``list`` or the annotation itself, with Optional[...] unwrapped."""
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    if annotation is str:
+        return str
+    if annotation is list or get_origin(annotation) in (list, List):
+        return list
+    return annotation
+
+
+def _coerce(value: Any, kind: Any) -> Any:
+    if kind is str and not isinstance(value, str):
+        if isinstance(value, list):
+            return "\n".join(v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in value)
+        return json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else str(value)
+    if kind is list:
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        if isinstance(value, list):
+            return [v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in value if v is not None]
+        return [json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else str(value)]
+    return value
+
+
+def _empty(annotation: Any) -> Any:
+    kind = _kind(annotation)
+    return "" if kind is str else [] if kind is list else None
+
+
+def conform(
+    data: Dict[str, Any], model: Type[BaseModel], *, fill: Iterable[str] = ()
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    *data* shaped to *model*'s fields, and the required fields still missing.
+
+    Values are coerced where the intent is clear (a string where a list was
+    expected and vice versa); fields with a default, and those named in
+    *fill*, are defaulted instead of reported.  Unknown keys are dropped and
+    values the model rejects count as missing.
+    """
+    fill = set(fill)
+    shaped: Dict[str, Any] = {}
+    missing: List[str] = []
+    for name, field in model.model_fields.items():
+        value = data.get(name)
+        if value is not None:
+            shaped[name] = _coerce(value, _kind(field.annotation))
+        elif not field.is_required():
+            shaped[name] = field.get_default(call_default_factory=True)
+        elif name in fill:
+            shaped[name] = _empty(field.annotation)
+        else:
+            missing.append(name)
+    try:
+        model.model_validate({**{n: _empty(model.model_fields[n].annotation) for n in missing}, **shaped})
+    except ValidationError as e:
+        for error in e.errors():
+            name = error["loc"][0] if error["loc"] else None
+            if name in shaped:
+                del shaped[name]
+                missing.append(name)
+    return shaped, missing
+
+
+def fill_missing(shaped: Dict[str, Any], missing: List[str], model: Type[BaseModel]) -> Dict[str, Any]:
+    """Default every *missing* field, noting which ones in ``verificationNotes`` if the model has it."""
+    out = {**shaped, **{name: _empty(model.model_fields[name].annotation) for name in missing}}
+    if missing and "verificationNotes" in model.model_fields:
+        note = f"Not returned by the model: {', '.join(missing)}."
+        out["verificationNotes"] = "\n".join(n for n in (out.get("verificationNotes") or "", note) if n)
+    return out
+
+
+# ---------- repair requests -------------------------------------------------
+def _field_lines(model: Type[BaseModel], names: Iterable[str]) -> str:
+    lines = []
+    for name in names:
+        hint = " (list of strings)" if _kind(model.model_fields[name].annotation) is list else ""
+        lines.append(f"- {name}{hint}")
+    return "\n".join(lines)
+
+
+def repair_prompt(model: Type[BaseModel], missing: List[str], *, reply: Optional[str] = None) -> str:
+    """
+    A follow-up for a reply that left out *missing*.
+
+    Without *reply* it is sent after the original exchange and asks for those
+    fields alone.  With *reply* (nothing could be parsed from it) it stands
+    on its own and asks for that reply restated as JSON, so the source text
+    is not sent again.
+    """
+    if reply is None:
+        return f"""
+Your reply is missing some fields. Return JSON only (no markdown), with just these fields:
+{_field_lines(model, missing)}
+"""
+    return f"""
+Restate the answer below as one JSON object (no markdown), with these fields:
+{_field_lines(model, model.model_fields)}
+
+Answer:
+{reply}
+"""
@@ -0,0 +1,119 @@
+"""
+Map-reduce aggregation of per-chunk GPT results.
+
+✔  dedupe        – normalised + fuzzy de-duplication, first-seen order kept
+✔  merge_results – local (no GPT) merge of a group of partial results
+✔  tree_reduce   – combine partials in a tree with a fixed fan-in
+
+The caller supplies the async reduce step, which typically merges locally and
+only asks GPT to condense when the merged text is over its token budget.  The
+number of reduce levels is log_fan_in(chunks), and the final answer is one
+reduce step's output no matter how long the document was.
+"""
+
+import asyncio
+import re
+from difflib import SequenceMatcher
+from typing import Awaitable, Callable, Dict, List
+
+TEXT_FIELDS = ("summary", "credibilityConcerns", "recommendation")
+LIST_FIELDS = ("keyFacts", "legalIssues")
+
+_PUNCT = re.compile(r"[^\w\s]")
+_WS = re.compile(r"\s+")
+_NUM = re.compile(r"\d+")
+
+Result = Dict[str, object]
+
+
+# ---------- de-duplication --------------------------------------------------
+def normalize_item(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return _WS.sub(" ", _PUNCT.sub(" ", (text or "").lower())).strip()
+
+
+def dedupe(items: List[str], threshold: float = 0.88) -> List[str]:
+    """
+    Drop exact and near-duplicate strings, keeping the first occurrence.
+
+    Two items are near-duplicates when their normalised forms have a
+    difflib similarity ratio of at least *threshold* and mention the same
+    numbers (so "detained in 2018" and "detained in 2019" both survive).
+    """
+    kept: List[str] = []
+    kept_norm: List[str] = []
+    kept_nums: List[List[str]] = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, str) or not item.strip():
+            continue
+        norm = normalize_item(item)
+        if norm in seen:
+            continue
+        nums = _NUM.findall(norm)
+        duplicate = False
+        for other, other_nums in zip(kept_norm, kept_nums):
+            if nums != other_nums:
+                continue
+            matcher = SequenceMatcher(None, norm, other, autojunk=False)
+            if (
+                matcher.real_quick_ratio() >= threshold
+                and matcher.quick_ratio() >= threshold
+                and matcher.ratio() >= threshold
+            ):
+                duplicate = True
+                break
+        seen.add(norm)
+        if not duplicate:
+            kept.append(item.strip())
+            kept_norm.append(norm)
+            kept_nums.append(nums)
+    return kept
+
+
+def _dedupe_sentences(texts: List[str], sep: str) -> str:
+    parts: List[str] = []
+    for text in texts:
+        if text:
+            parts.extend(s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s)
+    return sep.join(dedupe(parts))
+
+
+# ---------- merge -----------------------------------------------------------
+def merge_results(parts: List[Result]) -> Result:
+    """Merge partial results locally: concatenate text fields, dedupe lists."""
+    merged: Result = {}
+    for field in TEXT_FIELDS:
+        merged[field] = _dedupe_sentences([str(p.get(field) or "") for p in parts], " ")
+    for field in LIST_FIELDS:
+        items: List[str] = []
+        for p in parts:
+            value = p.get(field) or []
+            items.extend(value if isinstance(value, list) else [str(value)])
+        merged[field] = dedupe(items)
+    merged["verificationNotes"] = "\n".join(
+        dedupe([str(p.get("verificationNotes") or "") for p in parts])
+    )
+    return merged
+
+
+# ---------- tree reduce -----------------------------------------------------
+async def tree_reduce(
+    parts: List[Result],
+    reduce_fn: Callable[[List[Result]], Awaitable[Result]],
+    *,
+    fan_in: int = 4,
+) -> Result:
+    """
+    Reduce *parts* to one result by combining groups of *fan_in* per level.
+
+    Groups within a level run concurrently; order is preserved so the
+    output is deterministic.  The last step always goes through *reduce_fn*,
+    even for a single part, so the final answer gets the same treatment.
+    """
+    fan_in = max(2, fan_in)
+    level = list(parts) or [{}]
+    while len(level) > fan_in:
+        groups = [level[i : i + fan_in] for i in range(0, len(level), fan_in)]
+        level = list(await asyncio.gather(*(reduce_fn(g) for g in groups)))
+    return await reduce_fn(level)